@@ -1,11 +1,25 @@
 # App.py
+import asyncio
 import os
+import time
 from contextlib import asynccontextmanager
+
+# Everything imported below counts as import time in the startup breakdown
+_import_start = time.perf_counter()
 from fastapi import FastAPI
-from logger.logging import logger
+from logger.logging import logger, start_logging, flush_logging
 # Fixed import path to match actual file name
 import global_variables.global_variable as gv
-from saved_models.model_architecture import load_model, get_model_info
+from saved_models.model_registry import ModelRegistry
+from saved_models.batch_scheduler import MicroBatchScheduler
+from saved_models.inference_executor import InferenceExecutor
+from saved_models.prediction_cache import PredictionCache, SharedCacheBackend
+from saved_models.buffer_pool import BufferPool
+from saved_models.job_store import JobStore
+from saved_models.job_manager import JobManager
+from saved_models.live_sessions import LiveSessionManager
+from middleware.admission import AdmissionController, TokenBucketLimiter
+from saved_models.warmup import parse_batch_sizes, warm_up_serving_path
 from middleware.middlewares import add_middleware, add_exception_handlers
 
 # Import routers
@@ -14,34 +28,216 @@ from routes.route_health import router as health_router
 from routes.route_metrics import router as metrics_router
 from routes.route_predict import router as predict_router
 from routes.route_batch_predict import router as batch_router
+from routes.route_bulk_predict import router as bulk_router
+from routes.route_jobs import router as jobs_router
+from routes.route_live import router as live_router
+from routes.route_models import router as models_router
 
-def _load_model(model_path: str):
-    """Load the model and update global variables."""
-    if not model_path or not os.path.exists(model_path):
-        raise FileNotFoundError(f"Model file not found at {model_path}")
-    
+_import_time_ms = (time.perf_counter() - _import_start) * 1000
+
+def _process_uptime_ms():
+    """Milliseconds since this process started, read from /proc (None where unavailable)."""
     try:
-        # Load model and update global variables
-        gv.model = load_model(model_path)
-        gv.model_info = get_model_info(gv.model)
-        logger.info(f"Model loaded successfully from {model_path}")
-        logger.info(f"Model info: {gv.model_info}")
+        with open("/proc/self/stat") as f:
+            # Field 22 (start time in clock ticks since boot), counted after the ")" ending the command name
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime_s = float(f.read().split()[0])
+        return round((uptime_s - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000, 1)
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _parse_extra_models(spec: str):
+    """
+    Parse EXTRA_MODELS: comma-separated name=path entries, each optionally
+    suffixed with @variant (e.g. "pruned=saved_models/a.pth,int8=saved_models/a.pth@dynamic_int8").
+    """
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, path = item.partition("=")
+        path, _, variant = path.partition("@")
+        if not name or not path:
+            raise ValueError(f"Invalid EXTRA_MODELS entry '{item}', expected name=path[@variant]")
+        yield name.strip(), path.strip(), variant.strip() or None
+
+def _parse_cascade():
+    """
+    Cascade settings for the default model, or None when CASCADE_FAST_MODEL is unset.
+    CASCADE_FAST_MODEL is path[@variant] of the cheap first stage
+    (e.g. "saved_models/mnist_cnn_pruned_only.pth@static_int8"); MODEL_PATH
+    plus any CASCADE_ENSEMBLE_MODELS (comma-separated paths) handle escalations.
+    """
+    fast_spec = os.environ.get("CASCADE_FAST_MODEL")
+    if not fast_spec:
+        return None
+    fast_path, _, fast_variant = fast_spec.partition("@")
+    return {
+        "fast_model_path": fast_path.strip(),
+        "fast_backend": None,
+        "fast_variant": fast_variant.strip() or None,
+        "ensemble_model_paths": [
+            path.strip() for path in os.environ.get("CASCADE_ENSEMBLE_MODELS", "").split(",") if path.strip()
+        ],
+        "threshold": float(os.environ.get("CASCADE_THRESHOLD", "0.9"))
+    }
+
+async def _warm_start(model_path: str, lifespan_start: float):
+    """
+    Load the configured models, warm up the serving path and flip readiness.
+
+    Runs as a background task so the server answers /health/live while
+    weights load; /health/ready and the prediction routes report 503 until
+    this completes. A failure leaves the process not ready and fails the
+    liveness probe so an orchestrator restarts it.
+    """
+    try:
+        # Backend defaults to the MODEL_PATH extension (.onnx -> onnxruntime, else eager)
+        default_model = await gv.model_registry.load(
+            os.environ.get("MODEL_NAME", "default"),
+            model_path,
+            backend=os.environ.get("INFERENCE_BACKEND"),
+            variant=os.environ.get("MODEL_VARIANT"),
+            make_default=True,
+            cascade=_parse_cascade()
+        )
+        for name, path, variant in _parse_extra_models(os.environ.get("EXTRA_MODELS", "")):
+            await gv.model_registry.load(name, path, variant=variant)
+        
+        # Synthetic predictions through the executor threads and response models
+        serving_warmup_ms = await warm_up_serving_path(
+            default_model,
+            gv.model_registry.warmup_batch_sizes,
+            iterations=int(os.environ.get("WARMUP_ITERATIONS", "1"))
+        )
+        # Warm-up traffic is not real traffic
+        gv.metrics.reset()
+        
+        # Startup timing breakdown, for tuning container start-to-ready time
+        gv.startup_timings = {
+            "imports_ms": round(_import_time_ms, 2),
+            "weight_load_ms": default_model.load_time_ms,
+            "warmup_ms": default_model.warmup_time_ms,
+            "serving_warmup_ms": serving_warmup_ms,
+            "lifespan_ms": round((time.perf_counter() - lifespan_start) * 1000, 2),
+            "process_start_to_ready_ms": _process_uptime_ms()
+        }
+        gv.startup_state = "ready"
+        # Jobs left unfinished by an earlier run resume now that their models are loaded
+        if gv.job_manager is not None:
+            await gv.job_manager.start()
+        logger.info(f"Startup timings: {gv.startup_timings}")
+        logger.info("Application is ready to serve predictions")
     except Exception as e:
-        logger.error(f"Failed to load model: {str(e)}")
-        raise
+        gv.startup_state = f"failed: {str(e)}"
+        logger.error(f"Failed to load models at startup: {str(e)}")
 
 # Lifespan manager
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle events."""
+    # Resume the background log writer if an earlier shutdown in this process stopped it
+    start_logging()
     logger.info("Starting MNIST API application")
+    lifespan_start = time.perf_counter()
+    gv.startup_state = "starting"
     try:
         model_path = os.environ.get("MODEL_PATH")
         if not model_path:
             raise ValueError("MODEL_PATH environment variable is required")
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model file not found at {model_path}")
+        
+        # Run inference on a dedicated worker pool, off the event loop
+        gv.inference_executor = InferenceExecutor(
+            max_workers=int(os.environ.get("INFERENCE_WORKERS", "1")),
+            torch_threads=int(os.environ.get("INFERENCE_TORCH_THREADS", "0")) or None,
+            max_pending=int(os.environ.get("INFERENCE_MAX_PENDING", "64")),
+            retry_after_s=int(os.environ.get("INFERENCE_RETRY_AFTER_S", "1"))
+        )
+        gv.inference_executor.start()
+        
+        # Clients presenting one of these keys get their own limits; everyone else is limited per IP
+        gv.api_keys = frozenset(key.strip() for key in os.environ.get("API_KEYS", "").split(",") if key.strip())
+        
+        # Per-client rate limits and queue-delay driven shedding of prediction requests
+        rate_limit_per_s = float(os.environ.get("RATE_LIMIT_PER_S", "0"))
+        rate_limit_burst = os.environ.get("RATE_LIMIT_BURST")
+        gv.admission_controller = AdmissionController(
+            rate_limiter=TokenBucketLimiter(
+                rate_limit_per_s,
+                burst=float(rate_limit_burst) if rate_limit_burst else None,
+                max_clients=int(os.environ.get("RATE_LIMIT_MAX_CLIENTS", "10000"))
+            ) if rate_limit_per_s > 0 else None,
+            target_queue_delay_ms=float(os.environ.get("SHED_QUEUE_DELAY_MS", "250"))
+        )
+        
+        # Encode prediction responses straight from the result dicts, skipping response model validation
+        gv.fast_serialization = os.environ.get("FAST_SERIALIZATION", "true").lower() == "true"
+        
+        # Reuse input/output arrays per worker thread instead of allocating them per request
+        buffer_pool_max_batch = int(os.environ.get("BUFFER_POOL_MAX_BATCH", "256"))
+        if buffer_pool_max_batch > 0:
+            gv.buffer_pool = BufferPool(max_batch_size=buffer_pool_max_batch)
+        
+        # Named models served side by side; models loaded at runtime must live in MODEL_DIR
+        gv.model_registry = ModelRegistry(
+            model_dir=os.environ.get("MODEL_DIR", os.path.dirname(os.path.abspath(model_path))),
+            num_threads=gv.inference_executor.torch_threads,
+            warmup_batch_sizes=parse_batch_sizes(os.environ.get("WARMUP_BATCH_SIZES", "1,8,32"))
+        )
+        
+        # Group concurrent single-image predictions into shared forward passes
+        if os.environ.get("MICROBATCH_ENABLED", "true").lower() == "true":
+            gv.batch_scheduler = MicroBatchScheduler(
+                gv.inference_executor,
+                max_batch_size=int(os.environ.get("MICROBATCH_MAX_SIZE", "32")),
+                max_wait_ms=float(os.environ.get("MICROBATCH_MAX_WAIT_MS", "2"))
+            )
+            await gv.batch_scheduler.start()
+        
+        # Serve exact repeats of recent images without running the model
+        cache_size = int(os.environ.get("PREDICTION_CACHE_SIZE", "4096"))
+        if cache_size > 0:
+            cache_ttl_s = float(os.environ.get("PREDICTION_CACHE_TTL_S", "0"))
+            shared_path = os.environ.get("PREDICTION_CACHE_SHARED_PATH")
+            gv.prediction_cache = PredictionCache(
+                max_entries=cache_size,
+                ttl_s=cache_ttl_s,
+                shared_backend=SharedCacheBackend(shared_path, cache_size, cache_ttl_s) if shared_path else None
+            )
+        
+        # Live predict-as-you-draw WebSocket sessions with server-side canvases
+        if os.environ.get("LIVE_SESSIONS_ENABLED", "true").lower() == "true":
+            gv.live_sessions = LiveSessionManager(
+                max_sessions=int(os.environ.get("LIVE_MAX_SESSIONS", "1000")),
+                max_sessions_per_client=int(os.environ.get("LIVE_MAX_SESSIONS_PER_CLIENT", "8")),
+                idle_timeout_s=float(os.environ.get("LIVE_IDLE_TIMEOUT_S", "120")),
+                debounce_ms=float(os.environ.get("LIVE_DEBOUNCE_MS", "30")),
+                min_confidence_change=float(os.environ.get("LIVE_MIN_CONFIDENCE_CHANGE", "0.01"))
+            )
+            await gv.live_sessions.start()
+        
+        # Background prediction jobs, checkpointed to a local store so they survive restarts
+        if os.environ.get("JOBS_ENABLED", "true").lower() == "true":
+            gv.job_manager = JobManager(
+                JobStore(
+                    os.environ.get("JOB_STORE_DIR", "jobs"),
+                    lease_s=float(os.environ.get("JOB_LEASE_S", "60"))
+                ),
+                workers=int(os.environ.get("JOB_WORKERS", "1")),
+                poll_interval_s=float(os.environ.get("JOB_POLL_INTERVAL_S", "1"))
+            )
+        
+        # Share counters with the other worker processes of this server
+        metrics_dir = os.environ.get("METRICS_MULTIPROC_DIR")
+        if metrics_dir:
+            await gv.metrics.start_multiprocess_export(
+                metrics_dir,
+                interval_s=float(os.environ.get("METRICS_EXPORT_INTERVAL_S", "1"))
+            )
         
-        _load_model(model_path)
-        logger.info("Application startup completed successfully")
+        # Load and warm up the models while the server already answers liveness probes
+        gv.startup_task = asyncio.create_task(_warm_start(model_path, lifespan_start))
+        logger.info("Application startup completed, loading models in the background")
     except Exception as e:
         logger.error(f"Failed to start application: {str(e)}")
         raise RuntimeError(f"Application startup failed: {str(e)}")
@@ -49,6 +245,38 @@ async def lifespan(app: FastAPI):
     yield
     
     logger.info("Shutting down MNIST API application")
+    # Stop advertising readiness before tearing anything down
+    gv.startup_state = "stopping"
+    if gv.startup_task is not None:
+        gv.startup_task.cancel()
+        try:
+            await gv.startup_task
+        except asyncio.CancelledError:
+            pass
+        gv.startup_task = None
+    await gv.metrics.stop_multiprocess_export()
+    # Checkpointed jobs go back to the queue and resume on the next start
+    if gv.job_manager is not None:
+        await gv.job_manager.stop()
+        gv.job_manager.store.close()
+        gv.job_manager = None
+    # Live sessions close before the scheduler their predictions go through
+    if gv.live_sessions is not None:
+        await gv.live_sessions.stop()
+        gv.live_sessions = None
+    if gv.batch_scheduler is not None:
+        await gv.batch_scheduler.stop()
+        gv.batch_scheduler = None
+    if gv.inference_executor is not None:
+        gv.inference_executor.shutdown()
+        gv.inference_executor = None
+    gv.prediction_cache = None
+    gv.buffer_pool = None
+    gv.admission_controller = None
+    gv.model_registry = None
+    logger.info("Application shutdown completed")
+    # Write out everything still queued before the process exits
+    flush_logging()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -69,4 +297,8 @@ app.include_router(root_router)
 app.include_router(health_router)
 app.include_router(metrics_router)
 app.include_router(predict_router)
-app.include_router(batch_router)
\ No newline at end of file
+app.include_router(batch_router)
+app.include_router(bulk_router)
+app.include_router(jobs_router)
+app.include_router(live_router)
+app.include_router(models_router)
\ No newline at end of file
@@ -21,11 +21,46 @@ if __name__ == "__main__":
     # Import the app directly since we're in the same directory
     from App import app
     
+    # The request logging middleware already logs every request; ACCESS_LOG=false drops uvicorn's duplicate line
+    access_log = os.environ.get("ACCESS_LOG", "true").lower() == "true"
+    
+    # Production mode: pre-forked workers sharing one copy of the weights
+    workers = int(os.environ.get("SERVER_WORKERS", "1"))
+    if workers > 1:
+        from App import _parse_extra_models, _parse_cascade
+        from launcher.prefork import PreforkServer
+        from saved_models.model_registry import torch
+        
+        # Load the weights once, before forking, into memory every worker maps.
+        # Without torch the numpy engine maps .safetensors files, which the page cache shares already.
+        if torch is not None:
+            from saved_models.shared_weights import share_model_weights
+            
+            share_model_weights(model_path)
+            for _, path, _ in _parse_extra_models(os.environ.get("EXTRA_MODELS", "")):
+                share_model_weights(path)
+            cascade = _parse_cascade()
+            if cascade is not None:
+                for path in [cascade["fast_model_path"], *cascade["ensemble_model_paths"]]:
+                    share_model_weights(path)
+        
+        PreforkServer(
+            app,
+            host="0.0.0.0",
+            port=8000,
+            workers=workers,
+            pin_cores=os.environ.get("SERVER_PIN_CORES", "true").lower() == "true",
+            log_level="info",
+            access_log=access_log
+        ).run()
+        exit(0)
+    
     uvicorn.run(
         app,  # Pass the app object directly
         host="0.0.0.0",
         port=8000,
         log_level="info",
-        access_log=True,
+        access_log=access_log,
+        log_config=None,  # uvicorn's loggers propagate to the app's asynchronous log handler
         reload=False  # Set to True for development
     )
\ No newline at end of file
@@ -0,0 +1,61 @@
+# benchmarks/bench_batch_predict.py
+"""
+Per-image cost of the batch prediction path across batch sizes.
+
+Measures preprocess_batch_images, the model forward pass and
+postprocess_logits separately, so the fixed Python overhead per call can be
+seen flattening out as the batch grows.
+
+Run from the backend directory:
+    python -m benchmarks.bench_batch_predict --model-path saved_models/mnist_cnn_pruned_only.pth
+"""
+import argparse
+import time
+import numpy as np
+import torch
+import global_variables.global_variable as gv
+from saved_models.model_architecture import load_model
+from saved_models.predict import preprocess_batch_images, postprocess_logits, predict_batch_images
+
+def _time_per_call(func, repeats: int) -> float:
+    """Median wall time of func() in milliseconds."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+def run(model_path: str, batch_sizes, repeats: int):
+    gv.model = load_model(model_path)
+    rng = np.random.default_rng(0)
+
+    print(f"{'batch':>6} {'preprocess':>12} {'forward':>12} {'postprocess':>12} {'end-to-end':>12}   (ms per image)")
+    for batch_size in batch_sizes:
+        images = rng.random((batch_size, 784), dtype=np.float32).round(3).tolist()
+        tensor = preprocess_batch_images(images)
+        with torch.no_grad():
+            logits = gv.model(tensor)
+
+        # Warm up allocator and kernels for this shape
+        predict_batch_images(images, "warmup")
+
+        preprocess_ms = _time_per_call(lambda: preprocess_batch_images(images), repeats)
+        with torch.no_grad():
+            forward_ms = _time_per_call(lambda: gv.model(tensor), repeats)
+        postprocess_ms = _time_per_call(lambda: postprocess_logits(logits), repeats)
+        total_ms = _time_per_call(lambda: predict_batch_images(images, "bench"), repeats)
+
+        print(
+            f"{batch_size:>6} {preprocess_ms / batch_size:>12.4f} {forward_ms / batch_size:>12.4f} "
+            f"{postprocess_ms / batch_size:>12.4f} {total_ms / batch_size:>12.4f}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-image cost of batch prediction")
+    parser.add_argument("--model-path", default="saved_models/mnist_cnn_pruned_only.pth")
+    parser.add_argument("--batch-sizes", default="1,2,4,8,16,32,64,128,256,512")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    run(args.model_path, [int(size) for size in args.batch_sizes.split(",")], args.repeats)
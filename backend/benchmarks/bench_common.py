@@ -0,0 +1,140 @@
+# benchmarks/bench_common.py
+"""
+Shared helpers for the benchmark suite: timing, latency percentiles,
+closed-loop HTTP load and machine-readable result files.
+"""
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import time
+from typing import List, Dict, Any, Callable, Optional
+import numpy as np
+
+def random_images(count: int, seed: int = 0) -> np.ndarray:
+    """Random (count, 784) float32 images with the 3-decimal precision the frontend sends."""
+    return np.random.default_rng(seed).random((count, 784), dtype=np.float32).round(3)
+
+def time_calls(func: Callable[[], Any], repeats: int, warmup: int = 3) -> List[float]:
+    """Wall time of each func() call in milliseconds, after a few warm-up calls."""
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def latency_summary(samples_ms: List[float]) -> Dict[str, float]:
+    """Mean, min, max and p50/p95/p99 of latency samples in milliseconds."""
+    if not samples_ms:
+        return {}
+    samples = np.asarray(samples_ms)
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "mean": round(float(samples.mean()), 4),
+        "min": round(float(samples.min()), 4),
+        "p50": round(float(p50), 4),
+        "p95": round(float(p95), 4),
+        "p99": round(float(p99), 4),
+        "max": round(float(samples.max()), 4)
+    }
+
+def make_record(benchmark: str, params: Dict[str, Any], samples_ms: List[float],
+                items_per_call: int = 1, wall_time_s: Optional[float] = None, **extra) -> Dict[str, Any]:
+    """
+    One result row. Throughput is items per second: over the wall time when
+    given (concurrent runs), otherwise derived from the summed call latency.
+    """
+    busy_time_s = wall_time_s if wall_time_s is not None else sum(samples_ms) / 1000
+    record = {
+        "benchmark": benchmark,
+        "params": params,
+        "samples": len(samples_ms),
+        "throughput_per_s": round(len(samples_ms) * items_per_call / busy_time_s, 2) if busy_time_s else 0.0,
+        "latency_ms": latency_summary(samples_ms)
+    }
+    record.update(extra)
+    return record
+
+def print_record(record: Dict[str, Any]):
+    params = " ".join(f"{key}={value}" for key, value in record["params"].items())
+    latency = record["latency_ms"]
+    print(
+        f"{record['benchmark']:<14} {params:<48} {record['throughput_per_s']:>11.1f}/s "
+        f"p50={latency.get('p50', 0):.3f}ms p95={latency.get('p95', 0):.3f}ms p99={latency.get('p99', 0):.3f}ms"
+    )
+
+async def closed_loop(client, send: Callable[[Any, int], Any], concurrency: int,
+                      duration_s: float, warmup_s: float = 0.5) -> Dict[str, Any]:
+    """
+    Closed-loop load: `concurrency` clients each send a request, wait for the
+    response and immediately send the next one, for duration_s seconds.
+
+    send(client, sequence_number) must return an awaitable httpx response.
+    Returns per-request latencies (successful requests only), status code
+    counts and the measured wall time.
+    """
+    latencies: List[float] = []
+    status_codes: Dict[str, int] = {}
+    sequence = 0
+    loop = asyncio.get_running_loop()
+    measure_from = loop.time() + warmup_s
+    stop_at = measure_from + duration_s
+
+    async def worker():
+        nonlocal sequence
+        while loop.time() < stop_at:
+            sequence += 1
+            start = time.perf_counter()
+            try:
+                response = await send(client, sequence)
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            # Requests started during warm-up are not counted
+            if loop.time() - elapsed_ms / 1000 >= measure_from:
+                status_codes[status] = status_codes.get(status, 0) + 1
+                if status == "200":
+                    latencies.append(elapsed_ms)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {
+        "latencies_ms": latencies,
+        "status_codes": status_codes,
+        "wall_time_s": max(loop.time() - measure_from, 1e-9)
+    }
+
+def environment_info() -> Dict[str, Any]:
+    """Commit, library versions and hardware, so result files can be compared meaningfully."""
+    import torch
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch_threads": torch.get_num_threads()
+    }
+
+def write_results(path: str, records: List[Dict[str, Any]], config: Dict[str, Any]):
+    """Write results as JSON: environment, run configuration and one record per measurement."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"environment": environment_info(), "config": config, "records": records}, f, indent=2)
+    print(f"Results written to {path}")
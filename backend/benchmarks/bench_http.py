@@ -0,0 +1,151 @@
+# benchmarks/bench_http.py
+"""
+End-to-end benchmarks of /predict and /predict/batch over HTTP.
+
+Each scenario is a closed loop: every simulated client sends a request,
+waits for the answer and sends the next one. Throughput and latency
+percentiles are reported per endpoint, batch size and concurrency level.
+
+Targets:
+- asgi (default): the app in-process through httpx's ASGI transport, which
+  measures the framework and inference path without sockets
+- uvicorn: a local uvicorn server started for the run (--workers > 1 for
+  several processes)
+- --url: an already running server
+
+The prediction cache is disabled for the asgi and uvicorn targets so every
+request runs the model.
+
+Run from the backend directory:
+    python -m benchmarks.bench_http --target uvicorn --concurrency 1,8,32
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import List, Dict, Any
+import httpx
+import global_variables.global_variable as gv
+from benchmarks.bench_common import random_images, closed_loop, make_record, print_record, write_results
+
+# Distinct request bodies cycled through by the clients, serialized up front
+# so client-side JSON encoding stays out of the measurement
+PAYLOAD_POOL_SIZE = 256
+
+def _server_env(args) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("MODEL_PATH", args.model_path)
+    env.setdefault("PREDICTION_CACHE_SIZE", "0")
+    return env
+
+def _payloads(endpoint: str, batch_size: int) -> List[bytes]:
+    images = random_images(PAYLOAD_POOL_SIZE * batch_size).reshape(PAYLOAD_POOL_SIZE, batch_size, 784)
+    if endpoint == "predict":
+        return [json.dumps({"pixel_values": batch[0].tolist()}).encode() for batch in images]
+    return [json.dumps({"images": batch.tolist()}).encode() for batch in images]
+
+async def _run_scenarios(client: httpx.AsyncClient, args, target: str) -> List[Dict[str, Any]]:
+    records = []
+    scenarios = [("predict", 1)] + [("predict_batch", size) for size in args.batch_sizes]
+
+    for endpoint, batch_size in scenarios:
+        path = "/predict" if endpoint == "predict" else "/predict/batch"
+        payloads = _payloads(endpoint, batch_size)
+        headers = {"Content-Type": "application/json"}
+
+        def send(client, sequence):
+            return client.post(path, content=payloads[sequence % len(payloads)], headers=headers)
+
+        for concurrency in args.concurrency:
+            result = await closed_loop(client, send, concurrency, args.duration, warmup_s=args.warmup)
+            record = make_record(
+                "http",
+                {"target": target, "endpoint": endpoint, "batch_size": batch_size, "concurrency": concurrency},
+                result["latencies_ms"],
+                items_per_call=batch_size,
+                wall_time_s=result["wall_time_s"],
+                status_codes=result["status_codes"]
+            )
+            print_record(record)
+            records.append(record)
+    return records
+
+async def _run_asgi(args) -> List[Dict[str, Any]]:
+    # Configure the app before it is imported
+    os.environ.update(_server_env(args))
+    from App import app
+
+    async with app.router.lifespan_context(app):
+        # Models load in the background; wait until the app reports ready
+        await gv.startup_task
+        if gv.startup_state != "ready":
+            raise RuntimeError(f"App did not become ready: {gv.startup_state}")
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+            return await _run_scenarios(client, args, "asgi")
+
+async def _run_remote(args, url: str, target: str) -> List[Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        return await _run_scenarios(client, args, target)
+
+def _start_uvicorn(args) -> subprocess.Popen:
+    """Start a local uvicorn server and wait until /health/ready answers."""
+    command = [
+        sys.executable, "-m", "uvicorn", "App:app",
+        "--host", "127.0.0.1", "--port", str(args.port),
+        "--workers", str(args.workers), "--log-level", "warning"
+    ]
+    server = subprocess.Popen(command, env=_server_env(args), stdout=subprocess.DEVNULL)
+
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{args.port}/health/ready", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+
+    server.terminate()
+    raise RuntimeError("uvicorn did not become ready within 60s")
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--target", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--url", default=None, help="Benchmark a running server instead of starting one")
+    parser.add_argument("--model-path", default="saved_models/mnist_cnn_pruned_only.pth")
+    parser.add_argument("--concurrency", default="1,8,32", type=lambda value: [int(v) for v in value.split(",")])
+    parser.add_argument("--batch-sizes", default="1,4,10", type=lambda value: [int(v) for v in value.split(",")],
+                        help="Images per /predict/batch request (the endpoint accepts at most 10)")
+    parser.add_argument("--duration", type=float, default=5.0, help="Measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Unmeasured seconds at the start of each scenario")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+
+def run(args) -> List[Dict[str, Any]]:
+    if args.url:
+        return asyncio.run(_run_remote(args, args.url, "remote"))
+    if args.target == "asgi":
+        return asyncio.run(_run_asgi(args))
+
+    server = _start_uvicorn(args)
+    try:
+        return asyncio.run(_run_remote(args, f"http://127.0.0.1:{args.port}", f"uvicorn-{args.workers}w"))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end HTTP benchmarks of the prediction endpoints")
+    add_arguments(parser)
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    records = run(args)
+    if args.output:
+        write_results(args.output, records, vars(args))
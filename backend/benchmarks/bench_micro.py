@@ -0,0 +1,107 @@
+# benchmarks/bench_micro.py
+"""
+Micro-benchmarks of the prediction pipeline stages, without HTTP.
+
+- preprocess: preprocess_image (list and numpy input) and
+  preprocess_batch_images across batch sizes
+- forward: the model forward pass for every backend and variant across
+  batch sizes (ONNX Runtime needs an .onnx file next to the .pth)
+
+Run from the backend directory:
+    python -m benchmarks.bench_micro --output benchmarks/results/micro.json
+"""
+import argparse
+import os
+from typing import List, Dict, Any
+import torch
+from benchmarks.bench_common import random_images, time_calls, make_record, print_record, write_results
+from saved_models.inference_engines import SUPPORTED_BACKENDS
+from saved_models.model_architecture import load_model
+from saved_models.model_variants import MODEL_VARIANTS
+from saved_models.predict import preprocess_image, preprocess_batch_images
+
+def bench_preprocess(batch_sizes: List[int], repeats: int) -> List[Dict[str, Any]]:
+    records = []
+    image = random_images(1)[0]
+
+    for input_type, pixel_values in (("list", image.tolist()), ("numpy", image)):
+        samples = time_calls(lambda: preprocess_image(pixel_values), repeats)
+        records.append(make_record("preprocess", {"function": "preprocess_image", "input": input_type}, samples))
+
+    for batch_size in batch_sizes:
+        images = random_images(batch_size)
+        for input_type, batch in (("list", images.tolist()), ("numpy", images)):
+            samples = time_calls(lambda: preprocess_batch_images(batch), repeats)
+            records.append(make_record(
+                "preprocess",
+                {"function": "preprocess_batch_images", "input": input_type, "batch_size": batch_size},
+                samples,
+                items_per_call=batch_size
+            ))
+
+    for record in records:
+        print_record(record)
+    return records
+
+def _onnx_path(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + ".onnx"
+
+def bench_forward(model_path: str, backends: List[str], variants: List[str], batch_sizes: List[int],
+                  repeats: int, num_threads: int = None) -> List[Dict[str, Any]]:
+    records = []
+    for backend in backends:
+        for variant in variants:
+            # ONNX Runtime serves the exported float graph only; numpy runs float weights only
+            if backend in ("onnxruntime", "numpy") and variant != "float":
+                continue
+            path = _onnx_path(model_path) if backend == "onnxruntime" else model_path
+
+            try:
+                engine = load_model(path, backend=backend, num_threads=num_threads, variant=variant)
+            except Exception as e:
+                print(f"Skipping forward backend={backend} variant={variant}: {str(e)}")
+                continue
+
+            for batch_size in batch_sizes:
+                batch = torch.from_numpy(random_images(batch_size)).reshape(-1, 1, 28, 28)
+                with torch.no_grad():
+                    samples = time_calls(lambda: engine(batch), repeats)
+                record = make_record(
+                    "forward",
+                    {"backend": backend, "variant": variant, "batch_size": batch_size},
+                    samples,
+                    items_per_call=batch_size
+                )
+                print_record(record)
+                records.append(record)
+    return records
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--model-path", default="saved_models/mnist_cnn_pruned_only.pth")
+    parser.add_argument("--backends", default="eager,torchscript,onnxruntime,numpy",
+                        help=f"Comma-separated subset of {','.join(SUPPORTED_BACKENDS)}")
+    parser.add_argument("--variants", default=",".join(MODEL_VARIANTS))
+    parser.add_argument("--batch-sizes", default="1,8,32,128")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads (default: torch's choice)")
+
+def run(args) -> List[Dict[str, Any]]:
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+
+    records = bench_preprocess(batch_sizes, args.repeats)
+    records += bench_forward(
+        args.model_path, args.backends.split(","), args.variants.split(","), batch_sizes, args.repeats, args.threads
+    )
+    return records
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of preprocessing and model forward passes")
+    add_arguments(parser)
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    records = run(args)
+    if args.output:
+        write_results(args.output, records, vars(args))
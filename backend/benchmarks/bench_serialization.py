@@ -0,0 +1,141 @@
+# benchmarks/bench_serialization.py
+"""
+Cost of turning prediction results into response bytes, per batch size.
+
+- pydantic: what the routes do without fast serialization. The route
+  builds the response models, then FastAPI dumps them, validates the dump
+  against response_model again and JSON-encodes the validated value
+  (serialize_response + JSONResponse.render).
+- fast: prediction_payload / batch_payload encoded by FastJSONResponse
+  (orjson, or pydantic-core without it), as served with FAST_SERIALIZATION.
+
+Both outputs are decoded and compared before timing, so a mismatch between
+the payload builders and the response models fails the benchmark.
+
+Run from the backend directory:
+    python -m benchmarks.bench_serialization --batch-sizes 1,8,32,128
+"""
+import argparse
+import json
+from typing import List, Dict, Any, Union
+from pydantic import TypeAdapter
+from benchmarks.bench_common import random_images, time_calls, make_record, print_record, write_results
+from saved_models.predict import postprocess_logits, CLASS_LABELS
+from schema.response_schema import (
+    PredictionResponse, BatchPredictionResponse, CompactPredictionResponse, CompactBatchPredictionResponse
+)
+from schema.response_encoders import FastJSONResponse, prediction_payload, batch_payload, orjson
+
+def fake_results(batch_size: int) -> Dict[str, Any]:
+    """predict_batch_images-shaped results for random logits."""
+    logits = random_images(batch_size)[:, :10] * 10
+    predicted_classes, confidences, probability_rows = postprocess_logits(logits)
+    return {
+        "predictions": [
+            {
+                "prediction": predicted_class,
+                "confidence": round(confidence, 4),
+                "probabilities": dict(zip(CLASS_LABELS, probability_row)),
+                "inference_time_ms": 0.41
+            }
+            for predicted_class, confidence, probability_row in zip(predicted_classes, confidences, probability_rows)
+        ],
+        "total_inference_time_ms": round(0.41 * batch_size, 2),
+        "average_inference_time_ms": 0.41
+    }
+
+def _render_json(content) -> bytes:
+    # JSONResponse.render
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def pydantic_batch(results: Dict[str, Any], request_id: str, compact: bool, adapter: TypeAdapter) -> bytes:
+    item_model = CompactPredictionResponse if compact else PredictionResponse
+    batch_model = CompactBatchPredictionResponse if compact else BatchPredictionResponse
+    response = batch_model(
+        predictions=[
+            item_model(
+                prediction=result["prediction"],
+                confidence=result["confidence"],
+                probabilities=[result["probabilities"][str(j)] for j in range(10)] if compact else result["probabilities"],
+                inference_time_ms=result["inference_time_ms"],
+                request_id=f"{request_id}-{i}"
+            )
+            for i, result in enumerate(results["predictions"])
+        ],
+        batch_size=len(results["predictions"]),
+        total_inference_time_ms=results["total_inference_time_ms"],
+        average_inference_time_ms=results["average_inference_time_ms"],
+        request_id=request_id
+    )
+    # FastAPI: dump the returned model, validate against response_model, serialize
+    validated = adapter.validate_python(response.model_dump())
+    return _render_json(adapter.dump_python(validated, mode="json"))
+
+def pydantic_single(result: Dict[str, Any], request_id: str, compact: bool, adapter: TypeAdapter) -> bytes:
+    model = CompactPredictionResponse if compact else PredictionResponse
+    response = model(
+        prediction=result["prediction"],
+        confidence=result["confidence"],
+        probabilities=[result["probabilities"][str(j)] for j in range(10)] if compact else result["probabilities"],
+        inference_time_ms=result["inference_time_ms"],
+        request_id=request_id
+    )
+    validated = adapter.validate_python(response.model_dump())
+    return _render_json(adapter.dump_python(validated, mode="json"))
+
+def bench_serialization(batch_sizes: List[int], repeats: int) -> List[Dict[str, Any]]:
+    single_adapter = TypeAdapter(Union[PredictionResponse, CompactPredictionResponse])
+    batch_adapter = TypeAdapter(Union[BatchPredictionResponse, CompactBatchPredictionResponse])
+    request_id = "0f8fad5b-d9cb-469f-a165-70867728950e"
+
+    records = []
+    for batch_size in batch_sizes:
+        results = fake_results(batch_size)
+        for compact in (False, True):
+            if batch_size == 1:
+                # /predict
+                result = results["predictions"][0]
+                candidates = {
+                    "pydantic": lambda: pydantic_single(result, request_id, compact, single_adapter),
+                    "fast": lambda: FastJSONResponse(prediction_payload(result, request_id, compact)).body
+                }
+                endpoint = "predict"
+            else:
+                candidates = {
+                    "pydantic": lambda: pydantic_batch(results, request_id, compact, batch_adapter),
+                    "fast": lambda: FastJSONResponse(batch_payload(results, request_id, compact)).body
+                }
+                endpoint = "batch"
+
+            if json.loads(candidates["pydantic"]()) != json.loads(candidates["fast"]()):
+                raise AssertionError(f"Fast {endpoint} payload differs from the response model (compact={compact})")
+
+            for mode, encode in candidates.items():
+                samples = time_calls(encode, repeats)
+                record = make_record(
+                    "serialization",
+                    {"mode": mode, "endpoint": endpoint, "format": "compact" if compact else "full", "batch_size": batch_size},
+                    samples,
+                    items_per_call=batch_size,
+                    encoder="orjson" if mode == "fast" and orjson is not None else ("pydantic-core" if mode == "fast" else "json")
+                )
+                print_record(record)
+                records.append(record)
+    return records
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--batch-sizes", default="1,8,32,128")
+    parser.add_argument("--repeats", type=int, default=200)
+
+def run(args) -> List[Dict[str, Any]]:
+    return bench_serialization([int(size) for size in args.batch_sizes.split(",")], args.repeats)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark response serialization per batch size")
+    add_arguments(parser)
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    records = run(args)
+    if args.output:
+        write_results(args.output, records, vars(args))
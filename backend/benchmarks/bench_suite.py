@@ -0,0 +1,64 @@
+# benchmarks/bench_suite.py
+"""
+Run the whole benchmark suite and write one JSON result file.
+
+Runs the preprocess, forward and response serialization micro-benchmarks,
+the in-process ASGI benchmarks of /predict and /predict/batch and, with
+--load, the closed-loop load generator against a local uvicorn server. Compare two result files
+with benchmarks.compare_results.
+
+Run from the backend directory:
+    python -m benchmarks.bench_suite --load
+    python -m benchmarks.bench_suite --quick --output /tmp/quick.json
+"""
+import argparse
+import os
+from benchmarks import bench_micro, bench_http, bench_serialization
+from benchmarks.bench_common import environment_info, write_results
+
+def _parse(add_arguments, argv):
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    return parser.parse_args(argv)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the prediction API benchmark suite")
+    parser.add_argument("--model-path", default="saved_models/mnist_cnn_pruned_only.pth")
+    parser.add_argument("--load", action="store_true", help="Also load-test a local uvicorn server")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes for --load")
+    parser.add_argument("--quick", action="store_true", help="Fewer repeats and shorter scenarios, for smoke runs")
+    parser.add_argument("--output", default=None,
+                        help="Result file (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+
+    model_args = ["--model-path", args.model_path]
+    micro_argv = model_args + (["--repeats", "10", "--batch-sizes", "1,32"] if args.quick else [])
+    http_argv = model_args + (["--duration", "1", "--warmup", "0.2", "--concurrency", "1,8"] if args.quick else [])
+
+    micro_args = _parse(bench_micro.add_arguments, micro_argv)
+    records = bench_micro.run(micro_args)
+
+    serialization_args = _parse(
+        bench_serialization.add_arguments, ["--repeats", "20", "--batch-sizes", "1,32"] if args.quick else []
+    )
+    records += bench_serialization.run(serialization_args)
+
+    asgi_args = _parse(bench_http.add_arguments, http_argv)
+    records += bench_http.run(asgi_args)
+
+    config = {
+        "suite": vars(args), "micro": vars(micro_args),
+        "serialization": vars(serialization_args), "asgi": vars(asgi_args)
+    }
+    if args.load:
+        load_args = _parse(bench_http.add_arguments, http_argv + ["--target", "uvicorn", "--workers", str(args.workers)])
+        records += bench_http.run(load_args)
+        config["load"] = vars(load_args)
+
+    output = args.output or os.path.join(
+        os.path.dirname(__file__), "results", f"{environment_info()['commit'] or 'results'}.json"
+    )
+    write_results(output, records, config)
+
+if __name__ == "__main__":
+    main()
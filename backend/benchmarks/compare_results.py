@@ -0,0 +1,53 @@
+# benchmarks/compare_results.py
+"""
+Compare two benchmark result files, e.g. from two commits.
+
+Matches records by benchmark name and parameters and prints the change in
+throughput and p50/p99 latency. Changes beyond --threshold percent are
+flagged so regressions stand out.
+
+Run from the backend directory:
+    python -m benchmarks.compare_results benchmarks/results/abc1234.json benchmarks/results/def5678.json
+"""
+import argparse
+import json
+from typing import Dict, Any, Tuple
+
+def _key(record: Dict[str, Any]) -> Tuple:
+    return (record["benchmark"],) + tuple(sorted(record["params"].items()))
+
+def _change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float):
+    baseline_records = {_key(record): record for record in baseline["records"]}
+    print(f"baseline:  {baseline['environment'].get('commit')} ({baseline['environment'].get('timestamp')})")
+    print(f"candidate: {candidate['environment'].get('commit')} ({candidate['environment'].get('timestamp')})")
+    print(f"{'benchmark':<60} {'throughput':>11} {'p50':>9} {'p99':>9}")
+
+    for record in candidate["records"]:
+        before = baseline_records.get(_key(record))
+        label = record["benchmark"] + " " + " ".join(f"{key}={value}" for key, value in record["params"].items())
+        if before is None:
+            print(f"{label:<60} {'(new)':>11}")
+            continue
+
+        throughput = _change(before["throughput_per_s"], record["throughput_per_s"])
+        p50 = _change(before["latency_ms"].get("p50", 0), record["latency_ms"].get("p50", 0))
+        p99 = _change(before["latency_ms"].get("p99", 0), record["latency_ms"].get("p99", 0))
+        # Lower throughput or higher latency is a regression
+        regressed = throughput < -threshold or p50 > threshold or p99 > threshold
+        print(f"{label:<60} {throughput:>+10.1f}% {p50:>+8.1f}% {p99:>+8.1f}%{'  <-- regression' if regressed else ''}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change flagged as a regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    compare(baseline, candidate, args.threshold)
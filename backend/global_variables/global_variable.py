@@ -1,11 +1,22 @@
 # Global variables for model and metrics
 #global_variables/global_variable.py
+from metrics.metrics_engine import MetricsEngine
+
 model = None
 model_info = {}
-prediction_metrics = {
-    "total_predictions": 0,
-    "successful_predictions": 0,
-    "failed_predictions": 0,
-    "average_inference_time": 0.0,
-    "predictions_by_class": {str(i): 0 for i in range(10)}
-}
\ No newline at end of file
+model_version = ""  # Identifies the loaded model weights; changes on every load
+shared_state_dicts = {}  # Weights preloaded into shared memory by the prefork launcher, keyed by path and mtime
+model_registry = None  # ModelRegistry of named models; model/model_info/model_version mirror its default
+inference_executor = None  # InferenceExecutor running forward passes off the event loop
+batch_scheduler = None  # MicroBatchScheduler when micro-batching is enabled
+prediction_cache = None  # PredictionCache when caching is enabled
+job_manager = None  # JobManager running prediction jobs in the background when jobs are enabled
+live_sessions = None  # LiveSessionManager of live-prediction WebSocket sessions when they are enabled
+api_keys = frozenset()  # API keys that identify clients for rate limits and session caps; other clients are keyed by IP
+admission_controller = None  # AdmissionController rate limiting and shedding prediction requests
+buffer_pool = None  # BufferPool of reusable per-thread input/output arrays when pooling is enabled
+fast_serialization = False  # Encode prediction responses directly with orjson instead of through pydantic models
+startup_state = "starting"  # "starting", "ready", "stopping" or "failed: <reason>"; /health/ready and predictions require "ready"
+startup_task = None  # Background task loading and warming up the models at startup
+startup_timings = {}  # Imports, weight load, warm-up and start-to-ready times of this process
+metrics = MetricsEngine()  # Thread-safe counters and latency histograms behind /metrics
\ No newline at end of file
@@ -0,0 +1,169 @@
+# launcher/prefork.py
+import os
+import glob
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from typing import List, Dict, Tuple
+import uvicorn
+from metrics.metrics_engine import retire_process_metrics
+from logger.logging import logger
+
+# Workers that exit sooner than this after starting are restarted with a delay
+CRASH_LOOP_WINDOW_S = 5.0
+
+def split_cores(cores: List[int], workers: int) -> List[List[int]]:
+    """
+    Give each worker a contiguous slice of the allowed cores.
+    With more workers than cores, workers share cores round-robin.
+    """
+    if workers >= len(cores):
+        return [[cores[index % len(cores)]] for index in range(workers)]
+
+    per_worker, remainder = divmod(len(cores), workers)
+    slices, start = [], 0
+    for index in range(workers):
+        size = per_worker + (1 if index < remainder else 0)
+        slices.append(cores[start:start + size])
+        start += size
+    return slices
+
+class PreforkServer:
+    """
+    Production launcher that pre-forks uvicorn worker processes.
+
+    The parent binds the listening socket once and forks `workers` children
+    that all accept on it. Everything the parent loaded before run() (such as
+    weights placed in shared memory by share_model_weights) is inherited by
+    the children instead of being loaded once per worker. Each child is
+    pinned to its own slice of cores and sizes its torch thread pool to
+    that slice, so workers don't oversubscribe the CPU. Worker metrics are
+    aggregated through a shared METRICS_MULTIPROC_DIR. Workers that die are
+    restarted; SIGTERM or SIGINT shuts all of them down gracefully.
+    """
+    def __init__(self, app, host: str, port: int, workers: int, pin_cores: bool = True,
+                 log_level: str = "info", access_log: bool = True):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.pin_cores = pin_cores and hasattr(os, "sched_setaffinity")
+        self.log_level = log_level
+        self.access_log = access_log
+
+        cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        self.core_slices = split_cores(cores, workers)
+
+        self._socket = None
+        self._children: Dict[int, Tuple[int, float]] = {}
+        self._stopping = False
+        self._metrics_dir_created = None
+
+    def run(self):
+        """Fork the workers and supervise them until shutdown."""
+        if not hasattr(os, "fork"):
+            raise RuntimeError("The prefork launcher requires a platform with os.fork")
+
+        self._socket = self._bind()
+        self._prepare_metrics_dir()
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        logger.info(f"Prefork server listening on {self.host}:{self.port} with {self.workers} workers")
+        for index in range(self.workers):
+            self._spawn(index)
+
+        try:
+            self._supervise()
+        finally:
+            self._socket.close()
+            if self._metrics_dir_created:
+                shutil.rmtree(self._metrics_dir_created, ignore_errors=True)
+            logger.info("Prefork server stopped")
+
+    def _bind(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _prepare_metrics_dir(self):
+        """Point all workers at one metrics directory, clearing files of a previous run."""
+        metrics_dir = os.environ.get("METRICS_MULTIPROC_DIR")
+        if not metrics_dir:
+            metrics_dir = self._metrics_dir_created = tempfile.mkdtemp(prefix="mnist-metrics-")
+            os.environ["METRICS_MULTIPROC_DIR"] = metrics_dir
+        os.makedirs(metrics_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(metrics_dir, "metrics_*.json")):
+            os.remove(path)
+
+    def _spawn(self, index: int):
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                self._run_worker(index)
+            except BaseException as e:
+                logger.error(f"Worker {index} failed: {str(e)}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+
+        self._children[pid] = (index, time.monotonic())
+        logger.info(f"Started worker {index} (pid {pid}) on cores {self.core_slices[index]}")
+
+    def _run_worker(self, index: int):
+        # uvicorn installs its own graceful shutdown handlers
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+        cores = self.core_slices[index]
+        if self.pin_cores:
+            os.sched_setaffinity(0, cores)
+        # One torch thread per pinned core unless configured explicitly
+        os.environ.setdefault("INFERENCE_TORCH_THREADS", str(len(cores)))
+
+        # log_config=None: uvicorn's loggers propagate to the app's asynchronous log handler
+        config = uvicorn.Config(self.app, log_level=self.log_level, access_log=self.access_log, log_config=None)
+        uvicorn.Server(config).run(sockets=[self._socket])
+
+    def _handle_stop(self, signum, frame):
+        self._stopping = True
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _supervise(self):
+        while self._children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+
+            if pid not in self._children:
+                continue
+            index, started_at = self._children.pop(pid)
+            # The exited worker's totals stay in /metrics without counting as a running process
+            try:
+                retire_process_metrics(os.environ["METRICS_MULTIPROC_DIR"], pid)
+            except OSError as e:
+                logger.warning(f"Failed to retire metrics of worker {index} (pid {pid}): {str(e)}")
+            if self._stopping:
+                continue
+
+            logger.error(f"Worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}; restarting")
+            if time.monotonic() - started_at < CRASH_LOOP_WINDOW_S:
+                time.sleep(1)
+            self._spawn(index)
@@ -13,16 +13,243 @@
 
 # logger = logging.getLogger(__name__)
 
+import atexit
+import json
 import logging
+import os
+import queue
+import random
 import sys
+import threading
+import time
+from typing import Dict, Any
+
+# Marks the end of the queue for the writer thread
+_STOP = object()
+
+# Attributes every LogRecord has; anything else was passed with extra=
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: UTC timestamp, level, logger, message, every
+    field passed with extra= (request_id, route, status, ...) and the
+    formatted traceback when there is one.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """
+    Thin out the high-volume per-request lines.
+
+    Only records logged with extra={"route": <route template>} are affected,
+    and only below WARNING: each route keeps the configured fraction of its
+    records (sample_rates) and at most rate_limit_per_s of them per second.
+    Runs in the logging thread before a record is queued, so dropped records
+    are never formatted.
+    """
+    def __init__(self, sample_rates: Dict[str, float] = None, rate_limit_per_s: float = 0):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+        self.rate_limit_per_s = rate_limit_per_s
+        self._windows: Dict[str, list] = {}  # route -> [window start, records kept in the window]
+        self.sampled_out = 0
+        self.rate_limited = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        route = getattr(record, "route", None)
+        if route is None or record.levelno >= logging.WARNING:
+            return True
+
+        sample_rate = self.sample_rates.get(route, 1.0)
+        if sample_rate < 1.0 and random.random() >= sample_rate:
+            self.sampled_out += 1
+            return False
+
+        if self.rate_limit_per_s > 0:
+            now = time.monotonic()
+            window = self._windows.get(route)
+            if window is None or now - window[0] >= 1.0:
+                window = self._windows[route] = [now, 0]
+            if window[1] >= self.rate_limit_per_s:
+                self.rate_limited += 1
+                return False
+            window[1] += 1
+        return True
+
+class AsyncLogHandler(logging.Handler):
+    """
+    Queue-based handler that formats and writes records on a background thread.
+
+    A logging call only runs the filters and puts the record on a queue
+    (a lock-free SimpleQueue, bounded by max_queue_size); formatting, JSON encoding and the write itself happen on the
+    writer thread, which drains the queue in batches and writes each batch
+    with a single write and flush. When the queue is full, records are
+    dropped and counted instead of blocking the event loop. Arguments are
+    formatted on the writer thread, so pass immutable values as log args.
+
+    stop() writes everything still queued before returning. While stopped,
+    records are written synchronously by the logging thread.
+    """
+    def __init__(self, stream, max_queue_size: int = 10000, batch_size: int = 512):
+        super().__init__()
+        self.stream = stream
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._write_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+
+    def start(self):
+        """Start the writer thread; records are queued from now on."""
+        if self._thread is not None:
+            return
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Write every queued record and stop the writer thread."""
+        thread = self._thread
+        if thread is None:
+            return
+        # Records logged from here on are written synchronously
+        self._thread = None
+        self._queue.put(_STOP)
+        thread.join()
+
+        # Records queued concurrently with the stop marker
+        leftover = []
+        while not self._queue.empty():
+            record = self._queue.get_nowait()
+            if record is not _STOP:
+                leftover.append(record)
+        if leftover:
+            self._write(leftover)
+
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def emit(self, record: logging.LogRecord):
+        if self._thread is None:
+            self._write([record])
+            return
+        if self._queue.qsize() >= self.max_queue_size:
+            self.dropped += 1
+            return
+        self._queue.put(record)
+
+    def _run(self):
+        while True:
+            records = [self._queue.get()]
+            # Take everything already queued, up to one batch
+            while len(records) < self.batch_size:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = any(record is _STOP for record in records)
+            self._write([record for record in records if record is not _STOP])
+            if stopping:
+                return
+
+    def _write(self, records):
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+        with self._write_lock:
+            try:
+                self.stream.write("\n".join(lines) + "\n")
+                self.stream.flush()
+                self.written += len(lines)
+            except Exception:
+                self.handleError(records[-1])
+
+    def _reinit_after_fork(self):
+        """The writer thread does not survive fork(); give a forked worker its own."""
+        was_running = self._thread is not None
+        self._thread = None
+        self._write_lock = threading.Lock()
+        if was_running:
+            self.start()
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "route=rate" pairs such as "/predict=0.01,/predict/batch=0.1"."""
+    sample_rates = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        route, separator, rate = part.strip().rpartition("=")
+        try:
+            sample_rate = float(rate)
+        except ValueError:
+            sample_rate = -1.0
+        if not separator or not route or not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"Invalid log sample rate '{part.strip()}', expected route=rate with a rate in [0, 1]")
+        sample_rates[route] = sample_rate
+    return sample_rates
+
+def start_logging():
+    """Queue records for the background writer, unless LOG_ASYNC=false."""
+    if ASYNC_LOGGING:
+        log_handler.start()
+
+def flush_logging():
+    """Write every queued record and stop the writer thread; start_logging() resumes it."""
+    log_handler.stop()
+
+def get_logging_stats() -> Dict[str, Any]:
+    """Queue depth and written/dropped/sampled record counters of the log pipeline."""
+    return {
+        "async": log_handler.is_running(),
+        "queue_depth": log_handler._queue.qsize(),
+        "written": log_handler.written,
+        "dropped": log_handler.dropped,
+        "sampled_out": sampling_filter.sampled_out,
+        "rate_limited": sampling_filter.rate_limited
+    }
+
+# Output to stdout through the queue; LOG_FORMAT=json for structured lines
+log_handler = AsyncLogHandler(sys.stdout, max_queue_size=int(os.environ.get("LOG_QUEUE_SIZE", "10000")))
+if os.environ.get("LOG_FORMAT", "text").lower() == "json":
+    log_handler.setFormatter(JsonFormatter())
+else:
+    log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+sampling_filter = SamplingFilter(
+    parse_sample_rates(os.environ.get("LOG_SAMPLE_RATES", "")),
+    rate_limit_per_s=float(os.environ.get("LOG_RATE_LIMIT_PER_S", "0"))
+)
+log_handler.addFilter(sampling_filter)
 
-# Configure logging to output to stdout/stderr
 logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)  # Output to stdout
-    ]
+    level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+    handlers=[log_handler]
 )
 
-logger = logging.getLogger(__name__)
\ No newline at end of file
+ASYNC_LOGGING = os.environ.get("LOG_ASYNC", "true").lower() == "true"
+start_logging()
+# Flush whatever is still queued when the interpreter exits
+atexit.register(flush_logging)
+os.register_at_fork(after_in_child=log_handler._reinit_after_fork)
+
+logger = logging.getLogger(__name__)
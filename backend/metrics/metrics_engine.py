@@ -0,0 +1,333 @@
+# metrics/metrics_engine.py
+import asyncio
+import bisect
+import glob
+import json
+import os
+import threading
+from typing import Dict, Any, List, Optional
+from logger.logging import logger
+
+# Shared upper bounds (ms) of every latency histogram: 10 log-spaced buckets per
+# decade from 10us to 100s, so each bucket spans about 26% of its value and
+# histograms from different threads and processes merge by adding counts
+LATENCY_BOUNDS_MS = tuple(round(10 ** (exponent / 10), 6) for exponent in range(-20, 51))
+
+PERCENTILES = (50, 95, 99)
+
+def metric_key(name: str, labels: Dict[str, Any]) -> str:
+    """Series key in Prometheus notation, e.g. predictions_total{status="success"}."""
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{label}="{value}"' for label, value in sorted(labels.items())) + "}"
+
+def split_metric_key(key: str):
+    """Split a series key into its metric name and label block ('' when unlabelled)."""
+    name, _, labels = key.partition("{")
+    return name, labels[:-1] if labels else ""
+
+class LogHistogram:
+    """
+    Log-bucketed histogram over LATENCY_BOUNDS_MS.
+
+    Recording is one bisect and a few integer updates, and percentiles are
+    interpolated inside the matching bucket, so tail latencies are reported
+    with bounded relative error instead of being hidden by a running mean.
+    """
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        # One extra bucket for values above the largest bound
+        self.counts = [0] * (len(LATENCY_BOUNDS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, value: float):
+        self.counts[bisect.bisect_left(LATENCY_BOUNDS_MS, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "LogHistogram"):
+        for index, bucket_count in enumerate(other.counts):
+            self.counts[index] += bucket_count
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent: float) -> float:
+        """Estimate the given percentile by interpolating within its bucket."""
+        if self.count == 0:
+            return 0.0
+
+        rank = percent / 100 * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = LATENCY_BOUNDS_MS[index - 1] if index > 0 else 0.0
+                upper = LATENCY_BOUNDS_MS[index] if index < len(LATENCY_BOUNDS_MS) else self.max
+                estimate = lower + (upper - lower) * (rank - cumulative) / bucket_count
+                return min(estimate, self.max)
+            cumulative += bucket_count
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        """Count, mean, max and p50/p95/p99 in milliseconds."""
+        summary = {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count, 4) if self.count else 0.0,
+            "max_ms": round(self.max, 4)
+        }
+        for percent in PERCENTILES:
+            summary[f"p{percent}_ms"] = round(self.percentile(percent), 4)
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"counts": self.counts, "count": self.count, "sum": self.sum, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LogHistogram":
+        histogram = cls()
+        histogram.counts = list(data["counts"])
+        histogram.count = data["count"]
+        histogram.sum = data["sum"]
+        histogram.max = data["max"]
+        return histogram
+
+class _Shard:
+    """Counters and histograms written by a single thread."""
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, LogHistogram] = {}
+
+class MetricsSnapshot:
+    """Merged counters and histograms of one or more threads and processes."""
+    def __init__(self, counters: Optional[Dict[str, float]] = None,
+                 histograms: Optional[Dict[str, LogHistogram]] = None, processes: int = 1):
+        self.counters = counters or {}
+        self.histograms = histograms or {}
+        self.processes = processes
+
+    def merge(self, other: "MetricsSnapshot"):
+        for key, value in other.counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+        for key, histogram in other.histograms.items():
+            self.histograms.setdefault(key, LogHistogram()).merge(histogram)
+        self.processes += other.processes
+
+    def counter(self, name: str, **labels) -> float:
+        return self.counters.get(metric_key(name, labels), 0)
+
+    def histogram(self, name: str, **labels) -> LogHistogram:
+        return self.histograms.get(metric_key(name, labels)) or LogHistogram()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "counters": self.counters,
+            "histograms": {key: histogram.to_dict() for key, histogram in self.histograms.items()},
+            "processes": self.processes
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MetricsSnapshot":
+        return cls(
+            dict(data["counters"]),
+            {key: LogHistogram.from_dict(histogram) for key, histogram in data["histograms"].items()},
+            processes=data.get("processes", 1)
+        )
+
+class MetricsEngine:
+    """
+    Low-overhead metrics collection safe to use from any thread.
+
+    Every thread (the event loop, inference workers) writes to its own shard,
+    so updates never contend on a lock and are never lost; shards are only
+    merged when metrics are read. With a multiprocess directory configured,
+    each worker process periodically writes its totals to
+    <dir>/metrics_<pid>.json and reads merge the files of all workers, so
+    /metrics reports the whole server and not just the worker that answered.
+    """
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._shards_lock = threading.Lock()
+
+        self.multiprocess_dir: Optional[str] = None
+        self._export_task: Optional[asyncio.Task] = None
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add value to a counter."""
+        counters = self._shard().counters
+        key = metric_key(name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name: str, value_ms: float, **labels):
+        """Record a duration in milliseconds into a histogram."""
+        histograms = self._shard().histograms
+        key = metric_key(name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = LogHistogram()
+        histogram.record(value_ms)
+
+    def reset(self):
+        """
+        Clear every counter and histogram of this process.
+        Meant for moments without traffic, such as the end of the startup
+        warm-up; an update racing with the reset may be lost.
+        """
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.counters.clear()
+                shard.histograms.clear()
+
+    def local_snapshot(self) -> MetricsSnapshot:
+        """Merge the shards of every thread in this process."""
+        with self._shards_lock:
+            shards = list(self._shards)
+
+        snapshot = MetricsSnapshot()
+        for shard in shards:
+            # Copy first; the owning thread may add keys while we iterate
+            snapshot.merge(MetricsSnapshot(dict(shard.counters), dict(shard.histograms), processes=0))
+        return snapshot
+
+    def snapshot(self) -> MetricsSnapshot:
+        """This process' metrics merged with the last export of every other worker process."""
+        snapshot = self.local_snapshot()
+        if self.multiprocess_dir is None:
+            return snapshot
+
+        own_file = self._export_path()
+        for path in glob.glob(os.path.join(self.multiprocess_dir, "metrics_*.json")):
+            if path == own_file:
+                continue
+            try:
+                with open(path) as f:
+                    snapshot.merge(MetricsSnapshot.from_dict(json.load(f)))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Skipping unreadable metrics file {path}: {str(e)}")
+        return snapshot
+
+    def _export_path(self) -> str:
+        return os.path.join(self.multiprocess_dir, f"metrics_{os.getpid()}.json")
+
+    def export(self):
+        """Write this process' totals for the other workers to read."""
+        if self.multiprocess_dir is None:
+            return
+        path = self._export_path()
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.local_snapshot().to_dict(), f)
+        # Atomic replace so readers never see a partially written file
+        os.replace(temp_path, path)
+
+    async def start_multiprocess_export(self, directory: str, interval_s: float = 1.0):
+        """Export this process' metrics to the shared directory every interval_s seconds."""
+        os.makedirs(directory, exist_ok=True)
+        self.multiprocess_dir = directory
+        self._export_task = asyncio.create_task(self._export_loop(interval_s))
+        logger.info(f"Exporting metrics to {directory} every {interval_s}s for multi-worker aggregation")
+
+    async def stop_multiprocess_export(self):
+        """Stop the export loop after a final export."""
+        if self._export_task is None:
+            return
+        self._export_task.cancel()
+        try:
+            await self._export_task
+        except asyncio.CancelledError:
+            pass
+        self._export_task = None
+        self.export()
+
+    async def _export_loop(self, interval_s: float):
+        while True:
+            try:
+                self.export()
+            except OSError as e:
+                logger.warning(f"Metrics export failed: {str(e)}")
+            await asyncio.sleep(interval_s)
+
+def retire_process_metrics(directory: str, pid: int):
+    """
+    Fold the last export of a worker process that has exited into
+    <directory>/metrics_dead.json and remove its own file.
+
+    The totals of dead workers stay in every merge, as Prometheus counters
+    must not go backwards, but are counted as zero processes. Only the
+    supervising parent process calls this, so the read-modify-write of
+    metrics_dead.json has a single writer.
+    """
+    path = os.path.join(directory, f"metrics_{pid}.json")
+    dead_path = os.path.join(directory, "metrics_dead.json")
+    try:
+        with open(path) as f:
+            retired = MetricsSnapshot.from_dict(json.load(f))
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Dropping unreadable metrics file {path}: {str(e)}")
+        os.remove(path)
+        return
+
+    dead = MetricsSnapshot(processes=0)
+    try:
+        with open(dead_path) as f:
+            dead = MetricsSnapshot.from_dict(json.load(f))
+    except FileNotFoundError:
+        pass
+    retired.processes = 0
+    dead.merge(retired)
+
+    temp_path = f"{dead_path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(dead.to_dict(), f)
+    os.replace(temp_path, dead_path)
+    os.remove(path)
+
+def render_prometheus(snapshot: MetricsSnapshot, namespace: str = "mnist") -> str:
+    """Render a snapshot in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+
+    counters_by_name: Dict[str, List[str]] = {}
+    for key in sorted(snapshot.counters):
+        counters_by_name.setdefault(split_metric_key(key)[0], []).append(key)
+    for name, keys in counters_by_name.items():
+        lines.append(f"# TYPE {namespace}_{name} counter")
+        for key in keys:
+            lines.append(f"{namespace}_{key} {snapshot.counters[key]}")
+
+    histograms_by_name: Dict[str, List[str]] = {}
+    for key in sorted(snapshot.histograms):
+        histograms_by_name.setdefault(split_metric_key(key)[0], []).append(key)
+    for name, keys in histograms_by_name.items():
+        metric = f"{namespace}_{name}"
+        lines.append(f"# TYPE {metric} histogram")
+        for key in keys:
+            histogram = snapshot.histograms[key]
+            labels = split_metric_key(key)[1]
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BOUNDS_MS, histogram.counts):
+                cumulative += bucket_count
+                lines.append(f'{metric}_bucket{{{prefix}le="{bound:g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+            label_block = f"{{{labels}}}" if labels else ""
+            lines.append(f"{metric}_sum{label_block} {histogram.sum}")
+            lines.append(f"{metric}_count{label_block} {histogram.count}")
+
+    return "\n".join(lines) + "\n"
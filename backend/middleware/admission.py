@@ -0,0 +1,129 @@
+# middleware/admission.py
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Collection
+import global_variables.global_variable as gv
+
+# Priority classes of the prediction routes, highest priority first
+PRIORITY_CLASSES = ("interactive", "batch", "bulk")
+
+# Queue delay, as a multiple of the shedding target, at which each class is shed:
+# bulk work goes first, interactive predictions last
+SHED_THRESHOLD_FACTORS = {"interactive": 2.0, "batch": 1.0, "bulk": 0.5}
+
+def priority_class(path: str) -> Optional[str]:
+    """
+    Priority class of a prediction route, by URL path.
+    Other routes (health probes, metrics, model management) return None and are never limited.
+    """
+    if path.endswith("/predict"):
+        return "interactive"
+    if path.endswith("/predict/batch"):
+        return "batch"
+    if path.endswith("/predict/bulk") or path.endswith("/jobs"):
+        return "bulk"
+    return None
+
+def client_key(request, api_keys: Collection[str] = ()) -> str:
+    """
+    Identify the client by API key (X-API-Key or a bearer token) when the key
+    is one of the configured api_keys, else by its IP address.
+
+    Unknown keys are ignored: keys are not otherwise validated, so a client
+    sending a new key with every request would get a fresh rate limit bucket
+    each time and push other clients' buckets out of the limiter.
+    """
+    api_key = request.headers.get("x-api-key")
+    if api_key is None:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and token:
+            api_key = token
+    if api_key is not None and api_key in api_keys:
+        return f"key:{api_key}"
+    return f"ip:{request.client.host if request.client is not None else 'unknown'}"
+
+class TokenBucketLimiter:
+    """
+    Token bucket per client.
+
+    Each client may send rate_per_s requests per second on average, in bursts
+    of up to burst requests. Buckets refill lazily when a client is seen, so
+    idle clients cost nothing; once more than max_clients are tracked, the
+    least recently seen client is forgotten (and starts with a full bucket).
+    """
+    def __init__(self, rate_per_s: float, burst: Optional[float] = None, max_clients: int = 10000):
+        if rate_per_s <= 0:
+            raise ValueError("rate_per_s must be positive")
+        self.rate_per_s = rate_per_s
+        self.burst = max(1.0, burst if burst is not None else 2 * rate_per_s)
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()  # client -> [tokens, last refill time]
+
+    def acquire(self, client: str) -> float:
+        """Take a token for the client. Returns 0 when allowed, else the seconds until a token is available."""
+        now = time.monotonic()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [self.burst, now]
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate_per_s)
+            bucket[1] = now
+
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+        return (1.0 - bucket[0]) / self.rate_per_s
+
+class AdmissionController:
+    """
+    Turns prediction requests away at the edge before they queue for inference.
+
+    Adaptive shedding: when the inference executor's queue delay (how long the
+    oldest waiting call has waited for a worker) passes a class's threshold,
+    requests of that class get an immediate 503. Thresholds are multiples of
+    target_queue_delay_ms, so bulk work is shed first and interactive
+    predictions last. Rate limiting: each client (API key or IP) has a token
+    bucket; requests beyond it get a 429 with the time until the next token.
+
+    Shed requests don't consume tokens. Every decision is counted as
+    admission_total{priority, outcome}.
+    """
+    def __init__(self, rate_limiter: Optional[TokenBucketLimiter] = None, target_queue_delay_ms: float = 0):
+        if target_queue_delay_ms < 0:
+            raise ValueError("target_queue_delay_ms cannot be negative")
+        self.rate_limiter = rate_limiter
+        self.target_queue_delay_ms = target_queue_delay_ms
+
+    def check(self, priority: str, client: str, queue_delay_ms: float) -> Tuple[Optional[int], int]:
+        """
+        Decide on one request. Returns (None, 0) to admit it, or the status
+        code to reject it with and the Retry-After value in seconds.
+        """
+        if self.target_queue_delay_ms and queue_delay_ms > self.target_queue_delay_ms * SHED_THRESHOLD_FACTORS[priority]:
+            gv.metrics.inc("admission_total", priority=priority, outcome="shed")
+            return 503, 1
+
+        if self.rate_limiter is not None:
+            wait_s = self.rate_limiter.acquire(client)
+            if wait_s > 0:
+                gv.metrics.inc("admission_total", priority=priority, outcome="rate_limited")
+                return 429, max(1, math.ceil(wait_s))
+
+        gv.metrics.inc("admission_total", priority=priority, outcome="admitted")
+        return None, 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the limits and shedding thresholds; counters live in the metrics engine."""
+        return {
+            "rate_limit_per_s": self.rate_limiter.rate_per_s if self.rate_limiter is not None else None,
+            "rate_limit_burst": self.rate_limiter.burst if self.rate_limiter is not None else None,
+            "target_queue_delay_ms": self.target_queue_delay_ms,
+            "shed_thresholds_ms": {
+                priority: self.target_queue_delay_ms * SHED_THRESHOLD_FACTORS[priority]
+                for priority in PRIORITY_CLASSES
+            } if self.target_queue_delay_ms else None
+        }
@@ -1,19 +1,51 @@
 # middleware/middlewares.py
 import time
 import uuid
-from fastapi import HTTPException
+from typing import Optional
+from fastapi import HTTPException, Request, Header
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi import Depends
+from saved_models.model_registry import ModelNotFoundError
+from middleware.admission import priority_class, client_key
 from logger.logging import logger
+import global_variables.global_variable as gv
 
 # Security configuration
 security = HTTPBearer(auto_error=False)
 
 def add_middleware(app):
     """Add all middleware to the FastAPI app"""
+    # Rate limiting and load shedding; added first so it runs inside CORS and request logging,
+    # and rejected requests still get CORS headers and show up in the request metrics
+    @app.middleware("http")
+    async def admit_requests(request, call_next):
+        """
+        Reject prediction requests over their client's rate limit (429) or
+        shed them while the inference queue is too long (503), before they
+        read their body or wait for a worker.
+        """
+        if gv.admission_controller is None or gv.inference_executor is None:
+            return await call_next(request)
+        priority = priority_class(request.url.path)
+        if priority is None:
+            return await call_next(request)
+        
+        status_code, retry_after_s = gv.admission_controller.check(
+            priority, client_key(request, gv.api_keys), gv.inference_executor.queue_delay_ms()
+        )
+        if status_code is None:
+            return await call_next(request)
+        
+        detail = "Rate limit exceeded, please slow down" if status_code == 429 else "Server is overloaded, please retry later"
+        return JSONResponse(
+            status_code=status_code,
+            content={"error": detail, "status_code": status_code, "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")},
+            headers={"Retry-After": str(retry_after_s)}
+        )
+
     # Add CORS middleware for cross-origin requests
     app.add_middleware(
         CORSMiddleware,
@@ -39,8 +71,8 @@ def add_middleware(app):
         start_time = time.time()
         request_id = str(uuid.uuid4())
         
-        # Log incoming request
-        logger.info(f"Request {request_id}: {request.method} {request.url}")
+        # Log incoming request (DEBUG: the completion line below covers it at INFO)
+        logger.debug("Request %s: %s %s", request_id, request.method, request.url)
         
         # Process request
         response = await call_next(request)
@@ -48,8 +80,18 @@ def add_middleware(app):
         # Calculate processing time
         process_time = time.time() - start_time
         
-        # Log response
-        logger.info(f"Request {request_id} completed in {process_time:.3f}s - Status: {response.status_code}")
+        # Label by route template so /models/{model_name}/predict stays one series
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        gv.metrics.observe("request_duration_ms", process_time * 1000, path=path)
+        gv.metrics.inc("http_requests_total", path=path, status=response.status_code)
+        
+        # Log response; formatted by the log writer thread, and sampled per route
+        logger.info(
+            "Request %s: %s %s completed in %.3fs - Status: %d",
+            request_id, request.method, request.url.path, process_time, response.status_code,
+            extra={"route": path, "request_id": request_id, "status": response.status_code}
+        )
         
         # Add custom headers
         response.headers["X-Process-Time"] = str(process_time)
@@ -70,7 +112,8 @@ def add_exception_handlers(app):
                 "error": exc.detail,
                 "status_code": exc.status_code,
                 "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-            }
+            },
+            headers=getattr(exc, "headers", None)
         )
 
     @app.exception_handler(Exception)
@@ -99,4 +142,28 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     # if not validate_token(credentials.credentials):
     #     raise HTTPException(status_code=401, detail="Invalid authentication token")
     
-    return {"user": "authenticated"}
\ No newline at end of file
+    return {"user": "authenticated"}
+
+# Model routing dependency
+async def get_model_entry(
+    request: Request,
+    x_model_name: Optional[str] = Header(None, description="Name of the registry model to predict with")
+):
+    """
+    Resolve the registry model a prediction request is routed to.
+    The {model_name} path parameter wins over the X-Model-Name header;
+    requests naming neither are served by the default model.
+    Until startup warm-up has finished, requests are turned away with 503.
+    """
+    if gv.startup_state != "ready":
+        raise HTTPException(
+            status_code=503,
+            detail="Service is not ready to serve predictions, please retry later",
+            headers={"Retry-After": "1"}
+        )
+    
+    name = request.path_params.get("model_name") or x_model_name
+    try:
+        return gv.model_registry.get(name)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
@@ -1,20 +1,40 @@
 # routes/route_batch_predict.py
 import time
 import uuid
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
-from schema.input_schema import BatchImageData
-from schema.response_schema import BatchPredictionResponse, PredictionResponse
+from typing import Union, Literal
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Request, Query
+from schema.input_decoders import read_batch_request, BATCH_PREDICT_REQUEST_BODY
+from schema.response_schema import (
+    BatchPredictionResponse, PredictionResponse,
+    CompactBatchPredictionResponse, CompactPredictionResponse
+)
+from schema.response_encoders import FastJSONResponse, batch_payload
 from saved_models.predict import predict_batch_images, update_metrics
-from middleware.middlewares import get_current_user
+from saved_models.inference_executor import InferenceSaturatedError
+from middleware.middlewares import get_current_user, get_model_entry
 from logger.logging import logger
+import global_variables.global_variable as gv
 
 router = APIRouter()
 
-@router.post("/predict/batch", response_model=BatchPredictionResponse)
+@router.post(
+    "/predict/batch",
+    response_model=Union[BatchPredictionResponse, CompactBatchPredictionResponse],
+    openapi_extra=BATCH_PREDICT_REQUEST_BODY
+)
+@router.post(
+    "/models/{model_name}/predict/batch",
+    response_model=Union[BatchPredictionResponse, CompactBatchPredictionResponse],
+    openapi_extra=BATCH_PREDICT_REQUEST_BODY
+)
 async def predict_batch(
-    batch_data: BatchImageData,
+    request: Request,
     background_tasks: BackgroundTasks = BackgroundTasks(),
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    model = Depends(get_model_entry),
+    response_format: Literal["full", "compact"] = Query(
+        "full", description="'compact' returns probabilities as an array indexed by digit"
+    )
 ):
     """
     Batch prediction endpoint for processing multiple images efficiently.
@@ -22,67 +42,116 @@ async def predict_batch(
     This endpoint accepts multiple sets of normalized pixel values and processes
     them together for improved efficiency. Each image should be a list of 784
     normalized pixel values representing a 28x28 grayscale image.
+    
+    Images can also be sent packed: as a base64 `pixel_data` field or as
+    N x 784 raw uint8 bytes (`application/octet-stream`).
+    
+    The default model answers unless another registry model is selected with
+    the `X-Model-Name` header or the `/models/{model_name}/predict/batch` path.
     """
     request_id = str(uuid.uuid4())
     batch_start_time = time.time()
     
+    # Decode the body according to its content type
+    images = await read_batch_request(request)
+    
     try:
         # Validate batch size
-        if len(batch_data.images) > 10:
+        if len(images) > 10:
             raise HTTPException(
                 status_code=400,
                 detail="Batch size too large. Maximum 10 images per batch."
             )
         
-        if len(batch_data.images) == 0:
+        if len(images) == 0:
             raise HTTPException(
                 status_code=400,
                 detail="Batch cannot be empty. Please provide at least one image."
             )
         
-        # Run batch inference
-        results = predict_batch_images(batch_data.images, request_id)
+        # Run batch inference off the event loop
+        with gv.inference_executor.admit():
+            results = await gv.inference_executor.run(predict_batch_images, images, request_id, model.engine)
         
+        serialization_start = time.perf_counter()
         predictions = []
         for i, result in enumerate(results["predictions"]):
-            individual_prediction = PredictionResponse(
-                prediction=result["prediction"],
-                confidence=result["confidence"],
-                probabilities=result["probabilities"],
-                inference_time_ms=result["inference_time_ms"],
-                request_id=f"{request_id}-{i}"
-            )
-            predictions.append(individual_prediction)
+            # With fast serialization the whole body is encoded at once below
+            if not gv.fast_serialization:
+                if response_format == "compact":
+                    individual_prediction = CompactPredictionResponse(
+                        prediction=result["prediction"],
+                        confidence=result["confidence"],
+                        probabilities=[result["probabilities"][str(j)] for j in range(10)],
+                        inference_time_ms=result["inference_time_ms"],
+                        request_id=f"{request_id}-{i}"
+                    )
+                else:
+                    individual_prediction = PredictionResponse(
+                        prediction=result["prediction"],
+                        confidence=result["confidence"],
+                        probabilities=result["probabilities"],
+                        inference_time_ms=result["inference_time_ms"],
+                        request_id=f"{request_id}-{i}"
+                    )
+                predictions.append(individual_prediction)
             
             # Update metrics for each successful prediction
             background_tasks.add_task(
                 update_metrics,
                 result["prediction"],
-                0,  # Individual timing not tracked in batch
+                result["inference_time_ms"],  # Batch time averaged over its images
                 success=True
             )
+            background_tasks.add_task(
+                model.metrics.record,
+                result["prediction"],
+                result["confidence"],
+                result["inference_time_ms"]
+            )
         
-        # Log successful batch prediction
-        logger.info(f"Batch prediction {request_id}: processed {len(batch_data.images)} images in {results['total_inference_time_ms']:.2f}ms")
-        
-        return BatchPredictionResponse(
-            predictions=predictions,
-            batch_size=len(batch_data.images),
-            total_inference_time_ms=results["total_inference_time_ms"],
-            average_inference_time_ms=results["average_inference_time_ms"],
-            request_id=request_id
+        # Log successful batch prediction; formatted by the log writer thread, and sampled per route
+        logger.info(
+            "Batch prediction %s (%s): processed %d images in %.2fms",
+            request_id, model.name, len(images), results["total_inference_time_ms"],
+            extra={"route": request.scope["route"].path, "request_id": request_id, "model": model.name}
         )
         
+        if gv.fast_serialization:
+            # Encoded in one pass; FastAPI skips response_model validation for Response objects
+            response = FastJSONResponse(batch_payload(results, request_id, compact=response_format == "compact"))
+        else:
+            response_model = CompactBatchPredictionResponse if response_format == "compact" else BatchPredictionResponse
+            response = response_model(
+                predictions=predictions,
+                batch_size=len(images),
+                total_inference_time_ms=results["total_inference_time_ms"],
+                average_inference_time_ms=results["average_inference_time_ms"],
+                request_id=request_id
+            )
+        gv.metrics.observe("serialization_ms", (time.perf_counter() - serialization_start) * 1000, endpoint="batch")
+        
+        return response
+        
+    except HTTPException:
+        # Batch size validation errors keep their status code
+        raise
+        
+    except InferenceSaturatedError as e:
+        # Shed load quickly instead of queueing without bound
+        logger.warning(f"Batch prediction {request_id} rejected: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after_s)})
+        
     except ValueError as e:
         # Handle preprocessing errors
-        for _ in range(len(batch_data.images)):
+        for _ in range(len(images)):
             background_tasks.add_task(update_metrics, -1, 0, success=False)
         logger.error(f"Batch preprocessing error for request {request_id}: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
         
     except Exception as e:
         # Handle unexpected errors
-        for _ in range(len(batch_data.images)):
+        for _ in range(len(images)):
             background_tasks.add_task(update_metrics, -1, 0, success=False)
         logger.error(f"Batch prediction error for request {request_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Batch prediction failed due to internal error")
\ No newline at end of file
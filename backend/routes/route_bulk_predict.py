@@ -0,0 +1,125 @@
+# routes/route_bulk_predict.py
+import json
+import os
+import time
+import uuid
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from fastapi.responses import StreamingResponse
+from schema.input_decoders import iter_bulk_request, BULK_PREDICT_REQUEST_BODY
+from saved_models.predict import predict_batch_images, update_metrics
+from middleware.middlewares import get_current_user, get_model_entry
+from logger.logging import logger
+import global_variables.global_variable as gv
+
+router = APIRouter()
+
+BULK_CHUNK_SIZE = int(os.environ.get("BULK_CHUNK_SIZE", "256"))
+BULK_MAX_CHUNK_SIZE = 1024
+
+async def _stream_predictions(model, request_id: str, first_chunk, chunks):
+    """Run each chunk through the model and yield its results as NDJSON lines."""
+    start_time = time.time()
+    processed = 0
+    total_inference_time = 0.0
+    chunk, chunk_index = first_chunk, 0
+
+    try:
+        while chunk is not None:
+            try:
+                # Wait for capacity instead of failing mid-stream
+                results = await gv.inference_executor.run_admitted(
+                    predict_batch_images, chunk, f"{request_id}-{chunk_index}", model.engine
+                )
+            except Exception:
+                for _ in range(len(chunk)):
+                    update_metrics(-1, 0, success=False)
+                raise
+            total_inference_time += results["total_inference_time_ms"]
+
+            serialization_start = time.perf_counter()
+            lines = []
+            for result in results["predictions"]:
+                # Chunk time averaged over its images
+                update_metrics(result["prediction"], result["inference_time_ms"], success=True)
+                model.metrics.record(result["prediction"], result["confidence"], result["inference_time_ms"])
+                lines.append(json.dumps({
+                    "index": processed,
+                    "prediction": result["prediction"],
+                    "confidence": result["confidence"],
+                    "probabilities": [result["probabilities"][str(j)] for j in range(10)]
+                }))
+                processed += 1
+            body = "\n".join(lines) + "\n"
+            gv.metrics.observe("serialization_ms", (time.perf_counter() - serialization_start) * 1000, endpoint="bulk")
+            yield body
+
+            chunk_index += 1
+            chunk = await anext(chunks, None)
+
+    except ValueError as e:
+        # Malformed data after the first chunk; results already streamed stay valid
+        logger.error(f"Bulk prediction {request_id} stopped after {processed} images: {str(e)}")
+        yield json.dumps({"error": str(e), "processed": processed}) + "\n"
+        return
+
+    except Exception as e:
+        logger.error(f"Bulk prediction error for request {request_id}: {str(e)}")
+        yield json.dumps({"error": "Bulk prediction failed due to internal error", "processed": processed}) + "\n"
+        return
+
+    logger.info(f"Bulk prediction {request_id} ({model.name}): processed {processed} images in {chunk_index} chunks")
+    yield json.dumps({
+        "summary": {
+            "request_id": request_id,
+            "total_images": processed,
+            "chunks": chunk_index,
+            "total_inference_time_ms": round(total_inference_time, 2),
+            "total_time_ms": round((time.time() - start_time) * 1000, 2)
+        }
+    }) + "\n"
+
+@router.post(
+    "/predict/bulk",
+    response_class=StreamingResponse,
+    openapi_extra=BULK_PREDICT_REQUEST_BODY,
+    responses={200: {"content": {"application/x-ndjson": {}}, "description": "One prediction per line, then a summary line"}}
+)
+async def predict_bulk(
+    request: Request,
+    current_user = Depends(get_current_user),
+    model = Depends(get_model_entry),
+    chunk_size: Optional[int] = Query(None, ge=1, le=BULK_MAX_CHUNK_SIZE, description="Images per inference chunk")
+):
+    """
+    Bulk prediction endpoint for offline scoring of thousands of images.
+
+    Accepts NDJSON (one image per line), packed N x 784 uint8 bytes or an IDX3
+    image file. The upload is consumed incrementally and scored in fixed-size
+    chunks, and results are streamed back as NDJSON as each chunk finishes,
+    so memory stays bounded and clients receive results before the job ends.
+    The `X-Model-Name` header selects a registry model other than the default.
+    """
+    request_id = str(uuid.uuid4())
+    chunks = iter_bulk_request(request, chunk_size or BULK_CHUNK_SIZE)
+
+    if gv.inference_executor.is_saturated():
+        raise HTTPException(
+            status_code=503,
+            detail="Inference queue is full, please retry later",
+            headers={"Retry-After": str(gv.inference_executor.retry_after_s)}
+        )
+
+    # Decode the first chunk up front so a malformed upload fails with a 400
+    # instead of a stream that breaks on its first line
+    try:
+        first_chunk = await anext(chunks)
+    except StopAsyncIteration:
+        raise HTTPException(status_code=400, detail="Bulk request contains no images")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return StreamingResponse(
+        _stream_predictions(model, request_id, first_chunk, chunks),
+        media_type="application/x-ndjson"
+    )
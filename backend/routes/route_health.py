@@ -1,7 +1,7 @@
 # routes/route_health.py
 import time
-from fastapi import APIRouter
-from schema.response_schema import HealthResponse
+from fastapi import APIRouter, Response
+from schema.response_schema import HealthResponse, ProbeResponse
 # Fixed import path
 import global_variables.global_variable as gv
 
@@ -17,5 +17,37 @@ async def health_check():
         status="healthy" if gv.model is not None else "unhealthy",
         timestamp=time.strftime("%Y-%m-%d %H:%M:%S"),
         model_loaded=gv.model is not None,
-        model_info=gv.model_info
+        model_info=gv.model_info,
+        startup=gv.startup_timings or None
+    )
+
+@router.get("/health/live", response_model=ProbeResponse)
+async def liveness_probe(response: Response):
+    """
+    Liveness probe: the process is up and its event loop answers.
+    Passes while models are still loading; fails only when startup failed,
+    so an orchestrator restarts the process instead of waiting forever.
+    """
+    failed = gv.startup_state.startswith("failed")
+    if failed:
+        response.status_code = 503
+    return ProbeResponse(
+        status="startup failed" if failed else "ok",
+        startup_state=gv.startup_state,
+        timestamp=time.strftime("%Y-%m-%d %H:%M:%S")
+    )
+
+@router.get("/health/ready", response_model=ProbeResponse)
+async def readiness_probe(response: Response):
+    """
+    Readiness probe: models are loaded and warmed up, so traffic can be routed here.
+    Returns 503 during startup warm-up, after a failed startup and while shutting down.
+    """
+    ready = gv.startup_state == "ready"
+    if not ready:
+        response.status_code = 503
+    return ProbeResponse(
+        status="ok" if ready else "not ready",
+        startup_state=gv.startup_state,
+        timestamp=time.strftime("%Y-%m-%d %H:%M:%S")
     )
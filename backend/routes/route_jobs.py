@@ -0,0 +1,138 @@
+# routes/route_jobs.py
+import asyncio
+import os
+import uuid
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, Query
+from schema.input_decoders import save_packed_request, JOB_REQUEST_BODY
+from schema.response_schema import JobStatusResponse, JobResultsResponse
+from schema.response_encoders import FastJSONResponse
+from saved_models.job_store import JobNotFoundError
+from middleware.middlewares import get_current_user, get_model_entry
+from logger.logging import logger
+import global_variables.global_variable as gv
+
+router = APIRouter()
+
+JOB_CHUNK_SIZE = int(os.environ.get("JOB_CHUNK_SIZE", "256"))
+JOB_MAX_CHUNK_SIZE = 1024
+JOB_MAX_IMAGES = int(os.environ.get("JOB_MAX_IMAGES", "1000000"))
+JOB_RESULTS_MAX_PAGE = 10000
+
+def _job_store():
+    if gv.job_manager is None:
+        raise HTTPException(status_code=503, detail="Prediction jobs are disabled on this server")
+    return gv.job_manager.store
+
+async def _get_job(job_id: str):
+    try:
+        return await asyncio.to_thread(_job_store().get_job, job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+def _remove_upload(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _job_status(job) -> JobStatusResponse:
+    return JobStatusResponse(
+        job_id=job["job_id"],
+        status=job["status"],
+        model_name=job["model_name"],
+        total_images=job["total_images"],
+        processed_images=job["processed_images"],
+        progress=round(job["processed_images"] / job["total_images"], 4),
+        chunk_size=job["chunk_size"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"],
+        finished_at=job["finished_at"],
+        error=job["error"]
+    )
+
+@router.post("/jobs", response_model=JobStatusResponse, status_code=202, openapi_extra=JOB_REQUEST_BODY)
+async def submit_job(
+    request: Request,
+    response: Response,
+    current_user = Depends(get_current_user),
+    model = Depends(get_model_entry),
+    chunk_size: Optional[int] = Query(None, ge=1, le=JOB_MAX_CHUNK_SIZE, description="Images per inference chunk and checkpoint")
+):
+    """
+    Submit a dataset for background scoring and get a job ID back right away.
+
+    Accepts packed N x 784 uint8 bytes or an IDX3 image file. The upload is
+    stored on the server and scored in chunks by background workers, which
+    checkpoint every chunk, so a restart resumes the job instead of losing it.
+    Poll `/jobs/{job_id}` for progress and page through `/jobs/{job_id}/results`.
+    The `X-Model-Name` header selects a registry model other than the default.
+    """
+    store = _job_store()
+    job_id = str(uuid.uuid4())
+    try:
+        total_images = await save_packed_request(request, store.images_path(job_id), JOB_MAX_IMAGES)
+        job = await asyncio.to_thread(store.create_job, job_id, model.name, chunk_size or JOB_CHUNK_SIZE)
+    except ValueError as e:
+        await asyncio.to_thread(_remove_upload, store.images_path(job_id))
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        await asyncio.to_thread(_remove_upload, store.images_path(job_id))
+        raise
+
+    gv.job_manager.notify()
+    logger.info(f"Job {job_id} ({model.name}) queued with {total_images} images")
+    response.headers["Location"] = f"/jobs/{job_id}"
+    return _job_status(job)
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(job_id: str):
+    """
+    Status and progress of a prediction job.
+    Results are available up to processed_images while the job is still running.
+    """
+    return _job_status(await _get_job(job_id))
+
+@router.get("/jobs/{job_id}/results", response_model=JobResultsResponse)
+async def get_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0, description="Index of the first image to return"),
+    limit: int = Query(1000, ge=1, le=JOB_RESULTS_MAX_PAGE, description="Maximum number of results to return")
+):
+    """
+    Page through a job's predictions in image order.
+
+    Follow next_offset until it is None. While the job is running, a page
+    ends at the last checkpointed image and next_offset points past it;
+    poll it again for the next results.
+    """
+    job = await _get_job(job_id)
+    results = await asyncio.to_thread(_job_store().get_results, job_id, offset, limit)
+    end = offset + len(results)
+    # A failed job never gets past its last checkpoint
+    last_index = job["processed_images"] if job["status"] == "failed" else job["total_images"]
+    next_offset = end if end < last_index else None
+
+    payload = {
+        "job_id": job_id,
+        "status": job["status"],
+        "offset": offset,
+        "results": results,
+        "next_offset": next_offset
+    }
+    if gv.fast_serialization:
+        return FastJSONResponse(payload)
+    return JobResultsResponse(**payload)
+
+@router.delete("/jobs/{job_id}", status_code=204)
+async def delete_job(job_id: str, current_user = Depends(get_current_user)):
+    """
+    Delete a job with its uploaded images and results.
+    A running job is cancelled after its current chunk.
+    """
+    try:
+        await asyncio.to_thread(_job_store().delete_job, job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    logger.info(f"Job {job_id} deleted")
+    return Response(status_code=204)
@@ -0,0 +1,101 @@
+# routes/route_live.py
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, WebSocket
+from schema.input_decoders import decode_canvas_delta
+from schema.response_encoders import dumps
+from saved_models.live_sessions import LiveSessionLimitError
+from saved_models.model_registry import ModelNotFoundError
+from middleware.admission import client_key
+from logger.logging import logger
+import global_variables.global_variable as gv
+
+router = APIRouter()
+
+async def _reject(websocket: WebSocket, code: int, reason: str):
+    """Accept and immediately close, so browsers see the close code and reason instead of a failed handshake."""
+    await websocket.accept()
+    await websocket.close(code=code, reason=reason)
+
+@router.websocket("/predict/live")
+@router.websocket("/models/{model_name}/predict/live")
+async def live_predict(websocket: WebSocket, model_name: Optional[str] = None):
+    """
+    Live predict-as-you-draw over a WebSocket.
+
+    The server keeps the session's 28x28 canvas; the client sends only the
+    pixels it changed, as JSON {"pixels": [[index, value], ...], "clear": false}
+    (row-major indices, values in [0, 1]) or as binary 3-byte records of a
+    little-endian uint16 index and a uint8 value (an empty binary message
+    clears the canvas). Updates are debounced and coalesced, and the server
+    pushes {"type": "prediction", ...} only when the prediction changes.
+    "sequence" in a prediction counts the updates it reflects.
+
+    Close codes: 1013 when the server is not ready, overloaded or at its
+    session limit, 1008 for an unknown model and 1001 when the session was
+    idle for too long.
+    """
+    if gv.live_sessions is None:
+        await _reject(websocket, 1013, "Live sessions are disabled on this server")
+        return
+    if gv.startup_state != "ready":
+        await _reject(websocket, 1013, "Service is not ready to serve predictions, please retry later")
+        return
+
+    try:
+        model = gv.model_registry.get(model_name or websocket.headers.get("x-model-name"))
+    except ModelNotFoundError as e:
+        await _reject(websocket, 1008, str(e))
+        return
+
+    client = client_key(websocket, gv.api_keys)
+    if gv.admission_controller is not None and gv.inference_executor is not None:
+        status_code, _ = gv.admission_controller.check(
+            "interactive", client, gv.inference_executor.queue_delay_ms()
+        )
+        if status_code is not None:
+            reason = "Rate limit exceeded, please slow down" if status_code == 429 else "Server is overloaded, please retry later"
+            await _reject(websocket, 1013, reason)
+            return
+
+    try:
+        session = gv.live_sessions.open(websocket, client, model.name)
+    except LiveSessionLimitError as e:
+        await _reject(websocket, 1013, str(e))
+        return
+
+    predictions = None
+    try:
+        await websocket.accept()
+        await websocket.send_text(dumps({
+            "type": "ready",
+            "session_id": session.session_id,
+            "model_name": model.name,
+            "debounce_ms": gv.live_sessions.debounce_ms,
+            "idle_timeout_s": gv.live_sessions.idle_timeout_s
+        }).decode())
+        logger.info(f"Live session {session.session_id} ({model.name}) opened")
+        predictions = asyncio.create_task(gv.live_sessions.run_predictions(session))
+
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            try:
+                update = decode_canvas_delta(message.get("text"), message.get("bytes"))
+            except ValueError as e:
+                # A bad update is reported and skipped; the canvas is left as it was
+                await websocket.send_text(dumps({"type": "error", "error": str(e)}).decode())
+                continue
+            gv.metrics.inc("live_updates_total")
+            session.apply(*update)
+    finally:
+        # Released before awaiting anything, which raises again if this handler itself was cancelled
+        gv.live_sessions.close(session)
+        logger.info(
+            f"Live session {session.session_id} closed after {session.sequence} updates "
+            f"and {session.predictions} predictions"
+        )
+        if predictions is not None:
+            predictions.cancel()
+            await asyncio.gather(predictions, return_exceptions=True)
@@ -1,27 +1,151 @@
 # routes/route_metrics.py
+import asyncio
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
 from schema.response_schema import MetricsResponse
+from metrics.metrics_engine import render_prometheus, split_metric_key
+from logger.logging import get_logging_stats
+from middleware.admission import PRIORITY_CLASSES
 # Fixed import path
 import global_variables.global_variable as gv
 
 router = APIRouter()
 
+def _cascade_stats(snapshot):
+    """Escalation rate and estimated latency saved by confidence cascades, None when none served."""
+    answered_fast = snapshot.counter("cascade_images_total", stage="fast")
+    escalated = snapshot.counter("cascade_images_total", stage="escalation")
+    images = answered_fast + escalated
+    if images == 0:
+        return None
+    
+    # Negative when the cascade cost more than sending every image to the escalation stage
+    latency_saved_ms = (
+        snapshot.counter("cascade_escalation_only_estimate_ms_total") - snapshot.counter("cascade_time_ms_total")
+    )
+    return {
+        "images": int(images),
+        "answered_by_fast_model": int(answered_fast),
+        "escalated": int(escalated),
+        "escalation_rate": round(escalated / images, 4),
+        "latency_saved_ms_total": round(latency_saved_ms, 2),
+        "average_latency_saved_ms": round(latency_saved_ms / images, 4)
+    }
+
+def _buffer_pool_stats(snapshot):
+    """Buffer pool reuse counters, None when pooling is disabled."""
+    if gv.buffer_pool is None:
+        return None
+    
+    reuses = int(snapshot.counter("buffer_pool_total", outcome="reuse"))
+    allocations = int(snapshot.counter("buffer_pool_total", outcome="allocation"))
+    requests = reuses + allocations
+    return {
+        **gv.buffer_pool.get_stats(),
+        "reuses": reuses,
+        "allocations": allocations,
+        "reuse_rate": round(reuses / requests, 4) if requests else 0.0
+    }
+
+def _admission_stats(snapshot):
+    """Admitted, rate limited and shed prediction requests per priority class, None when disabled."""
+    if gv.admission_controller is None:
+        return None
+    
+    return {
+        **gv.admission_controller.get_stats(),
+        "requests": {
+            priority: {
+                outcome: int(snapshot.counter("admission_total", priority=priority, outcome=outcome))
+                for outcome in ("admitted", "rate_limited", "shed")
+            }
+            for priority in PRIORITY_CLASSES
+        }
+    }
+
+async def _job_stats(snapshot):
+    """Job workers, jobs per status and images scored by jobs, None when jobs are disabled."""
+    if gv.job_manager is None:
+        return None
+    
+    # Counting jobs queries the store, which can wait on a worker thread's write
+    return {
+        **await asyncio.to_thread(gv.job_manager.get_stats),
+        "images_scored": int(snapshot.counter("job_images_total")),
+        "completed_jobs": int(snapshot.counter("jobs_total", status="completed")),
+        "failed_jobs": int(snapshot.counter("jobs_total", status="failed"))
+    }
+
+def _live_stats(snapshot):
+    """Live sessions, canvas updates and predictions run and pushed, None when live sessions are disabled."""
+    if gv.live_sessions is None:
+        return None
+    
+    predictions = int(snapshot.counter("live_predictions_total"))
+    return {
+        **gv.live_sessions.get_stats(),
+        "sessions": {
+            outcome: int(snapshot.counter("live_sessions_total", outcome=outcome))
+            for outcome in ("opened", "rejected", "evicted")
+        },
+        "updates": int(snapshot.counter("live_updates_total")),
+        "predictions": predictions,
+        "pushes": int(snapshot.counter("live_pushes_total")),
+        "updates_per_prediction": round(snapshot.counter("live_updates_total") / predictions, 3) if predictions else 0.0
+    }
+
 @router.get("/metrics", response_model=MetricsResponse)
 async def get_metrics():
     """
     Endpoint to retrieve API usage metrics.
     Essential for monitoring performance and usage patterns in production.
+    
+    Counters and latency percentiles cover every worker process when
+    METRICS_MULTIPROC_DIR is set; executor, batching and cache statistics
+    are those of the worker answering the request.
     """
-    success_rate = (
-        gv.prediction_metrics["successful_predictions"] / gv.prediction_metrics["total_predictions"]
-        if gv.prediction_metrics["total_predictions"] > 0 else 0.0
-    )
+    snapshot = gv.metrics.snapshot()
+    successful = int(snapshot.counter("predictions_total", status="success"))
+    failed = int(snapshot.counter("predictions_total", status="failure"))
+    total = successful + failed
+    success_rate = successful / total if total > 0 else 0.0
     
     return MetricsResponse(
-        total_predictions=gv.prediction_metrics["total_predictions"],
-        successful_predictions=gv.prediction_metrics["successful_predictions"],
-        failed_predictions=gv.prediction_metrics["failed_predictions"],
+        total_predictions=total,
+        successful_predictions=successful,
+        failed_predictions=failed,
         success_rate=round(success_rate, 4),
-        average_inference_time=round(gv.prediction_metrics["average_inference_time"], 3),
-        predictions_by_class=gv.prediction_metrics["predictions_by_class"]
-    )
\ No newline at end of file
+        average_inference_time=round(snapshot.histogram("prediction_time_ms").summary()["mean_ms"], 3),
+        predictions_by_class={str(i): int(snapshot.counter("predictions_by_class_total", digit=i)) for i in range(10)},
+        latency={
+            key: histogram.summary()
+            for key, histogram in sorted(snapshot.histograms.items())
+            if split_metric_key(key)[0] != "request_duration_ms"
+        },
+        request_latency={
+            split_metric_key(key)[1].partition('path="')[2].rstrip('"'): histogram.summary()
+            for key, histogram in sorted(snapshot.histograms.items())
+            if split_metric_key(key)[0] == "request_duration_ms"
+        },
+        worker_processes=snapshot.processes,
+        executor=gv.inference_executor.get_stats() if gv.inference_executor is not None else None,
+        batching=gv.batch_scheduler.get_stats() if gv.batch_scheduler is not None else None,
+        cache=gv.prediction_cache.get_stats() if gv.prediction_cache is not None else None,
+        jobs=await _job_stats(snapshot),
+        live=_live_stats(snapshot),
+        admission=_admission_stats(snapshot),
+        cascade=_cascade_stats(snapshot),
+        buffer_pool=_buffer_pool_stats(snapshot),
+        logging=get_logging_stats()
+    )
+
+@router.get("/metrics/prometheus", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    """
+    Metrics in the Prometheus text exposition format, for scraping.
+    Histograms use log-spaced buckets shared by all series and workers.
+    """
+    return PlainTextResponse(
+        render_prometheus(gv.metrics.snapshot()),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
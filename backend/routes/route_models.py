@@ -0,0 +1,96 @@
+# routes/route_models.py
+from fastapi import APIRouter, HTTPException, Depends
+from schema.input_schema import ModelLoadRequest
+from schema.response_schema import ModelStatusResponse, ModelListResponse
+from saved_models.model_registry import ModelNotFoundError
+from middleware.middlewares import get_current_user
+import global_variables.global_variable as gv
+
+router = APIRouter()
+
+@router.get("/models", response_model=ModelListResponse)
+async def list_models():
+    """
+    List every model in the registry with its status and per-model metrics.
+    Compare latency percentiles and confidence histograms here when A/B testing models;
+    they cover every worker process when METRICS_MULTIPROC_DIR is set.
+    """
+    return ModelListResponse(
+        default_model=gv.model_registry.default_name,
+        models=[ModelStatusResponse(**model) for model in gv.model_registry.describe_all()]
+    )
+
+@router.get("/models/{model_name}", response_model=ModelStatusResponse)
+async def get_model(model_name: str):
+    """
+    Status, model info and metrics of a single registry model.
+    Poll this after a load request until the status is 'ready'.
+    """
+    try:
+        return ModelStatusResponse(**gv.model_registry.describe(model_name))
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.put("/models/{model_name}", response_model=ModelStatusResponse, status_code=202)
+async def load_model_version(model_name: str, load_request: ModelLoadRequest, current_user = Depends(get_current_user)):
+    """
+    Load a model (or a new version of one) under the given name without downtime.
+
+    The model is loaded and warmed up in the background while the current
+    version keeps serving, then swapped in atomically. Cached predictions of
+    the replaced version are invalidated.
+
+    With `cascade`, a cheap model answers confident images and only the rest
+    run on this model; reloading with another threshold tunes the cascade.
+    """
+    try:
+        model_path = gv.model_registry.resolve_path(load_request.model_path)
+        cascade = None
+        if load_request.cascade is not None:
+            cascade = load_request.cascade.model_dump()
+            cascade["fast_model_path"] = gv.model_registry.resolve_path(cascade["fast_model_path"])
+            cascade["ensemble_model_paths"] = [
+                gv.model_registry.resolve_path(path) for path in cascade["ensemble_model_paths"]
+            ]
+        gv.model_registry.load_in_background(
+            model_name,
+            model_path,
+            backend=load_request.backend,
+            variant=load_request.variant,
+            make_default=load_request.make_default,
+            cascade=cascade
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return ModelStatusResponse(**gv.model_registry.describe(model_name))
+
+@router.post("/models/{model_name}/default", response_model=ModelStatusResponse)
+async def set_default_model(model_name: str, current_user = Depends(get_current_user)):
+    """
+    Route requests that don't name a model to the given registry model.
+    """
+    try:
+        gv.model_registry.set_default(model_name)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return ModelStatusResponse(**gv.model_registry.describe(model_name))
+
+@router.delete("/models/{model_name}")
+async def unload_model(model_name: str, current_user = Depends(get_current_user)):
+    """
+    Remove a model from the registry. The default model cannot be removed.
+    """
+    try:
+        gv.model_registry.unload(model_name)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return {"message": f"Model '{model_name}' unloaded"}
@@ -1,20 +1,37 @@
 # routes/route_predict.py
 import time
 import uuid
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
-from schema.input_schema import ImageData
-from schema.response_schema import PredictionResponse
+from typing import Union, Literal
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Request, Query
+from schema.input_decoders import read_image_request, PREDICT_REQUEST_BODY
+from schema.response_schema import PredictionResponse, CompactPredictionResponse
+from schema.response_encoders import FastJSONResponse, prediction_payload
 from saved_models.predict import predict_single_image, update_metrics
-from middleware.middlewares import get_current_user
+from saved_models.inference_executor import InferenceSaturatedError
+from middleware.middlewares import get_current_user, get_model_entry
+import global_variables.global_variable as gv
 from logger.logging import logger
 
 router = APIRouter()
 
-@router.post("/predict", response_model=PredictionResponse)
+@router.post(
+    "/predict",
+    response_model=Union[PredictionResponse, CompactPredictionResponse],
+    openapi_extra=PREDICT_REQUEST_BODY
+)
+@router.post(
+    "/models/{model_name}/predict",
+    response_model=Union[PredictionResponse, CompactPredictionResponse],
+    openapi_extra=PREDICT_REQUEST_BODY
+)
 async def predict_digit(
-    image_data: ImageData,
+    request: Request,
     background_tasks: BackgroundTasks = BackgroundTasks(),
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    model = Depends(get_model_entry),
+    response_format: Literal["full", "compact"] = Query(
+        "full", description="'compact' returns probabilities as an array indexed by digit"
+    )
 ):
     """
     Main prediction endpoint for digit classification.
@@ -22,13 +39,47 @@ async def predict_digit(
     This endpoint accepts normalized pixel values for a 28x28 grayscale image,
     runs inference using a trained neural network, and returns prediction
     results with confidence scores.
+    
+    Besides the JSON float list, the image can be sent as a base64-packed
+    `pixel_data` field, as 784 raw uint8 bytes (`application/octet-stream`)
+    or as a PNG upload (`image/png`).
+    
+    The default model answers unless another registry model is selected with
+    the `X-Model-Name` header or the `/models/{model_name}/predict` path.
     """
     request_id = str(uuid.uuid4())
     start_time = time.time()
     
+    # Decode the body according to its content type
+    pixel_values = await read_image_request(request)
+    
     try:
-        # Run inference
-        result = predict_single_image(image_data.pixel_values, request_id)
+        # Serve repeated images from the prediction cache
+        result = None
+        if gv.prediction_cache is not None:
+            cache_key = gv.prediction_cache.make_key(pixel_values, model.version)
+            result = await gv.prediction_cache.get(cache_key, model.version)
+            if result is not None:
+                result["inference_time_ms"] = 0.0
+        
+        if result is None:
+            # Run inference off the event loop, micro-batched with concurrent requests when enabled
+            with gv.inference_executor.admit():
+                if gv.batch_scheduler is not None:
+                    result = await gv.batch_scheduler.submit(pixel_values, model.engine)
+                else:
+                    result = await gv.inference_executor.run(predict_single_image, pixel_values, request_id, model.engine)
+            
+            if gv.prediction_cache is not None:
+                await gv.prediction_cache.put(cache_key, result, model.version)
+            
+            # Per-model latency and confidence distributions
+            background_tasks.add_task(
+                model.metrics.record,
+                result["prediction"],
+                result["confidence"],
+                result["inference_time_ms"]
+            )
         
         # Update metrics in background
         background_tasks.add_task(
@@ -38,17 +89,42 @@ async def predict_digit(
             success=True
         )
         
-        # Log successful prediction
-        logger.info(f"Prediction {request_id}: digit={result['prediction']}, confidence={result['confidence']:.4f}")
-        
-        return PredictionResponse(
-            prediction=result["prediction"],
-            confidence=result["confidence"],
-            probabilities=result["probabilities"],
-            inference_time_ms=result["inference_time_ms"],
-            request_id=request_id
+        # Log successful prediction; formatted by the log writer thread, and sampled per route
+        logger.info(
+            "Prediction %s (%s): digit=%d, confidence=%.4f",
+            request_id, model.name, result["prediction"], result["confidence"],
+            extra={"route": request.scope["route"].path, "request_id": request_id, "model": model.name}
         )
         
+        serialization_start = time.perf_counter()
+        if gv.fast_serialization:
+            # Encoded here in one pass; FastAPI skips response_model validation for Response objects
+            response = FastJSONResponse(prediction_payload(result, request_id, compact=response_format == "compact"))
+        elif response_format == "compact":
+            response = CompactPredictionResponse(
+                prediction=result["prediction"],
+                confidence=result["confidence"],
+                probabilities=[result["probabilities"][str(i)] for i in range(10)],
+                inference_time_ms=result["inference_time_ms"],
+                request_id=request_id
+            )
+        else:
+            response = PredictionResponse(
+                prediction=result["prediction"],
+                confidence=result["confidence"],
+                probabilities=result["probabilities"],
+                inference_time_ms=result["inference_time_ms"],
+                request_id=request_id
+            )
+        gv.metrics.observe("serialization_ms", (time.perf_counter() - serialization_start) * 1000, endpoint="predict")
+        
+        return response
+        
+    except InferenceSaturatedError as e:
+        # Shed load quickly instead of queueing without bound
+        logger.warning(f"Prediction {request_id} rejected: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after_s)})
+        
     except ValueError as e:
         # Handle preprocessing errors
         background_tasks.add_task(update_metrics, -1, 0, success=False)
@@ -14,9 +14,16 @@ async def root():
         "status": "active",
         "endpoints": {
             "health": "/health",
+            "liveness": "/health/live",
+            "readiness": "/health/ready",
             "predict": "/predict",
             "batch_predict": "/predict/batch",
+            "bulk_predict": "/predict/bulk",
+            "jobs": "/jobs",
+            "live_predict": "/predict/live",
+            "models": "/models",
             "metrics": "/metrics",
+            "prometheus_metrics": "/metrics/prometheus",
             "docs": "/docs"
         }
     }
\ No newline at end of file
@@ -0,0 +1,175 @@
+# saved_models/batch_scheduler.py
+import asyncio
+import time
+from typing import List, Dict, Any, Optional, Union
+import numpy as np
+from saved_models.predict import predict_batch_images
+from logger.logging import logger
+import global_variables.global_variable as gv
+
+class MicroBatchScheduler:
+    """
+    Dynamic micro-batching scheduler for single-image predictions.
+
+    Concurrent /predict requests are queued and grouped into one batch tensor,
+    so the model runs a single forward pass per group instead of one batch-of-1
+    pass per request. A batch is dispatched as soon as it reaches
+    max_batch_size or the oldest queued request has waited max_wait_ms.
+    Requests routed to different models are split into one batch per model.
+    Forward passes run on the given InferenceExecutor, so a new batch can be
+    collected while the previous one is still running.
+    """
+    def __init__(self, executor, max_batch_size: int = 32, max_wait_ms: float = 2.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms cannot be negative")
+
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._batch_tasks = set()
+
+        # Tuning metrics: batch size histogram and queue wait statistics
+        self.batch_size_histogram = {str(i): 0 for i in range(1, max_batch_size + 1)}
+        self.total_batches = 0
+        self.total_requests = 0
+        self.max_queue_depth = 0
+        self.total_queue_wait_ms = 0.0
+        self.max_queue_wait_ms = 0.0
+
+    async def start(self):
+        """Start the background batching loop on the running event loop."""
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+        logger.info(
+            f"Micro-batch scheduler started (max_batch_size={self.max_batch_size}, "
+            f"max_wait_ms={self.max_wait_ms})"
+        )
+
+    async def stop(self):
+        """Stop the batching loop and fail any requests still waiting in the queue."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        # Let batches already handed to the executor finish
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+
+        while not self._queue.empty():
+            _, future, _, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Prediction scheduler is shutting down"))
+        logger.info("Micro-batch scheduler stopped")
+
+    async def submit(self, pixel_values: Union[List[float], np.ndarray], model=None) -> Dict[str, Any]:
+        """
+        Queue a single image for batched inference and wait for its result.
+
+        The image runs on the given model, or on the default gv.model when none
+        is given. Returns the same result dictionary as predict_single_image.
+        """
+        if self._worker is None:
+            raise RuntimeError("Prediction scheduler is not running")
+
+        # Validate before queueing so one bad image cannot fail a whole batch
+        if len(pixel_values) != 784:
+            raise ValueError(f"Expected 784 pixel values, got {len(pixel_values)}")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((pixel_values, future, time.perf_counter(), model))
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+        return await future
+
+    async def _run(self):
+        """Collect queued requests into batches and dispatch them."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1000
+
+            while len(batch) < self.max_batch_size:
+                # Take everything already queued before waiting for more
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Requests for different models cannot share a forward pass
+            batches_by_model = {}
+            for item in batch:
+                batches_by_model.setdefault(id(item[3]), []).append(item)
+
+            for model_batch in batches_by_model.values():
+                task = asyncio.create_task(self._process_batch(model_batch))
+                self._batch_tasks.add(task)
+                task.add_done_callback(self._batch_tasks.discard)
+
+    async def _process_batch(self, batch):
+        """Run one forward pass for the batch and resolve each caller's future."""
+        # Drop requests whose callers have already gone away
+        batch = [item for item in batch if not item[1].done()]
+        if not batch:
+            return
+
+        dispatch_time = time.perf_counter()
+        for _, _, enqueued_at, _ in batch:
+            wait_ms = (dispatch_time - enqueued_at) * 1000
+            gv.metrics.observe("queue_wait_ms", wait_ms, queue="microbatch")
+            self.total_queue_wait_ms += wait_ms
+            self.max_queue_wait_ms = max(self.max_queue_wait_ms, wait_ms)
+
+        self.total_batches += 1
+        self.total_requests += len(batch)
+        self.batch_size_histogram[str(len(batch))] += 1
+
+        try:
+            results = await self.executor.run(
+                predict_batch_images, [item[0] for item in batch], f"microbatch-{self.total_batches}", batch[0][3]
+            )
+        except Exception as e:
+            logger.error(f"Micro-batch of {len(batch)} images failed: {str(e)}")
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _, _), result in zip(batch, results["predictions"]):
+            if not future.done():
+                # Each caller waited for the whole batch forward pass
+                result["inference_time_ms"] = results["total_inference_time_ms"]
+                future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return queue depth, batch size histogram and queue wait statistics."""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "total_batches": self.total_batches,
+            "total_requests": self.total_requests,
+            "average_batch_size": round(self.total_requests / self.total_batches, 3) if self.total_batches else 0.0,
+            "average_queue_wait_ms": round(self.total_queue_wait_ms / self.total_requests, 3) if self.total_requests else 0.0,
+            "max_queue_wait_ms": round(self.max_queue_wait_ms, 3),
+            "batch_size_histogram": self.batch_size_histogram
+        }
@@ -0,0 +1,56 @@
+# saved_models/buffer_pool.py
+import threading
+from typing import Dict, Any, Tuple
+import numpy as np
+import global_variables.global_variable as gv
+
+class BufferPool:
+    """
+    Reusable per-thread arrays for the request hot path.
+
+    Preprocessing copies pixel data into a pooled input buffer, postprocessing
+    writes softmax outputs into pooled output buffers and the numpy engine
+    keeps its im2col and activation buffers here, so a worker thread that has
+    served a batch size once serves it again without allocating.
+
+    Buffers are kept per thread, since inference workers run concurrently, and
+    per name and row shape. Capacities are rounded up to a power of two and
+    callers get a view of the first batch_size rows, so a few buffers cover
+    every batch size up to max_batch_size. Larger batches get a fresh array.
+    A view stays valid until the same thread asks for the same name again.
+
+    Reuses and allocations are counted as buffer_pool_total{outcome=...}; once
+    the serving path is warmed up, allocations should stay flat under load.
+    """
+    def __init__(self, max_batch_size: int = 256):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.max_batch_size = max_batch_size
+        self._local = threading.local()
+
+    def get(self, name: str, batch_size: int, row_shape: Tuple[int, ...] = (), dtype=np.float32) -> np.ndarray:
+        """
+        A (batch_size, *row_shape) array owned by the calling thread.
+        Newly allocated buffers are zero-filled; reused ones keep their old contents.
+        """
+        buffers: Dict[Any, np.ndarray] = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+
+        key = (name, row_shape, dtype)
+        buffer = buffers.get(key)
+        if buffer is not None and len(buffer) >= batch_size:
+            gv.metrics.inc("buffer_pool_total", outcome="reuse")
+            return buffer[:batch_size]
+
+        gv.metrics.inc("buffer_pool_total", outcome="allocation")
+        if batch_size > self.max_batch_size:
+            return np.zeros((batch_size, *row_shape), dtype=dtype)
+
+        capacity = min(1 << max(batch_size - 1, 0).bit_length(), self.max_batch_size)
+        buffer = buffers[key] = np.zeros((capacity, *row_shape), dtype=dtype)
+        return buffer[:batch_size]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the pool configuration; reuse counters live in the metrics engine."""
+        return {"max_batch_size": self.max_batch_size}
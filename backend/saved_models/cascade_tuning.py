@@ -0,0 +1,115 @@
+# saved_models/cascade_tuning.py
+import time
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import numpy as np
+import torch
+import torch.nn.functional as F
+from saved_models.inference_engines import InferenceEngine, CascadeEngine
+from saved_models.idx_dataset import read_idx, map_idx
+from saved_models.model_variants import synthetic_stroke_images
+
+DEFAULT_THRESHOLDS = (0.5, 0.7, 0.8, 0.9, 0.95, 0.98, 0.99, 0.995, 0.999)
+
+def _run_in_batches(forward, images: torch.Tensor, batch_size: int) -> Tuple[torch.Tensor, float]:
+    """Softmax probabilities over all images and the average forward time per image in ms."""
+    probabilities = []
+    with torch.no_grad():
+        # One unmeasured pass so kernel selection is not timed
+        forward(images[:batch_size])
+        start = time.perf_counter()
+        for batch in torch.split(images, batch_size):
+            probabilities.append(F.softmax(forward(batch), dim=1))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    return torch.cat(probabilities), elapsed_ms / len(images)
+
+def sweep_thresholds(cascade: CascadeEngine, images: torch.Tensor, labels: Optional[np.ndarray] = None,
+                     thresholds: Sequence[float] = DEFAULT_THRESHOLDS, batch_size: int = 32) -> List[Dict[str, Any]]:
+    """
+    Measure the accuracy cost and latency gain of each cascade threshold.
+
+    Both stages are run once over all images; the outcome at each threshold
+    is then derived from the fast model's confidences, so the sweep costs two
+    passes no matter how many thresholds are tried. Latency per image is
+    estimated as the fast stage cost plus the escalation rate times the
+    escalation stage cost. Without labels, accuracy is reported as agreement
+    with the escalation stage alone.
+    """
+    fast_probabilities, fast_ms = _run_in_batches(cascade.fast, images, batch_size)
+    full_probabilities, full_ms = _run_in_batches(cascade.escalate, images, batch_size)
+
+    fast_confidences, fast_predictions = fast_probabilities.max(dim=1)
+    full_predictions = full_probabilities.argmax(dim=1)
+    targets = torch.from_numpy(labels.astype(np.int64)) if labels is not None else full_predictions
+    full_accuracy = (full_predictions == targets).float().mean().item()
+
+    results = []
+    for threshold in thresholds:
+        escalate = fast_confidences < threshold
+        predictions = torch.where(escalate, full_predictions, fast_predictions)
+        escalation_rate = escalate.float().mean().item()
+        ms_per_image = fast_ms + escalation_rate * full_ms
+        accuracy = (predictions == targets).float().mean().item()
+        results.append({
+            "threshold": threshold,
+            "escalation_rate": round(escalation_rate, 4),
+            "accuracy": round(accuracy, 5),
+            "accuracy_cost": round(full_accuracy - accuracy, 5),
+            "ms_per_image": round(ms_per_image, 4),
+            "speedup": round(full_ms / ms_per_image, 2) if ms_per_image else None
+        })
+    return results
+
+def load_test_images(images_path: Optional[str], limit: Optional[int] = None) -> torch.Tensor:
+    """Load an IDX3 image file scaled to [0, 1], or synthetic strokes when no file is given."""
+    if images_path is None:
+        return synthetic_stroke_images(limit or 2000)
+
+    # Mapped, so only the images used are read and converted
+    images = map_idx(images_path)[:limit].astype(np.float32) / 255
+    return torch.from_numpy(images).reshape(-1, 1, 28, 28)
+
+if __name__ == "__main__":
+    # Pick a cascade threshold on a local test set, e.g.
+    # python -m saved_models.cascade_tuning --fast saved_models/mnist_cnn_pruned_only.pth@static_int8 \
+    #     --images t10k-images-idx3-ubyte --labels t10k-labels-idx1-ubyte
+    import argparse
+    import json
+    from saved_models.model_architecture import load_model
+
+    parser = argparse.ArgumentParser(description="Sweep confidence cascade thresholds against a test set")
+    parser.add_argument("--fast", default="saved_models/mnist_cnn_pruned_only.pth@static_int8",
+                        help="Fast first-stage model as path[@variant]")
+    parser.add_argument("--full", default="saved_models/mnist_cnn_original.pth",
+                        help="Comma-separated escalation model paths; several are ensembled")
+    parser.add_argument("--images", default=None, help="IDX3 test images (synthetic strokes when omitted)")
+    parser.add_argument("--labels", default=None, help="IDX1 test labels (agreement with --full when omitted)")
+    parser.add_argument("--limit", type=int, default=None, help="Use only the first N images")
+    parser.add_argument("--thresholds", default=",".join(str(t) for t in DEFAULT_THRESHOLDS))
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    fast_path, _, fast_variant = args.fast.partition("@")
+    fast_engine: InferenceEngine = load_model(fast_path, variant=fast_variant or None)
+    escalation_engines = [load_model(path) for path in args.full.split(",")]
+    cascade_engine = CascadeEngine(fast_engine, escalation_engines)
+
+    if args.images is None:
+        print("No --images given: sweeping on synthetic strokes, which are far less confident than real digits")
+    test_images = load_test_images(args.images, args.limit)
+    test_labels = read_idx(args.labels)[:len(test_images)] if args.labels else None
+
+    sweep = sweep_thresholds(
+        cascade_engine, test_images, test_labels,
+        thresholds=[float(t) for t in args.thresholds.split(",")],
+        batch_size=args.batch_size
+    )
+    print(f"{'threshold':>9} {'escalated':>9} {'accuracy':>9} {'cost':>8} {'ms/image':>9} {'speedup':>7}")
+    for row in sweep:
+        print(
+            f"{row['threshold']:>9} {row['escalation_rate']:>9.2%} {row['accuracy']:>9.4f} "
+            f"{row['accuracy_cost']:>8.4f} {row['ms_per_image']:>9.4f} {row['speedup']:>6.2f}x"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"fast": args.fast, "full": args.full, "images": len(test_images), "results": sweep}, f, indent=2)
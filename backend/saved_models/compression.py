@@ -0,0 +1,299 @@
+# saved_models/compression.py
+"""
+Structured compression of CNNModel: fewer conv filters and FC units, not masks.
+
+The notebook's prune_model zeroes individual weights, so the pruned
+checkpoint has the same tensors, size and FLOPs as the original. Here whole
+conv filters and FC units are removed (the ones with the smallest L1 norm)
+and the survivors copied into a physically smaller CNNModel, or a smaller
+student is trained from scratch. Either way the student can then be
+fine-tuned by knowledge distillation from the original model, which needs
+no labels: any images, even synthetic strokes, carry the teacher's soft
+targets. The result is exported as an ordinary checkpoint whose layer
+widths load_model reads back from the weight shapes.
+
+Run from the backend directory, e.g.:
+    python -m saved_models.compression --model saved_models/mnist_cnn_original.pth --keep 0.5 \\
+        --train-images train-images-idx3-ubyte --train-labels train-labels-idx1-ubyte \\
+        --eval-images t10k-images-idx3-ubyte --eval-labels t10k-labels-idx1-ubyte \\
+        --output saved_models/mnist_cnn_half
+"""
+import argparse
+import io
+import json
+import os
+import time
+from typing import List, Dict, Any, Optional
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from saved_models.model_architecture import CNNModel, load_state_dict_file, model_widths
+from saved_models.model_widths import DEFAULT_WIDTHS, count_parameters, count_macs
+from saved_models.model_variants import synthetic_stroke_images
+from saved_models.safetensors_loader import save_safetensors
+from saved_models.idx_dataset import map_idx
+from logger.logging import logger
+
+def scaled_widths(widths: Dict[str, int], keep: float) -> Dict[str, int]:
+    """Widths scaled by the keep ratio, at least one filter or unit per layer."""
+    if not 0 < keep <= 1:
+        raise ValueError("keep must be in (0, 1]")
+    return {layer: max(1, round(width * keep)) for layer, width in widths.items()}
+
+def _strongest(weight: torch.Tensor, count: int) -> torch.Tensor:
+    """Indices, in order, of the count output filters/units with the largest L1 norm."""
+    norms = weight.detach().abs().flatten(1).sum(dim=1)
+    return norms.topk(count).indices.sort().values
+
+def prune_structured(model: CNNModel, widths: Dict[str, int]) -> CNNModel:
+    """
+    Copy a float CNNModel into a smaller one with the given layer widths.
+
+    Each layer keeps its filters (or units) with the largest L1 weight norm;
+    the next layer keeps only the input channels (or columns) fed by them.
+    fc1's columns are taken per surviving conv2 channel, 7 x 7 at a time,
+    matching the flatten order. Removed filters' constant bias contributions
+    are dropped, which distillation recovers.
+    """
+    for layer, width in widths.items():
+        if not 1 <= width <= model.widths[layer]:
+            raise ValueError(f"{layer} must be between 1 and {model.widths[layer]}, got {width}")
+
+    conv1 = _strongest(model.conv1.weight, widths["conv1_channels"])
+    conv2 = _strongest(model.conv2.weight, widths["conv2_channels"])
+    fc1 = _strongest(model.fc1.weight, widths["fc1_units"])
+
+    pruned = CNNModel(num_classes=model.fc2.out_features, **widths)
+    fc1_weight = model.fc1.weight.detach().reshape(model.fc1.out_features, model.widths["conv2_channels"], 49)
+    state_dict = {
+        "conv1.weight": model.conv1.weight.detach()[conv1],
+        "conv1.bias": model.conv1.bias.detach()[conv1],
+        "conv2.weight": model.conv2.weight.detach()[conv2][:, conv1],
+        "conv2.bias": model.conv2.bias.detach()[conv2],
+        "fc1.weight": fc1_weight[fc1][:, conv2].reshape(len(fc1), -1),
+        "fc1.bias": model.fc1.bias.detach()[fc1],
+        "fc2.weight": model.fc2.weight.detach()[:, fc1],
+        "fc2.bias": model.fc2.bias.detach().clone(),
+    }
+    pruned.load_state_dict({name: tensor.contiguous() for name, tensor in state_dict.items()})
+    return pruned.eval()
+
+def _as_batch(images, indices: np.ndarray) -> torch.Tensor:
+    """Gather images (mapped uint8 IDX pixels or a float tensor) into a (n, 1, 28, 28) float batch."""
+    if isinstance(images, torch.Tensor):
+        return images[torch.from_numpy(indices)]
+    # Sorted indices read the mapped file front to back
+    pixels = np.asarray(images[np.sort(indices)], dtype=np.float32) / 255
+    return torch.from_numpy(pixels).reshape(-1, 1, 28, 28)
+
+def distill(student: nn.Module, teacher: nn.Module, images, labels: Optional[np.ndarray] = None,
+            epochs: int = 2, batch_size: int = 256, lr: float = 1e-3, temperature: float = 4.0,
+            alpha: float = 0.9, seed: int = 0) -> List[float]:
+    """
+    Train the student to match the teacher's softened outputs.
+
+    The loss is the KL divergence between student and teacher softmax at the
+    given temperature (scaled by temperature^2), mixed with cross-entropy on
+    the labels by alpha when labels are given. Returns the mean loss per epoch.
+    """
+    generator = np.random.default_rng(seed)
+    torch.manual_seed(seed)
+    optimizer = torch.optim.Adam(student.parameters(), lr=lr)
+    teacher.eval()
+    epoch_losses = []
+
+    for epoch in range(epochs):
+        student.train()
+        order = generator.permutation(len(images))
+        total_loss = 0.0
+        for start in range(0, len(order), batch_size):
+            indices = np.sort(order[start:start + batch_size])
+            batch = _as_batch(images, indices)
+            with torch.no_grad():
+                teacher_logits = teacher(batch)
+            student_logits = student(batch)
+
+            loss = F.kl_div(
+                F.log_softmax(student_logits / temperature, dim=1),
+                F.softmax(teacher_logits / temperature, dim=1),
+                reduction="batchmean"
+            ) * temperature ** 2
+            if labels is not None:
+                targets = torch.from_numpy(np.asarray(labels[indices], dtype=np.int64))
+                loss = alpha * loss + (1 - alpha) * F.cross_entropy(student_logits, targets)
+
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item() * len(indices)
+
+        epoch_losses.append(round(total_loss / len(order), 5))
+        logger.info(f"Distillation epoch {epoch + 1}/{epochs}: loss {epoch_losses[-1]}")
+
+    student.eval()
+    return epoch_losses
+
+def _predict(model: nn.Module, images, batch_size: int = 1000) -> np.ndarray:
+    predictions = []
+    with torch.inference_mode():
+        for start in range(0, len(images), batch_size):
+            indices = np.arange(start, min(start + batch_size, len(images)))
+            predictions.append(model(_as_batch(images, indices)).argmax(dim=1).numpy())
+    return np.concatenate(predictions)
+
+def _latency_ms(model: nn.Module, batch_size: int, repeats: int = 30) -> float:
+    """Median forward time per image in milliseconds at the given batch size."""
+    batch = torch.rand(batch_size, 1, 28, 28)
+    timings = []
+    with torch.inference_mode():
+        for _ in range(3):
+            model(batch)
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model(batch)
+            timings.append((time.perf_counter() - start) * 1000 / batch_size)
+    return round(float(np.median(timings)), 4)
+
+def _serialized_size(model: nn.Module) -> int:
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+def describe_model(model: CNNModel, images=None, labels: Optional[np.ndarray] = None,
+                   reference_predictions: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """Widths, parameters, FLOPs, checkpoint size, latency and (given images) accuracy of a model."""
+    macs = count_macs(model.widths)
+    report = {
+        "layer_widths": dict(model.widths),
+        "parameters": count_parameters(model.widths),
+        "flops": 2 * macs,
+        "checkpoint_bytes": _serialized_size(model),
+        "latency_ms_batch_1": _latency_ms(model, 1),
+        "ms_per_image_batch_256": _latency_ms(model, 256, repeats=10)
+    }
+    if images is not None:
+        predictions = _predict(model, images)
+        report["predictions"] = predictions
+        if labels is not None:
+            report["accuracy"] = round(float(np.mean(predictions == labels[:len(predictions)])), 5)
+        if reference_predictions is not None:
+            report["agreement"] = round(float(np.mean(predictions == reference_predictions)), 5)
+    return report
+
+def compare_models(teacher: Dict[str, Any], student: Dict[str, Any]) -> Dict[str, Any]:
+    """How much smaller and faster the student is, and what it costs in accuracy."""
+    comparison = {
+        "flops_reduction": round(teacher["flops"] / student["flops"], 2),
+        "size_reduction": round(teacher["checkpoint_bytes"] / student["checkpoint_bytes"], 2),
+        "latency_speedup_batch_1": round(teacher["latency_ms_batch_1"] / student["latency_ms_batch_1"], 2),
+        "throughput_speedup_batch_256": round(teacher["ms_per_image_batch_256"] / student["ms_per_image_batch_256"], 2)
+    }
+    if "accuracy" in teacher and "accuracy" in student:
+        comparison["accuracy_cost"] = round(teacher["accuracy"] - student["accuracy"], 5)
+    return comparison
+
+def export_model(model: CNNModel, output_prefix: str, formats=("pth", "safetensors")) -> Dict[str, int]:
+    """
+    Save the model as output_prefix.<format> for each format (pth, safetensors, onnx).
+    Returns the size of each written file in bytes.
+    """
+    state_dict = {name: tensor.detach().contiguous() for name, tensor in model.state_dict().items()}
+    sizes = {}
+    for file_format in formats:
+        path = f"{output_prefix}.{file_format}"
+        if file_format == "pth":
+            torch.save(state_dict, path)
+        elif file_format == "safetensors":
+            save_safetensors(state_dict, path, metadata={"format": "pt", **{k: str(v) for k, v in model.widths.items()}})
+        elif file_format == "onnx":
+            torch.onnx.export(
+                model.eval(), torch.zeros(1, 1, 28, 28), path,
+                input_names=["input"], output_names=["logits"],
+                dynamic_axes={"input": {0: "batch_size"}, "logits": {0: "batch_size"}},
+                dynamo=False
+            )
+        else:
+            raise ValueError(f"Unknown export format '{file_format}'")
+        sizes[path] = os.path.getsize(path)
+    return sizes
+
+def _load_images(images_path: Optional[str], labels_path: Optional[str], limit: Optional[int], synthetic_count: int):
+    """Mapped IDX images and labels, or synthetic strokes (unlabeled) when no images are given."""
+    if images_path is None:
+        return synthetic_stroke_images(synthetic_count), None
+    images = map_idx(images_path)[:limit]
+    labels = map_idx(labels_path)[:len(images)] if labels_path else None
+    return images, labels
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Structurally prune and/or distill CNNModel into a smaller model")
+    parser.add_argument("--model", default="saved_models/mnist_cnn_original.pth", help="Float teacher checkpoint")
+    parser.add_argument("--keep", type=float, default=0.5, help="Fraction of filters/units kept in every layer")
+    parser.add_argument("--widths", default=None, help="Explicit conv1,conv2,fc1 widths, e.g. 16,32,64 (overrides --keep)")
+    parser.add_argument("--from-scratch", action="store_true",
+                        help="Train a freshly initialized student instead of pruning the teacher")
+    parser.add_argument("--train-images", default=None, help="IDX3 images to distill on (synthetic strokes when omitted)")
+    parser.add_argument("--train-labels", default=None, help="IDX1 labels mixed into the distillation loss")
+    parser.add_argument("--eval-images", default=None, help="IDX3 images to report accuracy/agreement on")
+    parser.add_argument("--eval-labels", default=None, help="IDX1 labels for --eval-images")
+    parser.add_argument("--epochs", type=int, default=2, help="Distillation epochs (0 to only prune)")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--temperature", type=float, default=4.0)
+    parser.add_argument("--alpha", type=float, default=0.9, help="Weight of the distillation loss against the label loss")
+    parser.add_argument("--limit", type=int, default=None, help="Use only the first N training and evaluation images")
+    parser.add_argument("--output", default=None, help="Export the student as <output>.pth/.safetensors/.onnx")
+    parser.add_argument("--formats", default="pth,safetensors,onnx")
+    parser.add_argument("--report", default=None, help="Write the comparison report as JSON to this file")
+    args = parser.parse_args()
+
+    state_dict = load_state_dict_file(args.model)
+    teacher = CNNModel(**model_widths(state_dict))
+    teacher.load_state_dict(state_dict)
+    teacher.eval()
+
+    if args.widths:
+        student_widths = dict(zip(DEFAULT_WIDTHS, (int(width) for width in args.widths.split(","))))
+    else:
+        student_widths = scaled_widths(teacher.widths, args.keep)
+    student = CNNModel(**student_widths) if args.from_scratch else prune_structured(teacher, student_widths)
+    print(f"Teacher widths {teacher.widths} -> student widths {student_widths}")
+
+    losses = []
+    if args.epochs > 0:
+        if args.train_images is None:
+            print("No --train-images given: distilling on synthetic strokes, which recovers far less accuracy than real digits")
+        train_images, train_labels = _load_images(args.train_images, args.train_labels, args.limit, 20000)
+        losses = distill(
+            student, teacher, train_images, train_labels,
+            epochs=args.epochs, batch_size=args.batch_size, lr=args.lr,
+            temperature=args.temperature, alpha=args.alpha
+        )
+
+    eval_images, eval_labels = (None, None)
+    if args.eval_images:
+        eval_images, eval_labels = _load_images(args.eval_images, args.eval_labels, args.limit, 0)
+    teacher_report = describe_model(teacher, eval_images, eval_labels)
+    student_report = describe_model(student, eval_images, eval_labels, teacher_report.pop("predictions", None))
+    student_report.pop("predictions", None)
+    comparison = compare_models(teacher_report, student_report)
+
+    for name, report in (("teacher", teacher_report), ("student", student_report)):
+        quality = " ".join(f"{key} {report[key]:.4f}" for key in ("accuracy", "agreement") if key in report)
+        print(
+            f"{name:>8}: {report['parameters']:>9,} params {report['flops'] / 1e6:>7.2f} MFLOPs "
+            f"{report['checkpoint_bytes'] / 1e6:>6.2f} MB {report['latency_ms_batch_1']:>7.4f} ms @1 "
+            f"{report['ms_per_image_batch_256']:>7.4f} ms/img @256 {quality}"
+        )
+    print(json.dumps(comparison))
+
+    exported = export_model(student, args.output, args.formats.split(",")) if args.output else {}
+    for path, size in exported.items():
+        print(f"Wrote {path} ({size / 1e6:.2f} MB)")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({
+                "teacher": args.model, "distillation_losses": losses, "exported": exported,
+                "teacher_report": teacher_report, "student_report": student_report, "comparison": comparison
+            }, f, indent=2)
@@ -0,0 +1,241 @@
+# saved_models/evaluation.py
+"""
+Offline evaluation of every model artifact against a local MNIST test set.
+
+Scores the .pth, .safetensors and .onnx files in saved_models/ (or the
+artifacts given) side by side, reporting accuracy, throughput, file size
+and the per-class confusion matrix, to judge pruning and quantization
+trade-offs before promoting a model to MODEL_PATH. No torchvision or
+DataLoader: the IDX files are memory-mapped and scored in large batches.
+
+Each artifact is evaluated in its own process, and the processes share the
+test set through the page cache instead of each loading a copy. Torch and
+ONNX Runtime threads are split between the processes.
+
+Run from the backend directory, e.g.:
+    python -m saved_models.evaluation --images t10k-images-idx3-ubyte --labels t10k-labels-idx1-ubyte
+    python -m saved_models.evaluation --images t10k-images-idx3-ubyte --labels t10k-labels-idx1-ubyte \\
+        --artifacts saved_models/mnist_cnn_original.pth,saved_models/mnist_cnn_original.pth@static_int8
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional
+import numpy as np
+from saved_models.idx_dataset import map_idx
+
+MODEL_EXTENSIONS = (".pth", ".safetensors", ".onnx")
+
+def discover_artifacts(model_dir: str) -> List[str]:
+    """Every model file in model_dir, in name order."""
+    return sorted(
+        path for path in glob.glob(os.path.join(model_dir, "*"))
+        if path.endswith(MODEL_EXTENSIONS)
+    )
+
+def _artifact_identity(spec: str):
+    """Absolute path and variant of a path[@variant] spec, so relative and absolute spellings match."""
+    path, _, variant = spec.partition("@")
+    return os.path.abspath(path), variant
+
+def load_test_set(images_path: str, labels_path: Optional[str] = None, limit: Optional[int] = None):
+    """
+    Memory-mapped (N, 28, 28) uint8 images and (N,) labels (None without a labels file).
+    Nothing is read until the arrays are sliced.
+    """
+    images = map_idx(images_path)
+    if images.dtype != np.uint8 or images.ndim != 3 or images.shape[1:] != (28, 28):
+        raise ValueError(f"Expected an IDX3 file of 28x28 unsigned byte images, got {images.dtype} {images.shape}")
+    labels = None
+    if labels_path is not None:
+        labels = map_idx(labels_path)
+        if labels.ndim != 1 or len(labels) != len(images):
+            raise ValueError(f"Expected {len(images)} labels in an IDX1 file, got shape {labels.shape}")
+    if limit is not None:
+        images = images[:limit]
+        labels = labels[:limit] if labels is not None else None
+    return images, labels
+
+def confusion_matrix(labels: np.ndarray, predictions: np.ndarray) -> np.ndarray:
+    """10 x 10 counts, rows by true digit and columns by predicted digit."""
+    return np.bincount(labels.astype(np.int64) * 10 + predictions, minlength=100).reshape(10, 10)
+
+def per_class_stats(confusion: np.ndarray) -> Dict[str, Dict[str, Any]]:
+    """Precision, recall and support of each digit from a confusion matrix."""
+    true_positives = np.diag(confusion)
+    predicted = confusion.sum(axis=0)
+    support = confusion.sum(axis=1)
+    return {
+        str(digit): {
+            "precision": round(float(true_positives[digit] / predicted[digit]), 4) if predicted[digit] else None,
+            "recall": round(float(true_positives[digit] / support[digit]), 4) if support[digit] else None,
+            "support": int(support[digit])
+        }
+        for digit in range(10)
+    }
+
+def predict_all(engine, images: np.ndarray, batch_size: int) -> np.ndarray:
+    """Predicted digit of every image, scored batch by batch from the mapped uint8 pixels."""
+    try:
+        import torch
+    except ImportError:
+        torch = None
+    from saved_models.predict import inference_mode
+
+    predictions = np.empty(len(images), dtype=np.int64)
+    # Pixels are scaled into one reused float32 buffer; only a batch is ever resident
+    buffer = np.empty((min(batch_size, len(images)), 28, 28), dtype=np.float32)
+    with inference_mode():
+        for start in range(0, len(images), batch_size):
+            batch = images[start:start + batch_size]
+            scaled = np.multiply(batch, np.float32(1 / 255), out=buffer[:len(batch)])
+            model_input = scaled.reshape(-1, 1, 28, 28)
+            if torch is not None:
+                model_input = torch.from_numpy(model_input)
+            predictions[start:start + len(batch)] = np.asarray(engine(model_input)).argmax(axis=1)
+    return predictions
+
+def evaluate_artifact(spec: str, images_path: str, labels_path: Optional[str], batch_size: int,
+                      num_threads: Optional[int] = None, backend: Optional[str] = None,
+                      limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Load one artifact given as path[@variant] and score it on the test set.
+    Runs in a worker process; failures are reported in the result, not raised.
+    """
+    path, _, variant = spec.partition("@")
+    result = {
+        "artifact": spec,
+        "size_bytes": os.path.getsize(path) if os.path.exists(path) else None
+    }
+    try:
+        if num_threads:
+            try:
+                import torch
+                torch.set_num_threads(num_threads)
+            except ImportError:
+                pass
+        from saved_models.model_architecture import load_model
+        from saved_models.inference_engines import resolve_backend
+
+        images, labels = load_test_set(images_path, labels_path, limit)
+        load_start = time.perf_counter()
+        engine = load_model(path, backend=backend, num_threads=num_threads, variant=variant or None)
+        result["load_time_ms"] = round((time.perf_counter() - load_start) * 1000, 2)
+        result["backend"] = resolve_backend(path, backend)
+        result["variant"] = variant or "float"
+
+        # One unmeasured batch so kernel selection and page faults are not timed
+        predict_all(engine, images[:batch_size], batch_size)
+        start = time.perf_counter()
+        predictions = predict_all(engine, images, batch_size)
+        elapsed_s = time.perf_counter() - start
+
+        result["images"] = len(predictions)
+        result["throughput_per_s"] = round(len(predictions) / elapsed_s, 1)
+        result["ms_per_image"] = round(elapsed_s * 1000 / len(predictions), 4)
+        result["predictions"] = predictions.astype(np.uint8)
+        if labels is not None:
+            confusion = confusion_matrix(labels, predictions)
+            result["accuracy"] = round(float(np.trace(confusion) / len(predictions)), 5)
+            result["confusion_matrix"] = confusion.tolist()
+            result["per_class"] = per_class_stats(confusion)
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+def evaluate_artifacts(specs: List[str], images_path: str, labels_path: Optional[str] = None,
+                       batch_size: int = 1000, processes: Optional[int] = None,
+                       backend: Optional[str] = None, limit: Optional[int] = None,
+                       reference: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Evaluate every artifact in parallel worker processes, in the order given.
+
+    Each result is compared with the reference artifact (by default the
+    first one that loaded): agreement is the fraction of images on which
+    both predict the same digit, which is the only comparison available
+    without labels.
+    """
+    if reference is not None:
+        # Use the listed spelling of the reference, so it is evaluated only once
+        reference = next(
+            (spec for spec in specs if _artifact_identity(spec) == _artifact_identity(reference)), reference
+        )
+        if reference not in specs:
+            specs = [reference] + specs
+    processes = max(1, min(processes or os.cpu_count() or 1, len(specs)))
+    num_threads = max(1, (os.cpu_count() or 1) // processes)
+
+    # spawn: forked children would inherit the parent's torch thread pools and log writer thread
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [
+            pool.submit(evaluate_artifact, spec, images_path, labels_path, batch_size, num_threads, backend, limit)
+            for spec in specs
+        ]
+        results = [future.result() for future in futures]
+
+    loaded = [result for result in results if "predictions" in result]
+    reference_result = next((result for result in loaded if result["artifact"] == reference), loaded[0] if loaded else None)
+    reference_predictions = reference_result["predictions"] if reference_result is not None else None
+    for result in results:
+        predictions = result.pop("predictions", None)
+        if predictions is not None:
+            result["reference"] = reference_result["artifact"]
+            result["agreement"] = round(float(np.mean(predictions == reference_predictions)), 5)
+    return results
+
+def print_results(results: List[Dict[str, Any]], show_confusion: bool = False):
+    print(f"{'artifact':<48} {'backend':>11} {'size MB':>8} {'accuracy':>9} {'agree':>7} {'img/s':>10} {'ms/img':>8}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['artifact']:<48} failed: {result['error']}")
+            continue
+        accuracy = f"{result['accuracy']:.4f}" if "accuracy" in result else "-"
+        size = f"{result['size_bytes'] / 1e6:.2f}"
+        print(
+            f"{result['artifact']:<48} {result['backend']:>11} {size:>8} {accuracy:>9} "
+            f"{result['agreement']:>7.4f} {result['throughput_per_s']:>10.1f} {result['ms_per_image']:>8.4f}"
+        )
+    if show_confusion:
+        for result in results:
+            if "confusion_matrix" in result:
+                print(f"\n{result['artifact']} (rows: true digit, columns: predicted digit)")
+                for digit, row in enumerate(result["confusion_matrix"]):
+                    print(f"{digit:>3} " + " ".join(f"{count:>5}" for count in row))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate model artifacts side by side on a local MNIST test set")
+    parser.add_argument("--images", required=True, help="IDX3 test images, e.g. t10k-images-idx3-ubyte")
+    parser.add_argument("--labels", default=None, help="IDX1 test labels (only agreement is reported without them)")
+    parser.add_argument("--artifacts", default=None,
+                        help="Comma-separated model files as path[@variant]; defaults to every model in --model-dir")
+    parser.add_argument("--model-dir", default="saved_models")
+    parser.add_argument("--reference", default=os.environ.get("MODEL_PATH"),
+                        help="Artifact to measure agreement against; defaults to MODEL_PATH, else the first artifact")
+    parser.add_argument("--backend", default=None, help="Inference backend for every artifact; defaults by file extension")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes; defaults to one per CPU")
+    parser.add_argument("--limit", type=int, default=None, help="Use only the first N images")
+    parser.add_argument("--confusion", action="store_true", help="Print each artifact's confusion matrix")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    specs = args.artifacts.split(",") if args.artifacts else discover_artifacts(args.model_dir)
+    if not specs:
+        parser.error(f"No model artifacts found in {args.model_dir}")
+
+    results = evaluate_artifacts(
+        specs, args.images, args.labels,
+        batch_size=args.batch_size,
+        processes=args.processes,
+        backend=args.backend,
+        limit=args.limit,
+        reference=args.reference
+    )
+    print_results(results, args.confusion)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"images": args.images, "labels": args.labels, "results": results}, f, indent=2)
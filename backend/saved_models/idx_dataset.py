@@ -0,0 +1,74 @@
+# saved_models/idx_dataset.py
+import os
+import struct
+from typing import Tuple
+import numpy as np
+
+# IDX type codes from the MNIST file format specification (all data is big-endian)
+IDX_DTYPES = {
+    0x08: np.dtype(np.uint8),
+    0x09: np.dtype(np.int8),
+    0x0B: np.dtype(">i2"),
+    0x0C: np.dtype(">i4"),
+    0x0D: np.dtype(">f4"),
+    0x0E: np.dtype(">f8"),
+}
+
+def idx_header_size(ndim: int) -> int:
+    """Size in bytes of an IDX header with the given number of dimensions."""
+    return 4 + 4 * ndim
+
+def parse_idx_header(header: bytes) -> Tuple[np.dtype, Tuple[int, ...], int]:
+    """
+    Parse the header of an IDX file.
+
+    Returns the element dtype, the array shape and the header size in bytes.
+    At least the 4-byte magic number plus 4 bytes per dimension must be given.
+    """
+    if len(header) < 4:
+        raise ValueError("IDX header is truncated")
+
+    zero, type_code, ndim = struct.unpack(">HBB", header[:4])
+    if zero != 0 or type_code not in IDX_DTYPES or ndim == 0:
+        raise ValueError("Not an IDX file: invalid magic number")
+
+    header_size = idx_header_size(ndim)
+    if len(header) < header_size:
+        raise ValueError("IDX header is truncated")
+
+    shape = struct.unpack(f">{ndim}I", header[4:header_size])
+    return IDX_DTYPES[type_code], shape, header_size
+
+def read_idx(path: str) -> np.ndarray:
+    """Read a whole IDX file (optionally gzip-compressed) into a numpy array."""
+    if path.endswith(".gz"):
+        import gzip
+        with gzip.open(path, "rb") as f:
+            data = f.read()
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+
+    dtype, shape, header_size = parse_idx_header(data)
+    count = int(np.prod(shape))
+    if len(data) - header_size < count * dtype.itemsize:
+        raise ValueError(f"IDX file {path} is truncated")
+    return np.frombuffer(data, dtype=dtype, count=count, offset=header_size).reshape(shape)
+
+def map_idx(path: str) -> np.ndarray:
+    """
+    Memory-map an IDX file as a read-only array without reading it.
+
+    Pages are loaded from the page cache as slices are accessed, so a large
+    file costs no memory up front and processes mapping the same file share
+    one copy. Gzip-compressed files cannot be mapped and are read with read_idx.
+    """
+    if path.endswith(".gz"):
+        return read_idx(path)
+
+    with open(path, "rb") as f:
+        # Long enough for any header; parse_idx_header ignores the excess
+        dtype, shape, header_size = parse_idx_header(f.read(idx_header_size(255)))
+    if os.path.getsize(path) - header_size < int(np.prod(shape)) * dtype.itemsize:
+        raise ValueError(f"IDX file {path} is truncated")
+    return np.memmap(path, dtype=dtype, mode="r", offset=header_size, shape=shape)
@@ -0,0 +1,282 @@
+# saved_models/inference_engines.py
+import threading
+import time
+from typing import Dict, Any, Optional, List
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import global_variables.global_variable as gv
+
+SUPPORTED_BACKENDS = ("eager", "torchscript", "compile", "onnxruntime", "numpy")
+
+class InferenceEngine:
+    """
+    Common interface for every inference backend.
+
+    An engine is called like a model: it takes a float32 tensor of shape
+    (batch_size, 1, 28, 28) and returns a logits tensor of shape
+    (batch_size, 10), so predict_single_image and predict_batch_images run
+    unchanged on any backend.
+    """
+    backend = "base"
+    variant = "float"
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        raise NotImplementedError
+
+class TorchEngine(InferenceEngine):
+    """Eager PyTorch execution of an nn.Module."""
+    backend = "eager"
+
+    def __init__(self, model: nn.Module, variant: str = "float"):
+        self.model = model.eval()
+        self.variant = variant
+        # Channels-last models expect NHWC-strided inputs
+        self.memory_format = torch.channels_last if variant == "channels_last" else torch.contiguous_format
+
+    def _prepare(self, batch: torch.Tensor) -> torch.Tensor:
+        return batch.contiguous(memory_format=self.memory_format)
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        return self.model(self._prepare(batch))
+
+    def parameters(self):
+        return self.model.parameters()
+
+class TorchScriptEngine(TorchEngine):
+    """Traced, frozen TorchScript graph with inference-time optimizations applied."""
+    backend = "torchscript"
+
+    def __init__(self, model: nn.Module, variant: str = "float"):
+        super().__init__(model, variant)
+        with torch.no_grad():
+            traced = torch.jit.trace(self.model, self._prepare(torch.zeros(1, 1, 28, 28)))
+            self.graph = torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        return self.graph(self._prepare(batch))
+
+class TorchCompileEngine(TorchEngine):
+    """torch.compile graph; compilation happens lazily on the first call per input shape."""
+    backend = "compile"
+
+    def __init__(self, model: nn.Module, variant: str = "float"):
+        super().__init__(model, variant)
+        self.compiled = torch.compile(self.model, dynamic=True)
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        return self.compiled(self._prepare(batch))
+
+class OnnxRuntimeEngine(InferenceEngine):
+    """
+    ONNX Runtime session with tuned thread pools and preallocated IO bindings.
+
+    Output buffers are allocated once per batch size and per worker thread, and
+    the input tensor memory is bound without copying. The returned logits share
+    the preallocated buffer and stay valid until the next call of the same batch
+    size on the same thread.
+    """
+    backend = "onnxruntime"
+
+    def __init__(self, model_path: str, intra_op_threads: Optional[int] = None, inter_op_threads: int = 1):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("The onnxruntime backend requires the onnxruntime package")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = intra_op_threads or 0  # 0 lets ONNX Runtime pick
+        options.inter_op_num_threads = inter_op_threads
+
+        self.model_path = model_path
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_name = self.session.get_outputs()[0].name
+        self._bindings = threading.local()
+
+    def _get_binding(self, batch_size: int):
+        """Return this thread's IO binding and output buffer for the batch size."""
+        cache = getattr(self._bindings, "cache", None)
+        if cache is None:
+            cache = self._bindings.cache = {}
+
+        if batch_size not in cache:
+            output = np.empty((batch_size, 10), dtype=np.float32)
+            binding = self.session.io_binding()
+            binding.bind_output(
+                self.output_name, "cpu", 0, np.float32, list(output.shape), output.ctypes.data
+            )
+            cache[batch_size] = (binding, output)
+        return cache[batch_size]
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        inputs = np.ascontiguousarray(batch.detach().numpy(), dtype=np.float32)
+        binding, output = self._get_binding(inputs.shape[0])
+        binding.bind_input(
+            self.input_name, "cpu", 0, np.float32, list(inputs.shape), inputs.ctypes.data
+        )
+        self.session.run_with_iobinding(binding)
+        return torch.from_numpy(output)
+
+class CascadeEngine(InferenceEngine):
+    """
+    Confidence-based cascade of a cheap model and a full model (or an ensemble).
+
+    Every batch runs through the fast engine first. Images whose top softmax
+    probability clears `threshold` are answered from it directly; only the
+    remaining ones are sent to the escalation engines. With several
+    escalation engines their softmax probabilities are averaged, and the log
+    of the average is returned as logits so downstream softmax recovers it.
+
+    The images answered by each stage and the time spent in each stage are
+    recorded in gv.metrics, together with two monotonic counters from which
+    /metrics derives the latency saved: the actual cascade time and the
+    estimated time of running every batch on the escalation stage alone. The
+    escalation stage's per-image cost is tracked as a moving average of
+    observed escalations, seeded with one timed pass over a batch of
+    SEED_BATCH_SIZE images at construction.
+    """
+    backend = "cascade"
+
+    # Large enough that the seeded per-image cost is not dominated by per-call overhead
+    SEED_BATCH_SIZE = 32
+
+    def __init__(self, fast: InferenceEngine, escalation: List[InferenceEngine], threshold: float = 0.9):
+        if not escalation:
+            raise ValueError("A cascade needs at least one escalation model")
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("Cascade threshold must be in (0, 1]")
+
+        self.fast = fast
+        self.escalation = list(escalation)
+        self.threshold = threshold
+        self.variant = f"{fast.variant}>{'+'.join(engine.variant for engine in self.escalation)}"
+
+        # Per-image cost of the escalation stage, for the latency-saved estimate
+        with torch.no_grad():
+            sample = torch.zeros(self.SEED_BATCH_SIZE, 1, 28, 28)
+            self.escalate(sample)
+            start = time.perf_counter()
+            self.escalate(sample)
+        self.escalation_ms_per_image = (time.perf_counter() - start) * 1000 / self.SEED_BATCH_SIZE
+
+    @property
+    def stages(self) -> List[InferenceEngine]:
+        return [self.fast, *self.escalation]
+
+    def escalate(self, batch: torch.Tensor) -> torch.Tensor:
+        """Logits of the escalation stage (the log of the averaged probabilities for an ensemble)."""
+        # as_tensor: numpy engine stages return arrays
+        if len(self.escalation) == 1:
+            return torch.as_tensor(self.escalation[0](batch))
+        probabilities = torch.stack([
+            F.softmax(torch.as_tensor(engine(batch)), dim=1) for engine in self.escalation
+        ]).mean(dim=0)
+        return torch.log(probabilities)
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        start = time.perf_counter()
+        logits = torch.as_tensor(self.fast(batch))
+        confidences = F.softmax(logits, dim=1).max(dim=1).values
+        needs_escalation = confidences < self.threshold
+        escalated = int(needs_escalation.sum())
+        fast_end = time.perf_counter()
+
+        if escalated:
+            # Copy first: some engines return a buffer reused by their next call
+            logits = logits.clone()
+            logits[needs_escalation] = self.escalate(batch[needs_escalation]).to(logits.dtype)
+            escalation_ms = (time.perf_counter() - fast_end) * 1000
+            self.escalation_ms_per_image += 0.1 * (escalation_ms / escalated - self.escalation_ms_per_image)
+            gv.metrics.observe("cascade_stage_ms", escalation_ms, stage="escalation")
+
+        batch_size = batch.shape[0]
+        total_ms = (time.perf_counter() - start) * 1000
+        gv.metrics.observe("cascade_stage_ms", (fast_end - start) * 1000, stage="fast")
+        gv.metrics.inc("cascade_images_total", batch_size - escalated, stage="fast")
+        gv.metrics.inc("cascade_images_total", escalated, stage="escalation")
+        # Kept as two counters: their difference can go negative, which a counter must not
+        gv.metrics.inc("cascade_time_ms_total", total_ms)
+        gv.metrics.inc("cascade_escalation_only_estimate_ms_total", batch_size * self.escalation_ms_per_image)
+        return logits
+
+def resolve_backend(model_path: str, backend: Optional[str] = None) -> str:
+    """Pick the backend from an explicit setting or the model file extension."""
+    if backend:
+        backend = backend.lower()
+        if backend not in SUPPORTED_BACKENDS:
+            raise ValueError(f"Unknown inference backend '{backend}'. Supported: {', '.join(SUPPORTED_BACKENDS)}")
+        return backend
+    return "onnxruntime" if model_path.endswith(".onnx") else "eager"
+
+def build_engine(model: Optional[nn.Module], backend: str, model_path: str,
+                 num_threads: Optional[int] = None, variant: str = "float") -> InferenceEngine:
+    """Wrap a loaded model (or the ONNX file for onnxruntime) in the requested engine."""
+    if backend == "onnxruntime":
+        if not model_path.endswith(".onnx"):
+            raise ValueError("The onnxruntime backend requires an .onnx model file")
+        return OnnxRuntimeEngine(model_path, intra_op_threads=num_threads)
+    if backend == "torchscript":
+        return TorchScriptEngine(model, variant)
+    if backend == "compile":
+        return TorchCompileEngine(model, variant)
+    return TorchEngine(model, variant)
+
+def compare_engines(reference: InferenceEngine, candidate: InferenceEngine,
+                    batch_size: int = 64, atol: float = 1e-4, seed: int = 0) -> Dict[str, Any]:
+    """
+    Check that two engines produce the same outputs within a tolerance.
+
+    Both engines are run on the same random batch; the maximum absolute
+    difference of their softmax probabilities and the fraction of matching
+    argmax predictions are reported.
+    """
+    generator = torch.Generator().manual_seed(seed)
+    batch = torch.rand(batch_size, 1, 28, 28, generator=generator)
+
+    # The numpy engine returns arrays; as_tensor wraps them without a copy
+    with torch.no_grad():
+        reference_probs = F.softmax(torch.as_tensor(reference(batch)), dim=1)
+        candidate_probs = F.softmax(torch.as_tensor(candidate(batch)), dim=1)
+
+    max_abs_diff = (reference_probs - candidate_probs).abs().max().item()
+    argmax_agreement = (reference_probs.argmax(dim=1) == candidate_probs.argmax(dim=1)).float().mean().item()
+
+    return {
+        "reference_backend": reference.backend,
+        "candidate_backend": candidate.backend,
+        "batch_size": batch_size,
+        "atol": atol,
+        "max_abs_diff": max_abs_diff,
+        "argmax_agreement": argmax_agreement,
+        "within_tolerance": max_abs_diff <= atol
+    }
+
+if __name__ == "__main__":
+    # Cross-backend parity check, e.g.
+    # python -m saved_models.inference_engines saved_models/mnist_cnn_pruned_only.pth saved_models/mnist_cnn_pruned_only.onnx
+    # The torch-free numpy engine is always checked against the eager reference
+    import argparse
+    from saved_models.model_architecture import load_model
+
+    parser = argparse.ArgumentParser(description="Compare model outputs across inference backends")
+    parser.add_argument("model_path", help="Reference model (.pth), run with the eager backend")
+    parser.add_argument("onnx_path", nargs="?", help="Optional .onnx export of the same weights")
+    parser.add_argument("--atol", type=float, default=1e-4)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    reference = load_model(args.model_path, backend="eager")
+    candidates = [load_model(args.model_path, backend="torchscript"), load_model(args.model_path, backend="numpy")]
+    if args.onnx_path:
+        candidates.append(load_model(args.onnx_path, backend="onnxruntime"))
+
+    failed = False
+    for candidate in candidates:
+        report = compare_engines(reference, candidate, batch_size=args.batch_size, atol=args.atol)
+        failed |= not report["within_tolerance"]
+        print(report)
+    raise SystemExit(1 if failed else 0)
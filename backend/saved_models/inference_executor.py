@@ -0,0 +1,153 @@
+# saved_models/inference_executor.py
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+try:
+    import torch
+except ImportError:
+    # Without torch the numpy engine runs on numpy's own BLAS threads
+    torch = None
+from logger.logging import logger
+import global_variables.global_variable as gv
+
+class InferenceSaturatedError(RuntimeError):
+    """Raised when the inference admission queue is full."""
+    def __init__(self, retry_after_s: int):
+        super().__init__("Inference queue is full, please retry later")
+        self.retry_after_s = retry_after_s
+
+class InferenceExecutor:
+    """
+    Dedicated thread pool for CPU-bound model inference.
+
+    Forward passes run off the asyncio event loop so a slow prediction never
+    blocks other requests such as /health. PyTorch releases the GIL inside its
+    kernels, so worker threads run in parallel without a model copy each.
+    Admission is bounded: once max_pending requests are in flight, new ones are
+    rejected immediately instead of queueing with unbounded latency.
+    """
+    def __init__(self, max_workers: int = 1, torch_threads: Optional[int] = None,
+                 max_pending: int = 64, retry_after_s: int = 1):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+
+        self.max_workers = max_workers
+        # Split the cores between workers so concurrent forwards don't oversubscribe
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // max_workers)
+        self.max_pending = max_pending
+        self.retry_after_s = retry_after_s
+
+        self._pool: Optional[ThreadPoolExecutor] = None
+        # Submission times of calls still waiting for a worker thread, oldest first
+        self._waiting = OrderedDict()
+        self._waiting_lock = threading.Lock()
+        self._call_ids = itertools.count()
+        self._in_flight = 0
+        self.admitted_requests = 0
+        self.rejected_requests = 0
+
+    def start(self):
+        """Create the worker pool and apply the intra-op thread setting."""
+        if self._pool is not None:
+            return
+        if torch is not None:
+            torch.set_num_threads(self.torch_threads)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        logger.info(
+            f"Inference executor started (workers={self.max_workers}, torch_threads={self.torch_threads}, "
+            f"max_pending={self.max_pending})"
+        )
+
+    def shutdown(self):
+        """Wait for running inference to finish and release the worker threads."""
+        if self._pool is None:
+            return
+        self._pool.shutdown(wait=True)
+        self._pool = None
+        logger.info("Inference executor stopped")
+
+    def is_saturated(self) -> bool:
+        """Whether a new request would currently be rejected."""
+        return self._in_flight >= self.max_pending
+
+    def queue_delay_ms(self) -> float:
+        """
+        How long the oldest call still waiting for a worker thread has waited, 0 when none wait.
+        Unlike the recorded waits of finished calls, this grows while the pool is stuck.
+        """
+        with self._waiting_lock:
+            oldest = next(iter(self._waiting.values()), None)
+        return (time.perf_counter() - oldest) * 1000 if oldest is not None else 0.0
+
+    @contextmanager
+    def admit(self):
+        """
+        Reserve an admission slot for one request for the duration of the block.
+        Must be used from the event loop thread.
+        """
+        if self.is_saturated():
+            self.rejected_requests += 1
+            raise InferenceSaturatedError(self.retry_after_s)
+
+        self._in_flight += 1
+        self.admitted_requests += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking inference function on the worker pool and await its result."""
+        if self._pool is None:
+            raise RuntimeError("Inference executor is not running")
+        submitted_at = time.perf_counter()
+        call_id = next(self._call_ids)
+        with self._waiting_lock:
+            self._waiting[call_id] = submitted_at
+
+        def run_timed():
+            with self._waiting_lock:
+                self._waiting.pop(call_id, None)
+            # Time spent waiting for a free worker thread
+            gv.metrics.observe("queue_wait_ms", (time.perf_counter() - submitted_at) * 1000, queue="executor")
+            return func(*args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._pool, run_timed)
+        finally:
+            # Calls cancelled before a worker picked them up never reach run_timed
+            with self._waiting_lock:
+                self._waiting.pop(call_id, None)
+
+    async def run_admitted(self, func, *args, **kwargs):
+        """
+        Run a call under an admission slot, waiting for capacity instead of failing.
+        For background work (bulk streams, prediction jobs) that must not fail midway.
+        """
+        while True:
+            try:
+                with self.admit():
+                    return await self.run(func, *args, **kwargs)
+            except InferenceSaturatedError as e:
+                await asyncio.sleep(e.retry_after_s)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return pool configuration and admission counters."""
+        return {
+            "workers": self.max_workers,
+            "torch_threads": self.torch_threads,
+            "max_pending": self.max_pending,
+            "in_flight": self._in_flight,
+            "queue_delay_ms": round(self.queue_delay_ms(), 3),
+            "admitted_requests": self.admitted_requests,
+            "rejected_requests": self.rejected_requests
+        }
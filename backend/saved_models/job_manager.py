@@ -0,0 +1,157 @@
+# saved_models/job_manager.py
+import asyncio
+import time
+import uuid
+from typing import Dict, Any, Optional
+import numpy as np
+from saved_models.job_store import JobStore
+from saved_models.predict import predict_batch_images, update_metrics, CLASS_LABELS
+from logger.logging import logger
+import global_variables.global_variable as gv
+
+def _predict_chunk(chunk: np.ndarray, request_id: str, model) -> Dict[str, Any]:
+    """Scale a chunk of stored uint8 images and predict it; reading the memory-mapped chunk may hit the disk."""
+    pixels = np.multiply(chunk, np.float32(1 / 255), dtype=np.float32)
+    return predict_batch_images(pixels, request_id, model)
+
+class JobManager:
+    """
+    Background workers running prediction jobs from a JobStore.
+
+    Each worker claims a job from the store, scores its images chunk by chunk
+    through predict_batch_images on the inference executor, and checkpoints
+    each chunk's results in the store before taking the next one. Workers
+    poll the store every poll_interval_s, and are woken up right away when
+    a job is submitted to this process.
+
+    Job chunks wait for executor capacity instead of failing, and the
+    admission middleware sheds new submissions first when the server is
+    overloaded, so interactive traffic keeps priority over jobs.
+    """
+    def __init__(self, store: JobStore, workers: int = 1, poll_interval_s: float = 1.0):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.store = store
+        self.workers = workers
+        self.poll_interval_s = poll_interval_s
+
+        # Unique per process start, so a restarted process never mistakes an old lease for its own
+        self._worker_prefix = uuid.uuid4().hex[:8]
+        self._tasks = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running_jobs: Dict[str, str] = {}  # worker ID -> job ID
+
+    async def start(self):
+        """Start the worker tasks on the running event loop; unfinished jobs in the store resume."""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._run(f"{self._worker_prefix}-{i}"))
+            for i in range(self.workers)
+        ]
+        logger.info(f"Job manager started (workers={self.workers}, store={self.store.directory})")
+
+    async def stop(self):
+        """
+        Stop the workers and put their jobs back in the queue.
+        Chunks already checkpointed are kept; the next start resumes after them.
+        """
+        if not self._tasks:
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        for worker_id, job_id in self._running_jobs.items():
+            await asyncio.to_thread(self.store.release_job, job_id, worker_id)
+        self._running_jobs.clear()
+        logger.info("Job manager stopped")
+
+    def notify(self):
+        """Wake idle workers after a job was submitted."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self, worker_id: str):
+        while True:
+            try:
+                job = await asyncio.to_thread(self.store.claim_job, worker_id)
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} failed to claim a job: {str(e)}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval_s)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._running_jobs[worker_id] = job["job_id"]
+            try:
+                await self._process(job, worker_id)
+            except Exception as e:
+                # The store failed to record the outcome; the lease expires and the job is retried
+                logger.error(f"Job worker {worker_id} failed on job {job['job_id']}: {str(e)}")
+            # Left in place when the worker is cancelled mid-job, so stop() can release the job
+            del self._running_jobs[worker_id]
+
+    async def _process(self, job: Dict[str, Any], worker_id: str):
+        """Score a claimed job from its checkpoint on and mark it completed or failed."""
+        job_id = job["job_id"]
+        start_time = time.time()
+        resumed_at = job["processed_images"]
+        if resumed_at:
+            logger.info(f"Resuming job {job_id} at image {resumed_at} of {job['total_images']}")
+
+        try:
+            model = gv.model_registry.get(job["model_name"])
+            images = await asyncio.to_thread(self.store.load_images, job_id)
+            chunk_size = job["chunk_size"]
+
+            for start in range(resumed_at, job["total_images"], chunk_size):
+                results = await gv.inference_executor.run_admitted(
+                    _predict_chunk, images[start:start + chunk_size], f"{job_id}-{start // chunk_size}", model.engine
+                )
+
+                chunk_results = []
+                for result in results["predictions"]:
+                    # Chunk time averaged over its images
+                    update_metrics(result["prediction"], result["inference_time_ms"], success=True)
+                    model.metrics.record(result["prediction"], result["confidence"], result["inference_time_ms"])
+                    chunk_results.append({
+                        "prediction": result["prediction"],
+                        "confidence": result["confidence"],
+                        "probabilities": [result["probabilities"][label] for label in CLASS_LABELS]
+                    })
+
+                if not await asyncio.to_thread(self.store.save_chunk, job_id, worker_id, start, chunk_results):
+                    logger.warning(f"Job {job_id} was deleted or taken over, worker {worker_id} stopped it")
+                    return
+                gv.metrics.inc("job_images_total", len(chunk_results))
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            gv.metrics.inc("jobs_total", status="failed")
+            await asyncio.to_thread(self.store.finish_job, job_id, worker_id, str(e))
+            return
+
+        await asyncio.to_thread(self.store.finish_job, job_id, worker_id)
+        gv.metrics.inc("jobs_total", status="completed")
+        logger.info(
+            f"Job {job_id} ({job['model_name']}) completed: {job['total_images'] - resumed_at} images "
+            f"in {time.time() - start_time:.1f}s"
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Worker configuration, jobs in progress in this process and job counts per status in the store."""
+        return {
+            "workers": self.workers,
+            "running_jobs": len(self._running_jobs),
+            "jobs": self.store.count_jobs()
+        }
@@ -0,0 +1,233 @@
+# saved_models/job_store.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional
+import numpy as np
+
+PIXELS_PER_IMAGE = 784
+
+# queued -> running -> completed | failed; running jobs whose lease expires are queued again
+JOB_STATUSES = ("queued", "running", "completed", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    total_images INTEGER NOT NULL,
+    processed_images INTEGER NOT NULL DEFAULT 0,
+    chunk_size INTEGER NOT NULL,
+    worker_id TEXT,
+    lease_expires_at REAL,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    image_index INTEGER NOT NULL,
+    prediction INTEGER NOT NULL,
+    confidence REAL NOT NULL,
+    probabilities TEXT NOT NULL,
+    PRIMARY KEY (job_id, image_index)
+) WITHOUT ROWID;
+"""
+
+class JobNotFoundError(LookupError):
+    """Raised when a job ID is not in the store."""
+
+class JobStore:
+    """
+    Local persistent store of prediction jobs.
+
+    Each job's images are kept as a raw N x 784 uint8 file next to a SQLite
+    database holding the job rows and per-image results. Workers read the
+    images memory-mapped, so a job of any size costs one chunk of memory.
+
+    Results are written a chunk at a time in the same transaction that
+    advances processed_images, which is therefore a checkpoint: a job
+    interrupted by a crash or restart resumes at its first unsaved chunk.
+    Running jobs hold a lease renewed with every chunk; a job whose lease
+    expired (its worker died) can be claimed by any worker, so several
+    server processes can share one store directory.
+
+    Methods block on SQLite and file I/O; call them off the event loop.
+    """
+    def __init__(self, directory: str, lease_s: float = 60.0):
+        if lease_s <= 0:
+            raise ValueError("lease_s must be positive")
+        self.directory = directory
+        self.lease_s = lease_s
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            os.path.join(directory, "jobs.sqlite3"),
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        self._db.row_factory = sqlite3.Row
+        # WAL lets readers page through results while a worker writes the next chunk
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def images_path(self, job_id: str) -> str:
+        """Path of the job's raw uint8 image file."""
+        return os.path.join(self.directory, f"{job_id}.u8")
+
+    def create_job(self, job_id: str, model_name: str, chunk_size: int) -> Dict[str, Any]:
+        """
+        Queue a job for the images already written to images_path(job_id).
+        The image count is taken from the file size.
+        """
+        size = os.path.getsize(self.images_path(job_id))
+        if size == 0 or size % PIXELS_PER_IMAGE != 0:
+            raise ValueError(f"Expected a multiple of {PIXELS_PER_IMAGE} uint8 pixels, got {size} bytes")
+
+        now = time.strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (job_id, status, model_name, total_images, chunk_size, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, model_name, size // PIXELS_PER_IMAGE, chunk_size, now, now)
+            )
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: str) -> Dict[str, Any]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise JobNotFoundError(f"Job '{job_id}' not found")
+        return dict(row)
+
+    def claim_job(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Take the oldest queued job, or a running one whose lease has expired,
+        and lease it to the worker. Returns None when there is nothing to do.
+        """
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two processes never claim the same job
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT job_id FROM jobs "
+                    "WHERE status = 'queued' OR (status = 'running' AND lease_expires_at < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'running', worker_id = ?, lease_expires_at = ?, updated_at = ? "
+                        "WHERE job_id = ?",
+                        (worker_id, now + self.lease_s, time.strftime("%Y-%m-%d %H:%M:%S"), row["job_id"])
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return self.get_job(row["job_id"]) if row is not None else None
+
+    def save_chunk(self, job_id: str, worker_id: str, start_index: int, results: List[Dict[str, Any]]) -> bool:
+        """
+        Store the results of images start_index.. and advance the checkpoint.
+        Returns False, storing nothing, when the worker no longer holds the job
+        (it was deleted or its lease expired and another worker took it over).
+        """
+        rows = [
+            (job_id, start_index + i, result["prediction"], result["confidence"], json.dumps(result["probabilities"]))
+            for i, result in enumerate(results)
+        ]
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                updated = self._db.execute(
+                    "UPDATE jobs SET processed_images = ?, lease_expires_at = ?, updated_at = ? "
+                    "WHERE job_id = ? AND worker_id = ? AND status = 'running'",
+                    (start_index + len(rows), time.time() + self.lease_s, time.strftime("%Y-%m-%d %H:%M:%S"), job_id, worker_id)
+                ).rowcount
+                if updated:
+                    self._db.executemany("INSERT OR REPLACE INTO job_results VALUES (?, ?, ?, ?, ?)", rows)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return bool(updated)
+
+    def finish_job(self, job_id: str, worker_id: str, error: Optional[str] = None):
+        """Mark a job the worker holds as completed, or failed with the given error."""
+        now = time.strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, error = ?, worker_id = NULL, lease_expires_at = NULL, "
+                "updated_at = ?, finished_at = ? WHERE job_id = ? AND worker_id = ?",
+                ("failed" if error is not None else "completed", error, now, now, job_id, worker_id)
+            )
+
+    def release_job(self, job_id: str, worker_id: str):
+        """Put a job the worker holds back in the queue, e.g. at shutdown, so it resumes right away."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'queued', worker_id = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE job_id = ? AND worker_id = ? AND status = 'running'",
+                (time.strftime("%Y-%m-%d %H:%M:%S"), job_id, worker_id)
+            )
+
+    def get_results(self, job_id: str, offset: int, limit: int) -> List[Dict[str, Any]]:
+        """Up to limit stored results from image offset on, in image order."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT image_index, prediction, confidence, probabilities FROM job_results "
+                "WHERE job_id = ? AND image_index >= ? ORDER BY image_index LIMIT ?",
+                (job_id, offset, limit)
+            ).fetchall()
+        return [
+            {
+                "index": row["image_index"],
+                "prediction": row["prediction"],
+                "confidence": row["confidence"],
+                "probabilities": json.loads(row["probabilities"])
+            }
+            for row in rows
+        ]
+
+    def load_images(self, job_id: str) -> np.ndarray:
+        """The job's images as a read-only memory-mapped (N, 784) uint8 array."""
+        return np.memmap(self.images_path(job_id), dtype=np.uint8, mode="r").reshape(-1, PIXELS_PER_IMAGE)
+
+    def delete_job(self, job_id: str):
+        """Remove a job, its results and its image file. A worker running it stops at its next chunk."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                deleted = self._db.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,)).rowcount
+                self._db.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        if not deleted:
+            raise JobNotFoundError(f"Job '{job_id}' not found")
+        try:
+            os.remove(self.images_path(job_id))
+        except FileNotFoundError:
+            pass
+
+    def count_jobs(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        counts.update((status, count) for status, count in rows)
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._db.close()
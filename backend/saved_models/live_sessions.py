@@ -0,0 +1,237 @@
+# saved_models/live_sessions.py
+import asyncio
+import time
+import uuid
+from collections import Counter
+from typing import Dict, Any, Optional
+import numpy as np
+from saved_models.predict import predict_single_image, update_metrics, CLASS_LABELS
+from saved_models.inference_executor import InferenceSaturatedError
+from schema.response_encoders import dumps
+from logger.logging import logger
+import global_variables.global_variable as gv
+
+class LiveSessionLimitError(Exception):
+    """Raised when a new live session would exceed the server or per-client session limit."""
+
+class LiveSession:
+    """
+    One client's live-prediction WebSocket: the 28x28 canvas kept on the
+    server, the number of canvas updates applied to it and the last
+    prediction pushed to the client.
+    """
+    def __init__(self, websocket, client: str, model_name: str):
+        self.session_id = str(uuid.uuid4())
+        self.websocket = websocket
+        self.client = client
+        self.model_name = model_name
+        self.canvas = np.zeros(784, dtype=np.float32)
+        self.sequence = 0  # Canvas updates applied so far; predictions report the sequence they saw
+        self.predictions = 0
+        self.last_pushed = None  # (prediction, confidence) last sent to the client
+        self.last_activity = time.monotonic()
+        self.changed = asyncio.Event()
+
+    def apply(self, clear: bool, indices: np.ndarray, values: np.ndarray):
+        """Apply a decoded canvas update and wake the session's prediction loop."""
+        if clear:
+            self.canvas[:] = 0
+        self.canvas[indices] = values
+        self.sequence += 1
+        self.last_activity = time.monotonic()
+        self.changed.set()
+
+class LiveSessionManager:
+    """
+    Live predict-as-you-draw sessions over WebSockets.
+
+    Clients send small canvas deltas instead of whole images; every session
+    keeps its canvas on the server. A session's prediction loop waits
+    debounce_ms after the first unpredicted update, then predicts the canvas
+    as it is by then, so a burst of strokes costs one forward pass. Only one
+    prediction per session is in flight at a time, and updates arriving
+    meanwhile are coalesced into the next one. Predictions go through the
+    micro-batch scheduler when it is enabled, sharing forward passes with
+    other sessions and /predict requests.
+
+    A prediction is pushed only when the predicted digit changes or its
+    confidence moves by at least min_confidence_change. Sessions idle for
+    idle_timeout_s are closed, and new sessions beyond max_sessions (or
+    max_sessions_per_client for one client) are refused.
+    """
+    def __init__(self, max_sessions: int = 1000, max_sessions_per_client: int = 8, idle_timeout_s: float = 120.0,
+                 debounce_ms: float = 30.0, min_confidence_change: float = 0.01):
+        if max_sessions < 1 or max_sessions_per_client < 1:
+            raise ValueError("Session limits must be at least 1")
+        if idle_timeout_s <= 0:
+            raise ValueError("idle_timeout_s must be positive")
+        if debounce_ms < 0:
+            raise ValueError("debounce_ms cannot be negative")
+
+        self.max_sessions = max_sessions
+        self.max_sessions_per_client = max_sessions_per_client
+        self.idle_timeout_s = idle_timeout_s
+        self.debounce_ms = debounce_ms
+        self.min_confidence_change = min_confidence_change
+
+        self._sessions: Dict[str, LiveSession] = {}
+        self._sessions_per_client = Counter()
+        self._sweeper: Optional[asyncio.Task] = None
+        self.peak_sessions = 0
+
+    async def start(self):
+        """Start evicting idle sessions on the running event loop."""
+        if self._sweeper is not None:
+            return
+        self._sweeper = asyncio.create_task(self._sweep())
+        logger.info(
+            f"Live sessions enabled (max_sessions={self.max_sessions}, idle_timeout_s={self.idle_timeout_s}, "
+            f"debounce_ms={self.debounce_ms})"
+        )
+
+    async def stop(self):
+        """Stop the idle sweeper and close every open session."""
+        if self._sweeper is None:
+            return
+        self._sweeper.cancel()
+        try:
+            await self._sweeper
+        except asyncio.CancelledError:
+            pass
+        self._sweeper = None
+
+        for session in list(self._sessions.values()):
+            await self._close_websocket(session, 1001, "Server is shutting down")
+        logger.info("Live sessions stopped")
+
+    def open(self, websocket, client: str, model_name: str) -> LiveSession:
+        """Register a new session for the client, or raise LiveSessionLimitError."""
+        if len(self._sessions) >= self.max_sessions:
+            gv.metrics.inc("live_sessions_total", outcome="rejected")
+            raise LiveSessionLimitError("Too many live sessions on this server, please retry later")
+        if self._sessions_per_client[client] >= self.max_sessions_per_client:
+            gv.metrics.inc("live_sessions_total", outcome="rejected")
+            raise LiveSessionLimitError(f"At most {self.max_sessions_per_client} live sessions per client")
+
+        session = LiveSession(websocket, client, model_name)
+        self._sessions[session.session_id] = session
+        self._sessions_per_client[client] += 1
+        self.peak_sessions = max(self.peak_sessions, len(self._sessions))
+        gv.metrics.inc("live_sessions_total", outcome="opened")
+        return session
+
+    def close(self, session: LiveSession):
+        """Forget a session once its WebSocket has disconnected."""
+        if self._sessions.pop(session.session_id, None) is None:
+            return
+        self._sessions_per_client[session.client] -= 1
+        if self._sessions_per_client[session.client] <= 0:
+            del self._sessions_per_client[session.client]
+
+    async def run_predictions(self, session: LiveSession):
+        """
+        Prediction loop of one session: debounce canvas updates, predict the
+        latest canvas and push the result when it changed. Runs until cancelled.
+        """
+        while True:
+            await session.changed.wait()
+            if self.debounce_ms:
+                await asyncio.sleep(self.debounce_ms / 1000)
+            session.changed.clear()
+            sequence = session.sequence
+
+            try:
+                model = gv.model_registry.get(session.model_name)
+                result = await self._predict(session, model)
+            except InferenceSaturatedError as e:
+                # The canvas stays unpredicted and is retried once workers free up
+                session.changed.set()
+                await asyncio.sleep(e.retry_after_s)
+                continue
+            except Exception as e:
+                update_metrics(-1, 0, success=False)
+                logger.error(f"Live prediction failed for session {session.session_id}: {str(e)}")
+                await session.websocket.send_text(dumps({"type": "error", "error": "Prediction failed"}).decode())
+                continue
+
+            session.predictions += 1
+            gv.metrics.inc("live_predictions_total")
+            update_metrics(result["prediction"], result["inference_time_ms"], success=True)
+            if not self._changed_prediction(session, result):
+                continue
+
+            session.last_pushed = (result["prediction"], result["confidence"])
+            gv.metrics.inc("live_pushes_total")
+            await session.websocket.send_text(dumps({
+                "type": "prediction",
+                "prediction": result["prediction"],
+                "confidence": result["confidence"],
+                "probabilities": [result["probabilities"][label] for label in CLASS_LABELS],
+                "inference_time_ms": result["inference_time_ms"],
+                "sequence": sequence
+            }).decode())
+
+    async def _predict(self, session: LiveSession, model) -> Dict[str, Any]:
+        """Predict a snapshot of the session's canvas, from the prediction cache when it has one."""
+        pixel_values = session.canvas.copy()
+        if gv.prediction_cache is not None:
+            cache_key = gv.prediction_cache.make_key(pixel_values, model.version)
+            result = await gv.prediction_cache.get(cache_key, model.version)
+            if result is not None:
+                result["inference_time_ms"] = 0.0
+                return result
+
+        with gv.inference_executor.admit():
+            if gv.batch_scheduler is not None:
+                result = await gv.batch_scheduler.submit(pixel_values, model.engine)
+            else:
+                result = await gv.inference_executor.run(
+                    predict_single_image, pixel_values, f"{session.session_id}-{session.predictions}", model.engine
+                )
+
+        if gv.prediction_cache is not None:
+            await gv.prediction_cache.put(cache_key, result, model.version)
+        model.metrics.record(result["prediction"], result["confidence"], result["inference_time_ms"])
+        return result
+
+    def _changed_prediction(self, session: LiveSession, result: Dict[str, Any]) -> bool:
+        """Whether the result differs enough from the last pushed prediction to send it."""
+        if session.last_pushed is None:
+            return True
+        prediction, confidence = session.last_pushed
+        return (
+            result["prediction"] != prediction
+            or abs(result["confidence"] - confidence) >= self.min_confidence_change
+        )
+
+    async def _close_websocket(self, session: LiveSession, code: int, reason: str):
+        try:
+            await session.websocket.close(code=code, reason=reason)
+        except Exception:
+            # Already closed by the client
+            pass
+
+    async def _sweep(self):
+        """Close sessions that have not sent a canvas update for idle_timeout_s."""
+        interval_s = min(self.idle_timeout_s / 4, 5.0)
+        while True:
+            await asyncio.sleep(interval_s)
+            now = time.monotonic()
+            for session in list(self._sessions.values()):
+                if now - session.last_activity > self.idle_timeout_s:
+                    logger.info(f"Closing idle live session {session.session_id}")
+                    gv.metrics.inc("live_sessions_total", outcome="evicted")
+                    # Evicted sessions free their slot right away, whether or not the client acknowledges the close
+                    self.close(session)
+                    await self._close_websocket(session, 1001, "Session idle")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Limits and the sessions currently open; session and prediction counters live in the metrics engine."""
+        return {
+            "max_sessions": self.max_sessions,
+            "max_sessions_per_client": self.max_sessions_per_client,
+            "idle_timeout_s": self.idle_timeout_s,
+            "debounce_ms": self.debounce_ms,
+            "active_sessions": len(self._sessions),
+            "peak_sessions": self.peak_sessions
+        }
@@ -2,47 +2,62 @@
 import os
 import torch
 import torch.nn as nn
-import torch.nn.functional as F
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from logger.logging import logger
+from saved_models.inference_engines import InferenceEngine, TorchEngine, CascadeEngine, resolve_backend, build_engine
+from saved_models.safetensors_loader import load_safetensors
+from saved_models.numpy_engine import NumpyEngine, load_numpy_state_dict, get_numpy_model_info
+from saved_models.model_widths import DEFAULT_WIDTHS, widths_from_shapes
+from saved_models.model_variants import (
+    resolve_variant, build_model_variant, quantize_dynamic_int8, is_dynamic_quantized_state_dict
+)
 
 class CNNModel(nn.Module):
     """
     Recreation of the CNN model architecture from your training code.
     This must match exactly the architecture you used during training.
+    
+    The layer widths default to the trained model's; structurally pruned and
+    distilled models are the same network with fewer conv filters or FC units.
     """
-    def __init__(self, num_classes=10, dropout_rate=0.25):  # Fixed: was 'init' instead of '__init__'
+    def __init__(self, num_classes=10, dropout_rate=0.25, conv1_channels=DEFAULT_WIDTHS["conv1_channels"],
+                 conv2_channels=DEFAULT_WIDTHS["conv2_channels"], fc1_units=DEFAULT_WIDTHS["fc1_units"]):  # Fixed: was 'init' instead of '__init__'
         super(CNNModel, self).__init__()  # Fixed: was 'init' instead of '__init__'
+        self.widths = {"conv1_channels": conv1_channels, "conv2_channels": conv2_channels, "fc1_units": fc1_units}
         
         # First convolutional block
-        self.conv1 = nn.Conv2d(in_channels=1, out_channels=32, kernel_size=3, padding=1)
+        self.conv1 = nn.Conv2d(in_channels=1, out_channels=conv1_channels, kernel_size=3, padding=1)
+        self.relu1 = nn.ReLU()
         self.pool1 = nn.MaxPool2d(kernel_size=2, stride=2)
         
         # Second convolutional block
-        self.conv2 = nn.Conv2d(in_channels=32, out_channels=64, kernel_size=3, padding=1)
+        self.conv2 = nn.Conv2d(in_channels=conv1_channels, out_channels=conv2_channels, kernel_size=3, padding=1)
+        self.relu2 = nn.ReLU()
         self.pool2 = nn.MaxPool2d(kernel_size=2, stride=2)
         
         # Dropout for regularization
         self.dropout1 = nn.Dropout(dropout_rate)
         
         # Fully connected layers
-        self.fc1 = nn.Linear(64 * 7 * 7, 128)
+        self.fc1 = nn.Linear(conv2_channels * 7 * 7, fc1_units)
+        self.relu3 = nn.ReLU()
         self.dropout2 = nn.Dropout(dropout_rate)
-        self.fc2 = nn.Linear(128, num_classes)
+        self.fc2 = nn.Linear(fc1_units, num_classes)
         
     def forward(self, x):
+        # ReLUs are modules (not F.relu) so conv/linear + ReLU pairs can be fused
         # First conv block with ReLU activation and pooling
-        x = self.pool1(F.relu(self.conv1(x)))
+        x = self.pool1(self.relu1(self.conv1(x)))
         
         # Second conv block with ReLU activation and pooling
-        x = self.pool2(F.relu(self.conv2(x)))
+        x = self.pool2(self.relu2(self.conv2(x)))
         
-        # Flatten the tensor for fully connected layers
-        x = x.view(-1, 64 * 7 * 7)
+        # Flatten the tensor for fully connected layers (also handles channels-last inputs)
+        x = torch.flatten(x, 1)
         
         # Apply dropout and first fully connected layer
         x = self.dropout1(x)
-        x = F.relu(self.fc1(x))
+        x = self.relu3(self.fc1(x))
         
         # Apply dropout and final classification layer
         x = self.dropout2(x)
@@ -50,51 +65,152 @@ class CNNModel(nn.Module):
         
         return x
 
-def load_model(model_path: str) -> torch.nn.Module:
+def load_model(model_path: str, backend: Optional[str] = None, num_threads: Optional[int] = None,
+               variant: Optional[str] = None, state_dict: Optional[Dict[str, torch.Tensor]] = None) -> InferenceEngine:
     """
     Load the trained model with comprehensive error handling.
     This function ensures the model loads correctly and is ready for inference.
+    
+    The returned engine is selected by `backend` (eager, torchscript, compile,
+    onnxruntime or numpy) or, when not given, by the model file extension.
+    `variant` builds an optimized model for the PyTorch backends: fused,
+    channels_last, dynamic_int8 or static_int8. State dicts saved from a
+    dynamically quantized model are detected and loaded as dynamic_int8.
+    
+    `.safetensors` files are memory-mapped rather than unpickled, which is
+    both faster to start and safe for weights from untrusted sources.
+    A preloaded `state_dict` (e.g. shared-memory weights from the prefork
+    launcher) is used instead of reading model_path. In both cases the float
+    model references the loaded tensors directly instead of copying them.
     """
     try:
-        logger.info(f"Loading model from {model_path}")
-        
-        # Initialize model architecture
-        model = CNNModel()
+        backend = resolve_backend(model_path, backend)
+        variant = resolve_variant(variant)
+        logger.info(f"Loading model from {model_path} with {backend} backend ({variant} variant)")
         
-        # Load the state dictionary
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Model file not found at {model_path}")
         
-        # Load with map_location to handle CPU/GPU differences
-        state_dict = torch.load(model_path, map_location=torch.device('cpu'))
-        model.load_state_dict(state_dict)
-        
-        # Set to evaluation mode - crucial for inference
-        model.eval()
+        # The torch-free engine reads float weights into numpy arrays
+        if backend == "numpy":
+            if variant != "float":
+                raise ValueError("Model variants are only available for PyTorch backends")
+            engine = NumpyEngine(load_numpy_state_dict(model_path), model_path=model_path)
+            logger.info("Model loaded successfully")
+            return engine
+        
+        # ONNX Runtime reads the graph and weights directly from the .onnx file
+        if backend == "onnxruntime":
+            if variant != "float":
+                raise ValueError("Model variants are only available for PyTorch backends")
+            engine = build_engine(None, backend, model_path, num_threads)
+            logger.info("Model loaded successfully")
+            return engine
         
+        # Load with map_location to handle CPU/GPU differences
+        zero_copy = state_dict is not None or model_path.endswith(".safetensors")
+        if state_dict is None:
+            state_dict = load_state_dict_file(model_path)
+        
+        # Initialize model architecture with the layer widths the weights were saved with
+        widths = model_widths(state_dict)
+        model = CNNModel(**widths)
+        
+        if is_dynamic_quantized_state_dict(state_dict):
+            # Quantized artifacts need the quantized module structure before loading
+            if variant not in ("float", "dynamic_int8"):
+                raise ValueError(f"{model_path} holds a dynamic int8 model and cannot be built as {variant}")
+            variant = "dynamic_int8"
+            model = quantize_dynamic_int8(model)
+            model.load_state_dict(state_dict)
+        else:
+            # assign=True makes the parameters share the mapped or preloaded tensors' memory
+            model.load_state_dict(state_dict, assign=zero_copy)
+            
+            # Set to evaluation mode - crucial for inference
+            model.eval()
+            model = build_model_variant(model, variant)
+        
+        engine = build_engine(model, backend, model_path, num_threads, variant)
+        engine.layer_widths = widths
         logger.info("Model loaded successfully")
-        return model
+        return engine
         
     except Exception as e:
         logger.error(f"Failed to load model: {str(e)}")
         raise RuntimeError(f"Model loading failed: {str(e)}")
 
-def get_model_info(model: torch.nn.Module) -> Dict[str, Any]:
+def load_state_dict_file(model_path: str) -> Dict[str, torch.Tensor]:
+    """
+    Read a state dict from a .safetensors file (memory-mapped, zero-copy) or
+    a .pth file. Pickled files are loaded with weights_only=True so they can
+    only contain tensors, never arbitrary objects.
+    """
+    if model_path.endswith(".safetensors"):
+        return load_safetensors(model_path)
+    return torch.load(model_path, map_location=torch.device('cpu'), weights_only=True)
+
+def _state_dict_tensors(state_dict):
+    """Flatten a state dict into (name, tensor) pairs, unpacking quantized packed params."""
+    tensors = []
+    for name, value in state_dict.items():
+        if isinstance(value, torch.Tensor):
+            tensors.append((name, value))
+        elif isinstance(value, tuple):
+            # Packed linear params are stored as (weight, bias)
+            tensors.extend(
+                (f"{name}.{suffix}", t) for suffix, t in zip(("weight", "bias"), value) if isinstance(t, torch.Tensor)
+            )
+    return tensors
+
+def model_widths(state_dict) -> Dict[str, int]:
+    """Layer widths of the CNNModel a (float or dynamic int8) state dict was saved from."""
+    return widths_from_shapes({name: tuple(tensor.shape) for name, tensor in _state_dict_tensors(state_dict)})
+
+def get_model_info(model: InferenceEngine) -> Dict[str, Any]:
     """
     Extract useful information about the loaded model.
     This helps with API documentation and debugging.
     """
-    total_params = sum(p.numel() for p in model.parameters())
-    trainable_params = sum(p.numel() for p in model.parameters() if p.requires_grad)
+    if isinstance(model, NumpyEngine):
+        return get_numpy_model_info(model)
+    
+    if isinstance(model, CascadeEngine):
+        # Describe each stage; sizes add up since every stage stays loaded
+        stages = [get_model_info(stage) for stage in model.stages]
+        return {
+            **stages[0],
+            "backend": model.backend,
+            "variant": model.variant,
+            "total_parameters": sum(stage["total_parameters"] or 0 for stage in stages),
+            "trainable_parameters": sum(stage["trainable_parameters"] for stage in stages),
+            "model_size_mb": round(sum(stage["model_size_mb"] for stage in stages), 2),
+            "cascade": {"threshold": model.threshold, "fast": stages[0], "escalation": stages[1:]}
+        }
     
-    # Calculate approximate model size in MB
-    model_size_mb = sum(p.numel() * p.element_size() for p in model.parameters()) / (1024 * 1024)
+    if isinstance(model, TorchEngine):
+        # Quantized layers keep their weights in packed params rather than parameters(),
+        # so count everything from the state dict at its real element size
+        tensors = _state_dict_tensors(model.model.state_dict())
+        total_params = sum(t.numel() for name, t in tensors if name.endswith(("weight", "bias")))
+        trainable_params = sum(p.numel() for p in model.parameters() if p.requires_grad)
+        
+        # Calculate in-memory model size in MB
+        model_size_mb = sum(t.numel() * t.element_size() for _, t in tensors) / (1024 * 1024)
+    else:
+        # Exported graphs carry no parameter objects; report the file size instead
+        total_params = None
+        trainable_params = 0
+        model_size_mb = os.path.getsize(model.model_path) / (1024 * 1024)
     
     return {
+        "backend": model.backend,
+        "variant": model.variant,
         "total_parameters": total_params,
         "trainable_parameters": trainable_params,
         "model_size_mb": round(model_size_mb, 2),
         "architecture": "CNN with 2 Conv layers + 2 FC layers",
+        "layer_widths": getattr(model, "layer_widths", None),
         "input_shape": [1, 28, 28],
         "output_classes": 10
     }
\ No newline at end of file
@@ -0,0 +1,301 @@
+# saved_models/model_registry.py
+import asyncio
+import hashlib
+import os
+import re
+import time
+from typing import Dict, Any, List, Optional, Sequence
+import numpy as np
+try:
+    import torch
+except ImportError:
+    # Slim deployments without torch serve every model with the numpy engine
+    torch = None
+if torch is not None:
+    from saved_models.inference_engines import CascadeEngine
+    from saved_models.model_architecture import load_model, get_model_info
+    from saved_models.shared_weights import get_shared_weights
+from saved_models.numpy_engine import load_numpy_model, get_numpy_model_info
+from saved_models.predict import inference_mode
+from logger.logging import logger
+import global_variables.global_variable as gv
+
+# Labels of the per-model confidence bins, 0.0-0.1 up to 0.9-1.0
+CONFIDENCE_BINS = tuple(f"{i / 10:.1f}-{(i + 1) / 10:.1f}" for i in range(10))
+
+# Default batch sizes run once after loading, so the first real requests don't
+# pay for kernel selection and allocator warm-up
+WARMUP_BATCH_SIZES = (1, 8, 32)
+
+MODEL_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+class ModelNotFoundError(LookupError):
+    """Raised when a request is routed to a model name that is not loaded."""
+
+def _confidence_bin(confidence: float) -> str:
+    return CONFIDENCE_BINS[min(max(int(confidence * 10), 0), 9)]
+
+class ModelMetrics:
+    """
+    Prediction metrics of a single registry entry, kept in the metrics engine.
+
+    Predictions, latencies and confidences are recorded into gv.metrics under
+    model and version labels, so they are safe to record from any thread, are
+    summed across worker processes and are exported to Prometheus with the
+    other series. Latency is a log-bucketed histogram and confidence is
+    counted in ten bins, so two models serving side by side can be compared
+    on their distributions, not only their averages. Only predictions that
+    actually ran the model are recorded; cache hits are not.
+    """
+    def __init__(self, model_name: str, model_version: str):
+        self.labels = {"model": model_name, "version": model_version}
+
+    def record(self, predicted_class: int, confidence: float, inference_time_ms: float):
+        """Record one prediction served by this model."""
+        gv.metrics.inc("model_predictions_total", digit=predicted_class, **self.labels)
+        gv.metrics.observe("model_inference_time_ms", inference_time_ms, **self.labels)
+        gv.metrics.inc("model_confidence_total", confidence=_confidence_bin(confidence), **self.labels)
+
+    def get_stats(self, snapshot) -> Dict[str, Any]:
+        """Return the counters and distributions of this model from a metrics snapshot."""
+        predictions_by_class = {
+            str(i): int(snapshot.counter("model_predictions_total", digit=i, **self.labels)) for i in range(10)
+        }
+        latency = snapshot.histogram("model_inference_time_ms", **self.labels).summary()
+        return {
+            "total_predictions": sum(predictions_by_class.values()),
+            "average_inference_time_ms": round(latency["mean_ms"], 3),
+            "predictions_by_class": predictions_by_class,
+            "latency_ms": latency,
+            "confidence_histogram": {
+                confidence_bin: int(snapshot.counter("model_confidence_total", confidence=confidence_bin, **self.labels))
+                for confidence_bin in CONFIDENCE_BINS
+            }
+        }
+
+class ModelEntry:
+    """A loaded, warmed-up model together with its identity and metrics."""
+    def __init__(self, name: str, engine, model_path: str, model_info: Dict[str, Any], version: str):
+        self.name = name
+        self.engine = engine
+        self.model_path = model_path
+        self.model_info = model_info
+        self.version = version
+        self.loaded_at = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.load_time_ms = 0.0
+        self.warmup_time_ms = 0.0
+        self.metrics = ModelMetrics(name, version)
+
+class ModelRegistry:
+    """
+    Holds several named models and swaps new versions in without downtime.
+
+    A new model (or a new version of an existing name) is loaded and warmed up
+    on a background thread while the current one keeps serving. It is then
+    swapped in with a single dictionary assignment: requests that already
+    resolved the old entry finish on it, and every later request sees the new
+    one. The default entry is mirrored into gv.model, gv.model_info and
+    gv.model_version for code that predates the registry.
+    """
+    def __init__(self, model_dir: str, num_threads: Optional[int] = None,
+                 warmup_batch_sizes: Sequence[int] = WARMUP_BATCH_SIZES):
+        self.model_dir = os.path.abspath(model_dir)
+        self.num_threads = num_threads
+        self.warmup_batch_sizes = tuple(warmup_batch_sizes)
+        self.default_name: Optional[str] = None
+
+        self._models: Dict[str, ModelEntry] = {}
+        self._loading: Dict[str, str] = {}
+        self._load_tasks = set()
+
+    def resolve_path(self, model_path: str) -> str:
+        """Resolve a model path relative to model_dir, refusing paths outside of it."""
+        path = os.path.abspath(os.path.join(self.model_dir, model_path))
+        if os.path.commonpath([path, self.model_dir]) != self.model_dir:
+            raise ValueError(f"Model path must be inside {self.model_dir}")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model file not found at {model_path}")
+        return path
+
+    def get(self, name: Optional[str] = None) -> ModelEntry:
+        """Return the named entry, or the default one when no name is given."""
+        entry = self._models.get(name or self.default_name)
+        if entry is None:
+            raise ModelNotFoundError(f"Model '{name or self.default_name}' is not loaded")
+        return entry
+
+    def names(self) -> List[str]:
+        return list(self._models)
+
+    def loading_status(self, name: str) -> Optional[str]:
+        """'loading' or 'failed: ...' for background loads, None when nothing is pending."""
+        return self._loading.get(name)
+
+    async def load(self, name: str, model_path: str, backend: Optional[str] = None,
+                   variant: Optional[str] = None, make_default: bool = False,
+                   cascade: Optional[Dict[str, Any]] = None) -> ModelEntry:
+        """
+        Load and warm up a model off the event loop, then swap it in under the given name.
+
+        Any entry previously registered under the name keeps serving until the
+        swap, and its cached predictions are invalidated afterwards.
+
+        With `cascade` the model at model_path becomes the escalation stage of
+        a CascadeEngine: a dict with fast_model_path, fast_backend,
+        fast_variant, ensemble_model_paths and threshold.
+        """
+        self._begin_load(name)
+        return await self._load(name, model_path, backend, variant, make_default, cascade)
+
+    def load_in_background(self, name: str, model_path: str, backend: Optional[str] = None,
+                           variant: Optional[str] = None, make_default: bool = False,
+                           cascade: Optional[Dict[str, Any]] = None) -> asyncio.Task:
+        """Schedule a load as a task; progress is reported by loading_status()."""
+        self._begin_load(name)
+        task = asyncio.create_task(self._load(name, model_path, backend, variant, make_default, cascade))
+        self._load_tasks.add(task)
+        # Failures are already logged and kept in loading_status()
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        task.add_done_callback(self._load_tasks.discard)
+        return task
+
+    def _begin_load(self, name: str):
+        if not MODEL_NAME_PATTERN.match(name):
+            raise ValueError("Model name may only contain letters, digits, '_', '-' and '.' (max 64 characters)")
+        if self._loading.get(name) == "loading":
+            raise RuntimeError(f"Model '{name}' is already being loaded")
+        self._loading[name] = "loading"
+
+    async def _load(self, name: str, model_path: str, backend: Optional[str], variant: Optional[str],
+                    make_default: bool, cascade: Optional[Dict[str, Any]]) -> ModelEntry:
+        try:
+            entry = await asyncio.to_thread(self._build_entry, name, model_path, backend, variant, cascade)
+        except Exception as e:
+            self._loading[name] = f"failed: {str(e)}"
+            logger.error(f"Failed to load model '{name}' from {model_path}: {str(e)}")
+            raise
+        del self._loading[name]
+
+        # Atomic swap: a single assignment on the event loop thread
+        previous = self._models.get(name)
+        self._models[name] = entry
+        if make_default or self.default_name in (None, name):
+            self.set_default(name)
+
+        if previous is not None and gv.prediction_cache is not None:
+            gv.prediction_cache.invalidate(previous.version)
+
+        logger.info(f"Model '{name}' ({entry.version}) is serving from {model_path}")
+        logger.info(f"Model info: {entry.model_info}")
+        return entry
+
+    def _build_entry(self, name: str, model_path: str, backend: Optional[str], variant: Optional[str],
+                     cascade: Optional[Dict[str, Any]] = None) -> ModelEntry:
+        load_start = time.perf_counter()
+        if torch is None:
+            engine = self._load_without_torch(model_path, backend, variant, cascade)
+        else:
+            engine = load_model(
+                model_path, backend=backend, num_threads=self.num_threads, variant=variant,
+                state_dict=get_shared_weights(model_path)
+            )
+            if cascade is not None:
+                engine = self._build_cascade(engine, cascade)
+        warmup_start = time.perf_counter()
+        self._warm_up(engine)
+        warmup_end = time.perf_counter()
+
+        # Fingerprint the weights so cached predictions from another model are never reused
+        fingerprint = f"{os.path.abspath(model_path)}:{os.path.getmtime(model_path)}:{engine.backend}:{engine.variant}"
+        if cascade is not None:
+            cascade_paths = [cascade["fast_model_path"], *cascade["ensemble_model_paths"]]
+            fingerprint += f":{sorted(cascade.items())}:{[os.path.getmtime(path) for path in cascade_paths]}"
+        version = hashlib.blake2b(fingerprint.encode(), digest_size=8).hexdigest()
+        model_info = get_model_info(engine) if torch is not None else get_numpy_model_info(engine)
+        entry = ModelEntry(name, engine, model_path, model_info, version)
+        entry.load_time_ms = round((warmup_start - load_start) * 1000, 2)
+        entry.warmup_time_ms = round((warmup_end - warmup_start) * 1000, 2)
+        logger.info(f"Model '{name}' loaded in {entry.load_time_ms}ms, warm-up took {entry.warmup_time_ms}ms")
+        return entry
+
+    @staticmethod
+    def _load_without_torch(model_path: str, backend: Optional[str], variant: Optional[str],
+                            cascade: Optional[Dict[str, Any]]):
+        """Without torch only float models on the numpy backend can be served."""
+        if backend not in (None, "numpy") or variant not in (None, "float") or cascade is not None:
+            raise ValueError("torch is not installed: only the numpy backend and the float variant are available")
+        return load_numpy_model(model_path)
+
+    def _build_cascade(self, engine, cascade: Dict[str, Any]) -> "CascadeEngine":
+        """Put a cheap model in front of the loaded one, optionally ensembled with more models."""
+        fast = load_model(
+            cascade["fast_model_path"], backend=cascade["fast_backend"], num_threads=self.num_threads,
+            variant=cascade["fast_variant"], state_dict=get_shared_weights(cascade["fast_model_path"])
+        )
+        ensemble = [
+            load_model(path, num_threads=self.num_threads, state_dict=get_shared_weights(path))
+            for path in cascade["ensemble_model_paths"]
+        ]
+        return CascadeEngine(fast, [engine, *ensemble], threshold=cascade["threshold"])
+
+    def _warm_up(self, engine):
+        """Run a few dummy forward passes before the model takes traffic."""
+        # Cascade stages are warmed directly so warm-up doesn't count as cascade traffic
+        stages = engine.stages if torch is not None and isinstance(engine, CascadeEngine) else [engine]
+        with inference_mode():
+            for batch_size in self.warmup_batch_sizes:
+                batch = np.zeros((batch_size, 1, 28, 28), dtype=np.float32)
+                for stage in stages:
+                    stage(torch.from_numpy(batch) if torch is not None else batch)
+
+    def set_default(self, name: str):
+        """Make the named model serve requests that don't ask for a specific model."""
+        entry = self.get(name)
+        self.default_name = name
+        gv.model = entry.engine
+        gv.model_info = entry.model_info
+        gv.model_version = entry.version
+
+    def unload(self, name: str):
+        """Remove a model from the registry; the default model cannot be unloaded."""
+        if name == self.default_name:
+            raise ValueError("The default model cannot be unloaded; make another model the default first")
+        entry = self._models.pop(name, None)
+        if entry is None:
+            raise ModelNotFoundError(f"Model '{name}' is not loaded")
+        if gv.prediction_cache is not None:
+            gv.prediction_cache.invalidate(entry.version)
+        logger.info(f"Model '{name}' unloaded")
+
+    def describe(self, name: str, snapshot=None) -> Dict[str, Any]:
+        """
+        Status, identity, model info and metrics of a registry entry. Metrics
+        are read from the given metrics snapshot, or from a fresh one.
+        """
+        entry = self._models.get(name)
+        loading_status = self._loading.get(name)
+        if entry is None and loading_status is None:
+            raise ModelNotFoundError(f"Model '{name}' is not loaded")
+
+        description = {
+            "name": name,
+            "status": loading_status or "ready",
+            "is_default": name == self.default_name,
+        }
+        if entry is not None:
+            # A name being reloaded keeps serving its current entry
+            description.update({
+                "status": "ready" if loading_status is None else f"ready ({loading_status})",
+                "version": entry.version,
+                "model_path": entry.model_path,
+                "loaded_at": entry.loaded_at,
+                "load_time_ms": entry.load_time_ms,
+                "warmup_time_ms": entry.warmup_time_ms,
+                "model_info": entry.model_info,
+                "metrics": entry.metrics.get_stats(snapshot or gv.metrics.snapshot())
+            })
+        return description
+
+    def describe_all(self) -> List[Dict[str, Any]]:
+        snapshot = gv.metrics.snapshot()
+        return [self.describe(name, snapshot) for name in dict.fromkeys([*self._models, *self._loading])]
@@ -0,0 +1,117 @@
+# saved_models/model_variants.py
+import copy
+import os
+from typing import Optional
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.ao.quantization as quantization
+from saved_models.idx_dataset import read_idx
+from logger.logging import logger
+
+MODEL_VARIANTS = ("float", "fused", "channels_last", "dynamic_int8", "static_int8")
+
+# Calibration images for static quantization (IDX3, 28x28 uint8)
+DEFAULT_CALIBRATION_PATH = os.path.join(os.path.dirname(__file__), "calibration_images.idx")
+
+# Conv/linear layers followed by a ReLU module in CNNModel
+FUSABLE_LAYERS = [["conv1", "relu1"], ["conv2", "relu2"], ["fc1", "relu3"]]
+
+class QuantizedCNNModel(nn.Module):
+    """
+    Wraps a CNN with quantize/dequantize stubs for static int8 quantization.
+    Inputs and outputs stay float32; everything in between runs in int8.
+    """
+    def __init__(self, model: nn.Module):
+        super(QuantizedCNNModel, self).__init__()
+        self.quant = quantization.QuantStub()
+        self.model = model
+        self.dequant = quantization.DeQuantStub()
+
+    def forward(self, x):
+        return self.dequant(self.model(self.quant(x)))
+
+def is_dynamic_quantized_state_dict(state_dict) -> bool:
+    """Whether a state dict was saved from a quantize_dynamic model (e.g. mnist_cnn_optimized.pth)."""
+    return any("_packed_params" in key for key in state_dict)
+
+def resolve_variant(variant: Optional[str]) -> str:
+    """Validate the requested model variant, defaulting to float."""
+    variant = (variant or "float").lower()
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown model variant '{variant}'. Supported: {', '.join(MODEL_VARIANTS)}")
+    return variant
+
+def fuse_conv_relu(model: nn.Module) -> nn.Module:
+    """Return a copy of the model with each conv/linear + ReLU pair fused into one module."""
+    fused = copy.deepcopy(model).eval()
+    return quantization.fuse_modules(fused, FUSABLE_LAYERS)
+
+def quantize_dynamic_int8(model: nn.Module) -> nn.Module:
+    """Dynamic int8 quantization of the linear layers, as in the training notebook."""
+    return quantization.quantize_dynamic(copy.deepcopy(model).eval(), {nn.Linear}, dtype=torch.qint8)
+
+def load_calibration_images(path: Optional[str] = None, limit: int = 256) -> torch.Tensor:
+    """
+    Load calibration inputs scaled to [0, 1], the range the API feeds the model.
+
+    Reads an IDX3 image file (MODEL_CALIBRATION_DATA or the bundled default).
+    When no file is available a deterministic set of synthetic pen strokes is
+    generated instead, which gives usable but less accurate activation ranges.
+    """
+    path = path or os.environ.get("MODEL_CALIBRATION_DATA", DEFAULT_CALIBRATION_PATH)
+    if os.path.exists(path):
+        images = read_idx(path)[:limit].astype(np.float32) / 255
+        return torch.from_numpy(images).reshape(-1, 1, 28, 28)
+
+    logger.warning(f"Calibration data not found at {path}; calibrating on synthetic strokes")
+    return synthetic_stroke_images(limit)
+
+def synthetic_stroke_images(count: int, seed: int = 0) -> torch.Tensor:
+    """Render random thick pen strokes on a 28x28 canvas, similar to drawings from the frontend."""
+    rng = np.random.default_rng(seed)
+    ys, xs = np.mgrid[0:28, 0:28].astype(np.float32)
+    images = np.zeros((count, 28, 28), dtype=np.float32)
+
+    for image in images:
+        for _ in range(rng.integers(1, 4)):
+            # Distance from each pixel to a random line segment inside the digit box
+            (y0, x0), (y1, x1) = rng.uniform(5, 23, size=(2, 2))
+            dy, dx = y1 - y0, x1 - x0
+            t = np.clip(((ys - y0) * dy + (xs - x0) * dx) / max(dy * dy + dx * dx, 1e-6), 0, 1)
+            distance = np.hypot(ys - (y0 + t * dy), xs - (x0 + t * dx))
+            np.maximum(image, np.clip(1.5 - distance / 1.2, 0, 1), out=image)
+
+    return torch.from_numpy(images).reshape(-1, 1, 28, 28)
+
+def quantize_static_int8(model: nn.Module, calibration_images: Optional[torch.Tensor] = None) -> nn.Module:
+    """
+    Static int8 quantization of every conv and linear layer.
+
+    Conv/linear + ReLU pairs are fused first, observers are calibrated on a
+    small sample, and the model is converted to quantized kernels.
+    """
+    if calibration_images is None:
+        calibration_images = load_calibration_images()
+
+    prepared = QuantizedCNNModel(fuse_conv_relu(model)).eval()
+    prepared.qconfig = quantization.get_default_qconfig(torch.backends.quantized.engine)
+    quantization.prepare(prepared, inplace=True)
+
+    with torch.no_grad():
+        for batch in torch.split(calibration_images, 64):
+            prepared(batch)
+
+    return quantization.convert(prepared, inplace=True)
+
+def build_model_variant(model: nn.Module, variant: str) -> nn.Module:
+    """Build the requested inference variant from a float model."""
+    if variant == "fused":
+        return fuse_conv_relu(model)
+    if variant == "channels_last":
+        return fuse_conv_relu(model).to(memory_format=torch.channels_last)
+    if variant == "dynamic_int8":
+        return quantize_dynamic_int8(model)
+    if variant == "static_int8":
+        return quantize_static_int8(model)
+    return model
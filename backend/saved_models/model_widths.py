@@ -0,0 +1,55 @@
+# saved_models/model_widths.py
+import math
+from typing import Dict, Tuple, Mapping
+
+# Layer widths of CNNModel as trained in model_training.ipynb
+DEFAULT_WIDTHS = {"conv1_channels": 32, "conv2_channels": 64, "fc1_units": 128}
+
+def cnn_weight_shapes(conv1_channels: int = 32, conv2_channels: int = 64, fc1_units: int = 128,
+                      num_classes: int = 10) -> Dict[str, Tuple[int, ...]]:
+    """Shapes of the float CNNModel state dict for the given layer widths."""
+    return {
+        "conv1.weight": (conv1_channels, 1, 3, 3),
+        "conv1.bias": (conv1_channels,),
+        "conv2.weight": (conv2_channels, conv1_channels, 3, 3),
+        "conv2.bias": (conv2_channels,),
+        "fc1.weight": (fc1_units, conv2_channels * 7 * 7),
+        "fc1.bias": (fc1_units,),
+        "fc2.weight": (num_classes, fc1_units),
+        "fc2.bias": (num_classes,),
+    }
+
+def widths_from_shapes(shapes: Mapping[str, Tuple[int, ...]]) -> Dict[str, int]:
+    """
+    Layer widths of the CNNModel a state dict was saved from, read off its
+    weight shapes (name -> shape). Weights inside quantized packed params are
+    recognised by prefix, e.g. fc1._packed_params._packed_params.weight.
+    """
+    def layer_weight(layer: str) -> Tuple[int, ...]:
+        for name, shape in shapes.items():
+            if name.startswith(f"{layer}.") and name.endswith("weight"):
+                return shape
+        raise ValueError(f"State dict has no {layer} weight; not a CNNModel checkpoint")
+
+    return {
+        "conv1_channels": layer_weight("conv1")[0],
+        "conv2_channels": layer_weight("conv2")[0],
+        "fc1_units": layer_weight("fc1")[0],
+    }
+
+def count_parameters(widths: Mapping[str, int], num_classes: int = 10) -> int:
+    """Number of weights and biases of a float CNNModel with these widths."""
+    return sum(math.prod(shape) for shape in cnn_weight_shapes(num_classes=num_classes, **widths).values())
+
+def count_macs(widths: Mapping[str, int], num_classes: int = 10) -> int:
+    """
+    Multiply-accumulates of one forward pass on a 28x28 image.
+    conv2 dominates: it is ~85% of the original model's compute.
+    """
+    conv1, conv2, fc1 = widths["conv1_channels"], widths["conv2_channels"], widths["fc1_units"]
+    return (
+        28 * 28 * conv1 * 9            # conv1: 1 input channel, 3x3 kernel, full resolution
+        + 14 * 14 * conv2 * 9 * conv1  # conv2 after the first 2x2 pool
+        + conv2 * 7 * 7 * fc1          # fc1 on the flattened 7x7 maps
+        + fc1 * num_classes            # fc2
+    )
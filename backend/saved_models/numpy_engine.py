@@ -0,0 +1,170 @@
+# saved_models/numpy_engine.py
+import os
+from typing import Dict, Any, Optional
+import numpy as np
+from saved_models.safetensors_loader import load_safetensors_numpy
+from saved_models.buffer_pool import BufferPool
+from saved_models.model_widths import cnn_weight_shapes, widths_from_shapes, count_parameters
+from logger.logging import logger
+import global_variables.global_variable as gv
+
+
+def _buffer(buffers: Optional[BufferPool], name: str, batch_size: int, row_shape) -> np.ndarray:
+    """A pooled float32 buffer when a pool is given, otherwise a fresh zeroed array."""
+    if buffers is None:
+        return np.zeros((batch_size, *row_shape), dtype=np.float32)
+    return buffers.get(name, batch_size, tuple(row_shape))
+
+def conv3x3_relu(x: np.ndarray, weight: np.ndarray, bias: np.ndarray,
+                 buffers: Optional[BufferPool] = None, name: str = "conv") -> np.ndarray:
+    """
+    3x3 convolution with padding 1, followed by ReLU, on NHWC input.
+
+    im2col: every 3x3xC neighbourhood becomes one row of a matrix, so the
+    whole convolution over the batch is a single GEMM against the weights
+    given as a (9 * C, out_channels) matrix in (kh, kw, C) row order. The
+    matrix is filled with nine contiguous shifted copies of the input, which
+    is much faster than materializing a strided sliding-window view.
+    With a buffer pool, the padded input, the matrix and the output are
+    reused between calls; only the interior of the padded input is ever
+    written, so its zero border survives reuse.
+    """
+    batch_size, height, width, channels = x.shape
+    out_channels = weight.shape[1]
+    padded = _buffer(buffers, f"{name}_padded", batch_size, (height + 2, width + 2, channels))
+    padded[:, 1:-1, 1:-1] = x
+
+    columns = _buffer(buffers, f"{name}_columns", batch_size, (height, width, 9, channels))
+    for dy in range(3):
+        for dx in range(3):
+            columns[:, :, :, dy * 3 + dx] = padded[:, dy:dy + height, dx:dx + width]
+
+    out = _buffer(buffers, f"{name}_out", batch_size, (height, width, out_channels))
+    out_matrix = out.reshape(batch_size * height * width, out_channels)
+    np.matmul(columns.reshape(batch_size * height * width, 9 * channels), weight, out=out_matrix)
+    out_matrix += bias
+    np.maximum(out_matrix, 0, out=out_matrix)
+    return out
+
+def max_pool2x2(x: np.ndarray, buffers: Optional[BufferPool] = None, name: str = "pool") -> np.ndarray:
+    """2x2 max pooling with stride 2 on NHWC input."""
+    batch_size, height, width, channels = x.shape
+    out = _buffer(buffers, name, batch_size, (height // 2, width // 2, channels))
+    return np.max(x.reshape(batch_size, height // 2, 2, width // 2, 2, channels), axis=(2, 4), out=out)
+
+def softmax(logits: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Row-wise softmax, shifted by the row maximum for numerical stability; written to out when given."""
+    exp = np.subtract(logits, logits.max(axis=1, keepdims=True), out=out)
+    np.exp(exp, out=exp)
+    exp /= exp.sum(axis=1, keepdims=True)
+    return exp
+
+class NumpyEngine:
+    """
+    CNNModel forward pass in vectorized NumPy, for deployments without torch.
+
+    Follows the InferenceEngine interface (called with a (batch_size, 1, 28, 28)
+    float32 batch, returns (batch_size, 10) logits) without depending on torch:
+    inputs may be numpy arrays or CPU tensors, outputs are numpy arrays.
+    Convolutions run as im2col + GEMM in NHWC layout. The weights are
+    rearranged once at load time into the matrices each layer multiplies by,
+    including fc1, whose columns are permuted so flattening NHWC activations
+    matches torch's NCHW flatten order. Dropout is the identity at inference.
+    Activations live in gv.buffer_pool when serving, so the returned logits
+    are only valid until the same thread runs the engine again.
+    """
+    backend = "numpy"
+    variant = "float"
+
+    def __init__(self, state_dict: Dict[str, np.ndarray], model_path: Optional[str] = None):
+        # Layer widths are read off the weights, so structurally pruned models load as well
+        self.layer_widths = widths_from_shapes({name: tuple(value.shape) for name, value in state_dict.items()})
+        for name, shape in cnn_weight_shapes(**self.layer_widths).items():
+            if name not in state_dict:
+                raise ValueError(f"State dict is missing {name}; the numpy backend only supports float CNNModel weights")
+            if tuple(state_dict[name].shape) != shape:
+                raise ValueError(f"{name} has shape {tuple(state_dict[name].shape)}, expected {shape}")
+
+        def weights(name):
+            return np.asarray(state_dict[name], dtype=np.float32)
+
+        self.model_path = model_path
+        self.parameter_count = count_parameters(self.layer_widths)
+        conv1_channels, conv2_channels, fc1_units = self.layer_widths.values()
+
+        # (out, in, kh, kw) -> (kh * kw * in, out), matching the im2col row order
+        self.conv1_weight = np.ascontiguousarray(weights("conv1.weight").transpose(2, 3, 1, 0).reshape(-1, conv1_channels))
+        self.conv1_bias = weights("conv1.bias")
+        self.conv2_weight = np.ascontiguousarray(weights("conv2.weight").transpose(2, 3, 1, 0).reshape(-1, conv2_channels))
+        self.conv2_bias = weights("conv2.bias")
+        # fc1 expects (C, H, W)-ordered features; reorder its columns to (H, W, C)
+        self.fc1_weight = np.ascontiguousarray(
+            weights("fc1.weight").reshape(fc1_units, conv2_channels, 7, 7).transpose(0, 2, 3, 1).reshape(fc1_units, -1).T
+        )
+        self.fc1_bias = weights("fc1.bias")
+        self.fc2_weight = np.ascontiguousarray(weights("fc2.weight").T)
+        self.fc2_bias = weights("fc2.bias")
+
+    def __call__(self, batch) -> np.ndarray:
+        x = np.asarray(batch, dtype=np.float32)
+        batch_size = x.shape[0]
+        # (N, 1, 28, 28) -> NHWC; with a single channel this is a free reshape
+        x = x.reshape(batch_size, 28, 28, 1)
+        buffers = gv.buffer_pool
+
+        x = max_pool2x2(conv3x3_relu(x, self.conv1_weight, self.conv1_bias, buffers, "conv1"), buffers, "pool1")
+        x = max_pool2x2(conv3x3_relu(x, self.conv2_weight, self.conv2_bias, buffers, "conv2"), buffers, "pool2")
+
+        hidden = _buffer(buffers, "fc1_out", batch_size, (self.fc1_weight.shape[1],))
+        np.matmul(x.reshape(batch_size, -1), self.fc1_weight, out=hidden)
+        hidden += self.fc1_bias
+        np.maximum(hidden, 0, out=hidden)
+
+        logits = _buffer(buffers, "logits", batch_size, (10,))
+        np.matmul(hidden, self.fc2_weight, out=logits)
+        logits += self.fc2_bias
+        return logits
+
+def load_numpy_state_dict(model_path: str) -> Dict[str, np.ndarray]:
+    """
+    Read CNNModel weights as numpy arrays. .safetensors files are memory-mapped
+    and need no torch; .pth files can only be read when torch is installed.
+    """
+    if model_path.endswith(".safetensors"):
+        return load_safetensors_numpy(model_path)
+
+    try:
+        import torch
+    except ImportError:
+        raise ValueError("Without torch the numpy backend needs a .safetensors model file")
+    state_dict = torch.load(model_path, map_location=torch.device("cpu"), weights_only=True)
+    return {name: value.numpy() for name, value in state_dict.items() if isinstance(value, torch.Tensor)}
+
+def load_numpy_model(model_path: str) -> NumpyEngine:
+    """Load a float CNNModel checkpoint into the NumPy engine."""
+    try:
+        logger.info(f"Loading model from {model_path} with numpy backend (float variant)")
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model file not found at {model_path}")
+
+        engine = NumpyEngine(load_numpy_state_dict(model_path), model_path=model_path)
+        logger.info("Model loaded successfully")
+        return engine
+
+    except Exception as e:
+        logger.error(f"Failed to load model: {str(e)}")
+        raise RuntimeError(f"Model loading failed: {str(e)}")
+
+def get_numpy_model_info(model: NumpyEngine) -> Dict[str, Any]:
+    """Model information in the same form as get_model_info reports for torch engines."""
+    return {
+        "backend": model.backend,
+        "variant": model.variant,
+        "total_parameters": model.parameter_count,
+        "trainable_parameters": 0,
+        "model_size_mb": round(model.parameter_count * 4 / (1024 * 1024), 2),
+        "architecture": "CNN with 2 Conv layers + 2 FC layers",
+        "layer_widths": model.layer_widths,
+        "input_shape": [1, 28, 28],
+        "output_classes": 10
+    }
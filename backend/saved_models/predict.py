@@ -1,26 +1,76 @@
 # saved_models/prediction.py
+import contextlib
 import time
-import torch
-import torch.nn.functional as F
-from typing import List, Dict, Any
+import numpy as np
+try:
+    import torch
+    import torch.nn.functional as F
+except ImportError:
+    # Slim deployments without torch predict with the numpy engine on numpy arrays
+    torch = None
+from typing import List, Dict, Any, Optional, Union
 # Fixed import path to use global_variable instead of global_variables
 import global_variables.global_variable as gv
 from logger.logging import logger
+from saved_models.numpy_engine import softmax
+from saved_models.buffer_pool import BufferPool
 
-def preprocess_image(pixel_values: List[float]) -> torch.Tensor:
+# Model inputs: torch tensors, or numpy arrays when torch isn't installed
+Tensor = torch.Tensor if torch is not None else np.ndarray
+
+# Probability dictionary keys, one per digit class
+CLASS_LABELS = tuple(str(i) for i in range(10))
+
+def inference_mode():
+    """
+    torch.inference_mode(), or a no-op context when running without torch.
+    Cheaper than no_grad: tensors created inside skip version counting and view tracking.
+    """
+    return torch.inference_mode() if torch is not None else contextlib.nullcontext()
+
+def _is_float32_array(pixel_values) -> bool:
+    """
+    Whether the pixels can be wrapped as a tensor as they are. Read-only arrays,
+    such as binary bodies decoded with np.frombuffer, can't be: torch.from_numpy
+    warns on them, so they are copied like any other input.
+    """
+    return isinstance(pixel_values, np.ndarray) and pixel_values.dtype == np.float32 and pixel_values.flags.writeable
+
+def _writable(array: np.ndarray) -> np.ndarray:
+    """The array itself, or a copy of it when it is read-only."""
+    return array if array.flags.writeable else array.copy()
+
+def _as_model_input(batch_array: np.ndarray) -> Tensor:
+    """Reshape (batch_size, 784) pixels into a (batch_size, 1, 28, 28) model input without copying."""
+    if torch is None:
+        return batch_array.reshape(-1, 1, 28, 28)
+    return torch.from_numpy(batch_array).reshape(-1, 1, 28, 28)
+
+def preprocess_image(pixel_values: Union[List[float], np.ndarray], buffers: Optional[BufferPool] = None) -> Tensor:
     """
     Preprocess pixel values for model inference.
     
     This function takes a list of pixel values and converts them into
-    the tensor format expected by your trained model.
+    the tensor format expected by your trained model. With a buffer pool,
+    pixels that need converting are copied into a reused input buffer.
     """
     try:
         # Validate input length
         if len(pixel_values) != 784:
             raise ValueError(f"Expected 784 pixel values, got {len(pixel_values)}")
         
-        # Convert list to tensor and reshape for MNIST (28x28 grayscale)
-        tensor = torch.tensor(pixel_values, dtype=torch.float32).reshape(1, 1, 28, 28)  # Add batch dimension
+        if buffers is not None and not _is_float32_array(pixel_values):
+            batch_array = buffers.get("input", 1, (784,))
+            batch_array[0] = pixel_values
+            return _as_model_input(batch_array)
+        
+        # Convert to tensor and reshape for MNIST (28x28 grayscale); numpy input is wrapped without a copy
+        if torch is None:
+            tensor = np.asarray(pixel_values, dtype=np.float32).reshape(1, 1, 28, 28)
+        elif isinstance(pixel_values, np.ndarray):
+            tensor = torch.from_numpy(_writable(pixel_values.astype(np.float32, copy=False))).reshape(1, 1, 28, 28)
+        else:
+            tensor = torch.tensor(pixel_values, dtype=torch.float32).reshape(1, 1, 28, 28)  # Add batch dimension
         
         return tensor
         
@@ -28,137 +78,177 @@ def preprocess_image(pixel_values: List[float]) -> torch.Tensor:
         logger.error(f"Image preprocessing failed: {str(e)}")
         raise ValueError(f"Image preprocessing failed: {str(e)}")
 
-def preprocess_batch_images(batch_pixel_values: List[List[float]]) -> torch.Tensor:
+def preprocess_batch_images(batch_pixel_values: Union[List[List[float]], np.ndarray],
+                            buffers: Optional[BufferPool] = None) -> Tensor:
     """
     Preprocess multiple sets of pixel values for batch inference.
     
     This function takes a list of pixel value lists and converts them into
-    a batch tensor format expected by your trained model.
+    a batch tensor format expected by your trained model. The whole batch is
+    converted in a single numpy call; packed (batch_size, 784) float32 arrays
+    are wrapped without a copy. With a buffer pool, batches that need
+    converting are copied into a reused input buffer instead of a new array.
     """
     try:
-        # Convert each list to tensor and stack them into a batch
-        tensors = []
-        for pixel_values in batch_pixel_values:
-            if len(pixel_values) != 784:
-                raise ValueError(f"Each image must have exactly 784 pixel values, got {len(pixel_values)}")
-            
-            # Reshape to (1, 28, 28) for single image
-            tensor = torch.tensor(pixel_values, dtype=torch.float32).reshape(1, 28, 28)
-            tensors.append(tensor)
+        if buffers is not None and not _is_float32_array(batch_pixel_values):
+            # Check every row first: assigning a shorter row would broadcast silently
+            for pixel_values in batch_pixel_values:
+                if len(pixel_values) != 784:
+                    raise ValueError(f"Each image must have exactly 784 pixel values, got {len(pixel_values)}")
+            batch_array = buffers.get("input", len(batch_pixel_values), (784,))
+            batch_array[...] = batch_pixel_values
+            return _as_model_input(batch_array)
+        
+        try:
+            batch_array = np.asarray(batch_pixel_values, dtype=np.float32)
+        except ValueError:
+            # Ragged input: report the first image with the wrong length
+            for pixel_values in batch_pixel_values:
+                if len(pixel_values) != 784:
+                    raise ValueError(f"Each image must have exactly 784 pixel values, got {len(pixel_values)}")
+            raise
         
-        # Stack all tensors into a batch (batch_size, 1, 28, 28)
-        batch_tensor = torch.stack(tensors)
+        if batch_array.ndim != 2 or batch_array.shape[1] != 784:
+            raise ValueError(f"Each image must have exactly 784 pixel values, got shape {batch_array.shape}")
         
-        return batch_tensor
+        # Reshape into a batch (batch_size, 1, 28, 28)
+        return _as_model_input(_writable(batch_array))
         
     except Exception as e:
         logger.error(f"Batch image preprocessing failed: {str(e)}")
         raise ValueError(f"Batch image preprocessing failed: {str(e)}")
 
-def predict_single_image(pixel_values: List[float], request_id: str) -> Dict[str, Any]:
+def postprocess_logits(logits, buffers: Optional[BufferPool] = None):
+    """
+    Convert a batch of logits into plain Python results in one pass.
+    
+    Softmax, argmax and confidence are computed on the whole batch and pulled
+    out with a single .tolist() each, instead of per-element .item() calls.
+    Accepts torch tensors and the numpy arrays returned by the numpy engine.
+    With a buffer pool, the intermediate results are written into reused
+    output buffers. Returns (predicted_classes, confidences, probability_rows).
+    """
+    batch_size = len(logits)
+    if isinstance(logits, np.ndarray):
+        if buffers is None:
+            probabilities = softmax(logits)
+            predicted_classes = probabilities.argmax(axis=1)
+            confidences = probabilities.max(axis=1)
+        else:
+            probabilities = softmax(logits, out=buffers.get("probabilities", batch_size, (10,)))
+            predicted_classes = np.argmax(
+                probabilities, axis=1, out=buffers.get("predicted_classes", batch_size, dtype=np.int64)
+            )
+            confidences = np.max(probabilities, axis=1, out=buffers.get("confidences", batch_size))
+        return predicted_classes.tolist(), confidences.tolist(), probabilities.tolist()
+    
+    if buffers is None:
+        probabilities = F.softmax(logits, dim=1)
+        confidences, predicted_classes = probabilities.max(dim=1)
+    else:
+        probabilities = torch.from_numpy(buffers.get("probabilities", batch_size, (10,)))
+        confidences = torch.from_numpy(buffers.get("confidences", batch_size))
+        predicted_classes = torch.from_numpy(buffers.get("predicted_classes", batch_size, dtype=np.int64))
+        torch.softmax(logits, dim=1, out=probabilities)
+        torch.max(probabilities, dim=1, out=(confidences, predicted_classes))
+    return predicted_classes.tolist(), confidences.tolist(), probabilities.tolist()
+
+def predict_single_image(pixel_values: Union[List[float], np.ndarray], request_id: str, model=None) -> Dict[str, Any]:
     """
     Predict a single image and return results.
+    Uses the given model (a registry entry's engine) or the default gv.model.
     """
+    model = model if model is not None else gv.model
+    
     # Check if model is loaded
-    if gv.model is None:
+    if model is None:
         raise RuntimeError("Model not loaded. Please check server startup logs.")
     
     # Read and preprocess image
-    processed_tensor = preprocess_image(pixel_values)
+    preprocess_start = time.perf_counter()
+    processed_tensor = preprocess_image(pixel_values, gv.buffer_pool)
     
     # Run inference
-    inference_start = time.time()
-    with torch.no_grad():
-        logits = gv.model(processed_tensor)
-        probabilities = F.softmax(logits, dim=1)
-        predicted_class = torch.argmax(probabilities, dim=1).item()
-        confidence = probabilities[0][predicted_class].item()
+    inference_start = time.perf_counter()
+    with inference_mode():
+        logits = model(processed_tensor)
+        predicted_classes, confidences, probability_rows = postprocess_logits(logits, gv.buffer_pool)
     
-    inference_time = (time.time() - inference_start) * 1000  # Convert to milliseconds
-    
-    # Create probability dictionary
-    prob_dict = {str(i): float(probabilities[0][i]) for i in range(10)}
+    inference_time = (time.perf_counter() - inference_start) * 1000  # Convert to milliseconds
+    gv.metrics.observe("preprocess_ms", (inference_start - preprocess_start) * 1000)
+    gv.metrics.observe("inference_ms", inference_time)
     
     return {
-        "prediction": predicted_class,
-        "confidence": round(confidence, 4),
-        "probabilities": prob_dict,
+        "prediction": predicted_classes[0],
+        "confidence": round(confidences[0], 4),
+        "probabilities": dict(zip(CLASS_LABELS, probability_rows[0])),
         "inference_time_ms": round(inference_time, 2)
     }
 
-def predict_batch_images(batch_pixel_values: List[List[float]], request_id: str) -> Dict[str, Any]:
+def predict_batch_images(batch_pixel_values: Union[List[List[float]], np.ndarray], request_id: str, model=None) -> Dict[str, Any]:
     """
     Predict multiple images in batch and return results.
+    Uses the given model (a registry entry's engine) or the default gv.model.
     """
+    model = model if model is not None else gv.model
+    
     # Check if model is loaded
-    if gv.model is None:
+    if model is None:
         raise RuntimeError("Model not loaded. Please check server startup logs.")
         
     # Preprocess all images into a batch tensor
-    batch_tensor = preprocess_batch_images(batch_pixel_values)
+    preprocess_start = time.perf_counter()
+    batch_tensor = preprocess_batch_images(batch_pixel_values, gv.buffer_pool)
     
     # Run batch inference
-    inference_start = time.time()
-    predictions = []
+    inference_start = time.perf_counter()
     
-    with torch.no_grad():
+    with inference_mode():
         # Process the entire batch at once for efficiency
-        logits = gv.model(batch_tensor)
-        probabilities = F.softmax(logits, dim=1)
-        predicted_classes = torch.argmax(probabilities, dim=1)
-        
-        # Extract results for each image in the batch
-        for i in range(len(batch_pixel_values)):
-            predicted_class = predicted_classes[i].item()
-            confidence = probabilities[i][predicted_class].item()
-            
-            # Create probability dictionary for this image
-            prob_dict = {str(j): float(probabilities[i][j]) for j in range(10)}
-            
-            # Create individual prediction result
-            individual_result = {
-                "prediction": predicted_class,
-                "confidence": round(confidence, 4),
-                "probabilities": prob_dict,
-                "inference_time_ms": 0  # Will be calculated after batch processing
-            }
-            
-            predictions.append(individual_result)
+        logits = model(batch_tensor)
+        predicted_classes, confidences, probability_rows = postprocess_logits(logits, gv.buffer_pool)
     
     # Calculate timing information
-    total_inference_time = (time.time() - inference_start) * 1000  # Convert to milliseconds
-    average_inference_time = total_inference_time / len(batch_pixel_values)
+    total_inference_time = (time.perf_counter() - inference_start) * 1000  # Convert to milliseconds
+    gv.metrics.observe("preprocess_ms", (inference_start - preprocess_start) * 1000)
+    gv.metrics.observe("inference_ms", total_inference_time)
+    average_inference_time = round(total_inference_time / len(predicted_classes), 2)
     
-    # Update individual prediction timing
-    for prediction in predictions:
-        prediction["inference_time_ms"] = round(average_inference_time, 2)
+    # Build individual prediction results from the extracted lists
+    predictions = [
+        {
+            "prediction": predicted_class,
+            "confidence": round(confidence, 4),
+            "probabilities": dict(zip(CLASS_LABELS, probability_row)),
+            "inference_time_ms": average_inference_time
+        }
+        for predicted_class, confidence, probability_row in zip(predicted_classes, confidences, probability_rows)
+    ]
     
     return {
         "predictions": predictions,
         "total_inference_time_ms": round(total_inference_time, 2),
-        "average_inference_time_ms": round(average_inference_time, 2)
+        "average_inference_time_ms": average_inference_time
     }
 
 def update_metrics(predicted_class: int, inference_time: float, success: bool):
     """
     Background task to update prediction metrics.
     This runs asynchronously to avoid impacting response times.
-    """
-    gv.prediction_metrics["total_predictions"] += 1
     
+    Safe to call from any thread: the metrics engine keeps per-thread counters,
+    so concurrent updates are never lost. inference_time is the per-image time
+    reported to the client; cache hits report 0 and are left out of the histogram.
+    """
     if success:
-        gv.prediction_metrics["successful_predictions"] += 1
+        gv.metrics.inc("predictions_total", status="success")
         
-        # Update average inference time (only if inference_time > 0)
+        # Record the distribution, not only the mean, so tail latency stays visible
         if inference_time > 0:
-            current_avg = gv.prediction_metrics["average_inference_time"]
-            total_successful = gv.prediction_metrics["successful_predictions"]
-            gv.prediction_metrics["average_inference_time"] = (
-                (current_avg * (total_successful - 1) + inference_time) / total_successful
-            )
+            gv.metrics.observe("prediction_time_ms", inference_time)
         
         # Update class-specific metrics
         if 0 <= predicted_class <= 9:
-            gv.prediction_metrics["predictions_by_class"][str(predicted_class)] += 1
+            gv.metrics.inc("predictions_by_class_total", digit=predicted_class)
     else:
-        gv.prediction_metrics["failed_predictions"] += 1
+        gv.metrics.inc("predictions_total", status="failure")
@@ -0,0 +1,179 @@
+# saved_models/prediction_cache.py
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Union
+import numpy as np
+from logger.logging import logger
+
+class SharedCacheBackend:
+    """
+    SQLite-backed prediction store shared by all workers on the host.
+
+    Point it at a file on a memory-backed filesystem (e.g. /dev/shm) so every
+    uvicorn worker process can reuse predictions computed by the others.
+    Calls block on SQLite and, across processes, on its file lock; call them
+    from a worker thread rather than the event loop.
+    """
+    def __init__(self, path: str, max_entries: int, ttl_s: float = 0.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self._conn = sqlite3.connect(path, timeout=1.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions "
+            "(key BLOB PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM predictions WHERE key = ?", (key,)).fetchone()
+        if row is None or (self.ttl_s and time.time() - row[1] > self.ttl_s):
+            return None
+        return json.loads(row[0])
+
+    def put(self, key: bytes, value: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO predictions (key, value, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time())
+            )
+            self._writes += 1
+            # Trim the oldest entries now and then rather than on every write. INSERT OR REPLACE
+            # gives a rewritten row a new rowid, so rowid order is write order and the trim is a
+            # range delete on the table's own b-tree instead of a sort over created_at
+            if self._writes % 256 == 0:
+                self._conn.execute(
+                    "DELETE FROM predictions WHERE rowid <= "
+                    "(SELECT rowid FROM predictions ORDER BY rowid DESC LIMIT 1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM predictions")
+
+class PredictionCache:
+    """
+    In-process prediction cache keyed by a hash of the quantized pixel buffer.
+
+    Pixels are quantized to 3 decimals (the precision the drawing frontend
+    sends), so repeated submissions of the same image hit the cache without
+    running the model. Entries are evicted least-recently-used once max_entries
+    is reached and, when ttl_s is set, expire after ttl_s seconds. Keys include
+    the model version, so a different model never sees another model's entries,
+    and invalidate() drops a version's entries once that model is replaced.
+    """
+    def __init__(self, max_entries: int = 4096, ttl_s: float = 0.0,
+                 shared_backend: Optional[SharedCacheBackend] = None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.shared_backend = shared_backend
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(pixel_values: Union[List[float], np.ndarray], model_version: str) -> bytes:
+        """Hash the pixel buffer, quantized to 3 decimals, together with the model version."""
+        quantized = np.rint(np.asarray(pixel_values, dtype=np.float32) * 1000).astype(np.int32)
+        digest = hashlib.blake2b(quantized.tobytes(), digest_size=16)
+        digest.update(model_version.encode())
+        return digest.digest()
+
+    async def get(self, key: bytes, model_version: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a copy of the cached result, or None on a miss. The local store
+        is checked inline; the shared backend is queried in a worker thread.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, created_at, _ = entry
+                if self.ttl_s and time.monotonic() - created_at > self.ttl_s:
+                    del self._entries[key]
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(value)
+
+        if self.shared_backend is not None:
+            value = await asyncio.to_thread(self.shared_backend.get, key)
+            if value is not None:
+                with self._lock:
+                    self.shared_hits += 1
+                    self._store(key, value, model_version)
+                return dict(value)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    async def put(self, key: bytes, value: Dict[str, Any], model_version: str):
+        """Store a prediction result for the given key, writing the shared backend in a worker thread."""
+        with self._lock:
+            self._store(key, value, model_version)
+        if self.shared_backend is not None:
+            await asyncio.to_thread(self.shared_backend.put, key, value)
+
+    def _store(self, key: bytes, value: Dict[str, Any], model_version: str):
+        self._entries[key] = (value, time.monotonic(), model_version)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, model_version: str):
+        """Drop every local entry computed by the given model version."""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry[2] == model_version]
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                self.invalidations += 1
+        if stale:
+            logger.info(f"Prediction cache invalidated {len(stale)} entries of replaced model {model_version}")
+
+    def clear(self):
+        """Remove every entry from the local and shared stores."""
+        with self._lock:
+            self._entries.clear()
+        if self.shared_backend is not None:
+            self.shared_backend.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss/eviction counters."""
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "shared": self.shared_backend is not None,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
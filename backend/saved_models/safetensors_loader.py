@@ -0,0 +1,175 @@
+# saved_models/safetensors_loader.py
+import json
+import math
+import mmap
+import struct
+from typing import Dict, Any, Tuple, Union
+import numpy as np
+try:
+    import torch
+except ImportError:
+    # Slim deployments without torch only use load_safetensors_numpy
+    torch = None
+
+# Dtype names from the safetensors format specification (all data is little-endian),
+# mapped to the torch/numpy dtype name and the element size in bytes
+SAFETENSORS_DTYPES = {
+    "F64": ("float64", 8),
+    "F32": ("float32", 4),
+    "F16": ("float16", 2),
+    "BF16": ("bfloat16", 2),
+    "I64": ("int64", 8),
+    "I32": ("int32", 4),
+    "I16": ("int16", 2),
+    "I8": ("int8", 1),
+    "U8": ("uint8", 1),
+    "BOOL": ("bool", 1),
+}
+
+# Refuse absurd header sizes before allocating anything
+MAX_HEADER_SIZE = 100 * 1024 * 1024
+
+def read_safetensors_header(f) -> Tuple[Dict[str, Any], int]:
+    """
+    Read the JSON header of an open safetensors file.
+    Returns the per-tensor header entries and the offset where tensor data starts.
+    """
+    prefix = f.read(8)
+    if len(prefix) < 8:
+        raise ValueError("Not a safetensors file: missing header size")
+
+    header_size = struct.unpack("<Q", prefix)[0]
+    if header_size > MAX_HEADER_SIZE:
+        raise ValueError(f"safetensors header of {header_size} bytes exceeds the {MAX_HEADER_SIZE} byte limit")
+
+    try:
+        header = json.loads(f.read(header_size))
+    except ValueError:
+        raise ValueError("Not a safetensors file: header is not valid JSON")
+    if not isinstance(header, dict):
+        raise ValueError("Not a safetensors file: header is not a JSON object")
+
+    header.pop("__metadata__", None)
+    return header, 8 + header_size
+
+def _is_int(value) -> bool:
+    # JSON true/false load as bool, which is an int subclass
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _check_entry(name: str, entry) -> Tuple[str, int, list, int, int]:
+    """Validate one tensor's header entry; returns its dtype name, itemsize, shape and data offsets."""
+    if not isinstance(entry, dict):
+        raise ValueError(f"Header entry of tensor {name} is not a JSON object")
+    if entry.get("dtype") not in SAFETENSORS_DTYPES:
+        raise ValueError(f"Unsupported dtype {entry.get('dtype')} for tensor {name}")
+    dtype_name, itemsize = SAFETENSORS_DTYPES[entry["dtype"]]
+
+    shape = entry.get("shape")
+    if not isinstance(shape, list) or not all(_is_int(dim) and dim >= 0 for dim in shape):
+        raise ValueError(f"Tensor {name} has an invalid shape {shape!r}")
+    offsets = entry.get("data_offsets")
+    if not isinstance(offsets, list) or len(offsets) != 2 or not all(_is_int(offset) for offset in offsets):
+        raise ValueError(f"Tensor {name} has invalid data offsets {offsets!r}")
+    start, end = offsets
+    if not 0 <= start <= end:
+        raise ValueError(f"Tensor {name} has invalid data offsets {offsets!r}")
+    if end - start != math.prod(shape) * itemsize:
+        raise ValueError(f"Tensor {name} has data offsets that do not match its shape and dtype")
+    return dtype_name, itemsize, shape, start, end
+
+def _map_safetensors(path: str, use_mmap: bool):
+    """
+    Open a safetensors file and yield (name, dtype name, shape, offset, count)
+    for each tensor together with the buffer holding the data.
+    """
+    with open(path, "rb") as f:
+        header, data_start = read_safetensors_header(f)
+        if use_mmap:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        else:
+            f.seek(0)
+            buffer = bytearray(f.read())
+
+    entries = sorted(
+        ((name, *_check_entry(name, entry)) for name, entry in header.items()),
+        key=lambda checked: (checked[4], checked[5])
+    )
+
+    # Tensor data must be one contiguous run from the end of the header, without holes or overlaps
+    tensors = []
+    data_end = 0
+    for name, dtype_name, itemsize, shape, start, end in entries:
+        if start != data_end:
+            raise ValueError(f"Tensor {name} data overlaps another tensor or leaves a gap")
+        if data_start + end > len(buffer):
+            raise ValueError(f"Tensor {name} has invalid data offsets; the file may be truncated")
+        tensors.append((name, dtype_name, shape, data_start + start, (end - start) // itemsize))
+        data_end = end
+    return tensors, buffer
+
+def load_safetensors(path: str, use_mmap: bool = True) -> Dict[str, "torch.Tensor"]:
+    """
+    Load a safetensors file into a state dict without unpickling anything.
+
+    With use_mmap the file is mapped copy-on-write and every tensor is a view
+    into the mapping: nothing is copied at load time, pages are read from disk
+    on first use, and processes mapping the same file share them through the
+    page cache. Without it the file is read into memory once.
+    """
+    tensors, buffer = _map_safetensors(path, use_mmap)
+    state_dict = {}
+    for name, dtype_name, shape, offset, count in tensors:
+        dtype = getattr(torch, dtype_name)
+        if count == 0:
+            state_dict[name] = torch.empty(shape, dtype=dtype)
+        else:
+            state_dict[name] = torch.frombuffer(buffer, dtype=dtype, count=count, offset=offset).reshape(shape)
+    return state_dict
+
+def load_safetensors_numpy(path: str, use_mmap: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Load a safetensors file as numpy arrays, without torch.
+    Arrays are zero-copy views into the mapped file, as with load_safetensors.
+    """
+    tensors, buffer = _map_safetensors(path, use_mmap)
+    arrays = {}
+    for name, dtype_name, shape, offset, count in tensors:
+        if dtype_name == "bfloat16":
+            raise ValueError(f"Tensor {name} is bfloat16, which numpy does not support")
+        dtype = np.dtype(dtype_name).newbyteorder("<")
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset).reshape(shape)
+    return arrays
+
+def save_safetensors(state_dict: Dict[str, Union["torch.Tensor", np.ndarray]], path: str,
+                     metadata: Dict[str, str] = None):
+    """
+    Write tensors (or numpy arrays) to a safetensors file, in name order.
+    The header is padded to a multiple of 8 bytes so every tensor is aligned
+    when the file is memory-mapped. Quantized tensors cannot be stored.
+    """
+    dtype_names = {dtype_name: code for code, (dtype_name, _) in SAFETENSORS_DTYPES.items()}
+    header = {"__metadata__": metadata} if metadata else {}
+    blobs = []
+    offset = 0
+    for name in sorted(state_dict):
+        value = state_dict[name]
+        if torch is not None and isinstance(value, torch.Tensor):
+            if value.is_quantized:
+                raise ValueError(f"Tensor {name} is quantized and cannot be saved as safetensors")
+            value = value.detach().cpu().contiguous().numpy()
+        array = np.ascontiguousarray(value)
+        dtype_name = array.dtype.name
+        if dtype_name not in dtype_names:
+            raise ValueError(f"Unsupported dtype {dtype_name} for tensor {name}")
+        data = array.astype(array.dtype.newbyteorder("<"), copy=False).tobytes()
+        header[name] = {"dtype": dtype_names[dtype_name], "shape": list(array.shape), "data_offsets": [offset, offset + len(data)]}
+        blobs.append(data)
+        offset += len(data)
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    header_bytes += b" " * (-len(header_bytes) % 8)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        for data in blobs:
+            f.write(data)
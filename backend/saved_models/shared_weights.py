@@ -0,0 +1,49 @@
+# saved_models/shared_weights.py
+import os
+from typing import Dict, Optional
+import torch
+from saved_models.model_variants import is_dynamic_quantized_state_dict
+from saved_models.model_architecture import load_state_dict_file
+from logger.logging import logger
+import global_variables.global_variable as gv
+
+def _weights_key(model_path: str) -> str:
+    # The modification time is part of the key so a replaced file is never served from stale weights
+    return f"{os.path.abspath(model_path)}:{os.path.getmtime(model_path)}"
+
+def share_model_weights(model_path: str) -> bool:
+    """
+    Load a model's state dict once into shared memory.
+
+    Call this in the parent process before forking workers: every worker
+    then builds its float model on the same physical pages instead of
+    loading a private copy. ONNX models and dynamically quantized state
+    dicts are not shared and are loaded by each worker as usual. Safetensors
+    files need no preloading: workers memory-map them and share the pages
+    through the page cache. Returns whether the weights were shared.
+    """
+    if model_path.endswith(".onnx"):
+        return False
+    if model_path.endswith(".safetensors"):
+        logger.info(f"Not preloading {model_path}: workers share its memory-mapped pages")
+        return False
+
+    state_dict = load_state_dict_file(model_path)
+    if is_dynamic_quantized_state_dict(state_dict):
+        logger.info(f"Not sharing {model_path}: quantized packed weights are loaded per worker")
+        return False
+
+    size_bytes = 0
+    for tensor in state_dict.values():
+        tensor.share_memory_()
+        size_bytes += tensor.numel() * tensor.element_size()
+
+    gv.shared_state_dicts[_weights_key(model_path)] = state_dict
+    logger.info(f"Shared {size_bytes / 1024 / 1024:.2f}MB of weights from {model_path} across workers")
+    return True
+
+def get_shared_weights(model_path: str) -> Optional[Dict[str, torch.Tensor]]:
+    """The shared state dict of model_path, or None when it was not preloaded."""
+    if not gv.shared_state_dicts or not os.path.exists(model_path):
+        return None
+    return gv.shared_state_dicts.get(_weights_key(model_path))
@@ -0,0 +1,361 @@
+# saved_models/training.py
+"""
+Scripted training and export of CNNModel, replacing the notebook's pipeline.
+
+model_training.ipynb trains through torchvision datasets, re-decoding and
+re-normalizing every image through per-sample transforms in DataLoader
+workers on every epoch. Here the IDX files are decoded and normalized once
+into a float32 .npy cache next to them; later runs memory-map the cache,
+load it into one tensor (on the GPU when there is one), and train on large
+batches gathered straight from that tensor.
+
+The rest follows the notebook: a 50k/10k train/validation split, Adam,
+early stopping on validation loss, global magnitude pruning at the largest
+amount that stays within 3% of the original test accuracy, and dynamic int8
+quantization of the pruned model. Every run is seeded, and writes the
+notebook's artifacts in one go:
+    <prefix>_original.pth/.safetensors/.onnx
+    <prefix>_pruned_only.pth/.safetensors/.onnx
+    <prefix>_optimized.pth (pruned and int8-quantized)
+
+The API feeds the model pixels scaled to [0, 1] without normalization;
+--mean 0 --std 1 trains on exactly that input instead of the notebook's
+MNIST statistics.
+
+Run from the backend directory, e.g.:
+    python -m saved_models.training --data-dir data --output saved_models/mnist_cnn
+    python -m saved_models.training --download data --epochs 5 --output /tmp/mnist_cnn --report /tmp/report.json
+"""
+import argparse
+import copy
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import torch.nn.utils.prune as prune
+from saved_models.model_architecture import CNNModel
+from saved_models.model_widths import DEFAULT_WIDTHS
+from saved_models.model_variants import quantize_dynamic_int8
+from saved_models.compression import export_model
+from saved_models.idx_dataset import map_idx
+from logger.logging import logger
+
+# Mean and standard deviation of MNIST training pixels, as normalized in model_training.ipynb
+MNIST_MEAN = 0.1307
+MNIST_STD = 0.3081
+
+# Raw file names of the MNIST distribution (torchvision's MNIST/raw directory uses the same)
+MNIST_FILES = {
+    "train": ("train-images-idx3-ubyte", "train-labels-idx1-ubyte"),
+    "test": ("t10k-images-idx3-ubyte", "t10k-labels-idx1-ubyte"),
+}
+
+PRUNE_AMOUNTS = (0.1, 0.15, 0.2, 0.25)
+
+def find_mnist_files(data_dir: str, split: str) -> Tuple[str, str]:
+    """Images and labels IDX paths of a split in data_dir, plain or gzip-compressed."""
+    paths = []
+    for name in MNIST_FILES[split]:
+        candidates = [os.path.join(data_dir, name + suffix) for suffix in ("", ".gz")]
+        path = next((candidate for candidate in candidates if os.path.exists(candidate)), None)
+        if path is None:
+            raise FileNotFoundError(f"{name}[.gz] not found in {data_dir}")
+        paths.append(path)
+    return paths[0], paths[1]
+
+def download_mnist(root: str) -> str:
+    """Download MNIST with torchvision (once) and return the directory with its raw IDX files."""
+    try:
+        import torchvision
+    except ImportError:
+        raise RuntimeError("torchvision is required for --download; pass IDX files with --data-dir instead")
+    for train in (True, False):
+        torchvision.datasets.MNIST(root=root, train=train, download=True)
+    return os.path.join(root, "MNIST", "raw")
+
+def _cache_key(images_path: str, labels_path: str, mean: float, std: float) -> str:
+    """Changes whenever a source file or the normalization changes, so stale caches are never reused."""
+    parts = [f"{mean!r}", f"{std!r}"]
+    for path in (images_path, labels_path):
+        stat = os.stat(path)
+        parts += [os.path.abspath(path), str(stat.st_size), str(stat.st_mtime_ns)]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:12]
+
+def cached_dataset(images_path: str, labels_path: str, cache_dir: Optional[str] = None,
+                   mean: float = MNIST_MEAN, std: float = MNIST_STD) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Normalized (N, 1, 28, 28) float32 images and (N,) int64 labels of an IDX image/label pair.
+
+    The first call decodes and normalizes the IDX files and writes the result
+    as .npy files in cache_dir (by default next to the images); later calls
+    memory-map those files, so preprocessing happens once per dataset.
+    """
+    cache_dir = cache_dir or os.path.dirname(os.path.abspath(images_path))
+    os.makedirs(cache_dir, exist_ok=True)
+    stem = os.path.basename(images_path).split(".")[0]
+    key = _cache_key(images_path, labels_path, mean, std)
+    images_cache = os.path.join(cache_dir, f"{stem}.{key}.images.npy")
+    labels_cache = os.path.join(cache_dir, f"{stem}.{key}.labels.npy")
+
+    if not (os.path.exists(images_cache) and os.path.exists(labels_cache)):
+        start = time.perf_counter()
+        pixels = map_idx(images_path)
+        labels = map_idx(labels_path)
+        if pixels.dtype != np.uint8 or pixels.ndim != 3 or pixels.shape[1:] != (28, 28):
+            raise ValueError(f"Expected an IDX3 file of 28x28 unsigned byte images, got {pixels.dtype} {pixels.shape}")
+        if labels.ndim != 1 or len(labels) != len(pixels):
+            raise ValueError(f"Expected {len(pixels)} labels in an IDX1 file, got shape {labels.shape}")
+
+        images = (np.asarray(pixels, dtype=np.float32) / 255 - np.float32(mean)) / np.float32(std)
+        # Written under temporary names and renamed, so an interrupted run never leaves a partial cache behind
+        for path, array in ((images_cache, images.reshape(-1, 1, 28, 28)), (labels_cache, labels.astype(np.int64))):
+            with open(f"{path}.tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(f"{path}.tmp", path)
+        logger.info(f"Cached {len(images)} normalized images from {images_path} in {time.perf_counter() - start:.1f}s")
+
+    return np.load(images_cache, mmap_mode="r"), np.load(labels_cache, mmap_mode="r")
+
+def as_tensors(images: np.ndarray, labels: np.ndarray, device: torch.device) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Copy a mapped dataset into one images tensor and one labels tensor on the device."""
+    return torch.from_numpy(np.array(images)).to(device), torch.from_numpy(np.array(labels)).to(device)
+
+def split_train_val(count: int, val_size: int, seed: int) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Seeded random train and validation indices (the notebook's random_split of 50k/10k)."""
+    if not 0 < val_size < count:
+        raise ValueError(f"val_size must be between 1 and {count - 1}, got {val_size}")
+    order = torch.randperm(count, generator=torch.Generator().manual_seed(seed))
+    return order[val_size:], order[:val_size]
+
+def set_deterministic(seed: int):
+    """Seed every generator and prefer deterministic kernels, so a run can be reproduced exactly."""
+    torch.manual_seed(seed)
+    np.random.seed(seed)
+    torch.use_deterministic_algorithms(True, warn_only=True)
+    if torch.backends.cudnn.is_available():
+        torch.backends.cudnn.benchmark = False
+
+def evaluate(model: nn.Module, images: torch.Tensor, labels: torch.Tensor, batch_size: int = 2000) -> Tuple[float, float]:
+    """Mean cross-entropy loss and accuracy of the model on a dataset held as tensors."""
+    model.eval()
+    total_loss, correct = 0.0, 0
+    with torch.inference_mode():
+        for start in range(0, len(images), batch_size):
+            logits = model(images[start:start + batch_size])
+            targets = labels[start:start + batch_size]
+            total_loss += F.cross_entropy(logits, targets, reduction="sum").item()
+            correct += (logits.argmax(dim=1) == targets).sum().item()
+    return total_loss / len(images), correct / len(images)
+
+def train(model: nn.Module, images: torch.Tensor, labels: torch.Tensor, val_images: torch.Tensor,
+          val_labels: torch.Tensor, epochs: int = 20, batch_size: int = 512, lr: float = 1e-3,
+          patience: int = 5, min_delta: float = 1e-3, seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Train with Adam on shuffled batches gathered from the in-memory tensors.
+
+    Stops early once validation loss has not improved by min_delta for
+    patience epochs, and restores the weights of the epoch with the best
+    validation accuracy. Returns the metrics of every epoch.
+    """
+    generator = torch.Generator(device=images.device).manual_seed(seed)
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    history = []
+    best_loss, stale_epochs = float("inf"), 0
+    best_accuracy, best_state = -1.0, None
+
+    for epoch in range(epochs):
+        start = time.perf_counter()
+        model.train()
+        order = torch.randperm(len(images), generator=generator, device=images.device)
+        total_loss, correct = 0.0, 0
+        for batch_start in range(0, len(order), batch_size):
+            indices = order[batch_start:batch_start + batch_size]
+            batch, targets = images[indices], labels[indices]
+            logits = model(batch)
+            loss = F.cross_entropy(logits, targets)
+
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item() * len(indices)
+            correct += (logits.argmax(dim=1) == targets).sum().item()
+
+        val_loss, val_accuracy = evaluate(model, val_images, val_labels)
+        history.append({
+            "epoch": epoch + 1,
+            "train_loss": round(total_loss / len(images), 5),
+            "train_accuracy": round(correct / len(images), 5),
+            "val_loss": round(val_loss, 5),
+            "val_accuracy": round(val_accuracy, 5),
+            "seconds": round(time.perf_counter() - start, 2)
+        })
+        logger.info(f"Epoch {epoch + 1}/{epochs}: {history[-1]}")
+
+        if val_accuracy > best_accuracy:
+            best_accuracy, best_state = val_accuracy, copy.deepcopy(model.state_dict())
+        if val_loss < best_loss - min_delta:
+            best_loss, stale_epochs = val_loss, 0
+        else:
+            stale_epochs += 1
+            if stale_epochs >= patience:
+                logger.info(f"Validation loss stopped improving, stopping after epoch {epoch + 1}")
+                break
+
+    if best_state is not None:
+        model.load_state_dict(best_state)
+    model.eval()
+    return history
+
+def prune_unstructured(model: CNNModel, amount: float) -> CNNModel:
+    """
+    Copy of the model with the given fraction of its conv and linear weights
+    zeroed, smallest magnitudes first across all layers (the notebook's prune_model).
+    """
+    pruned = copy.deepcopy(model)
+    parameters = [
+        (module, "weight") for module in pruned.modules()
+        if isinstance(module, (nn.Conv2d, nn.Linear))
+    ]
+    prune.global_unstructured(parameters, pruning_method=prune.L1Unstructured, amount=amount)
+    for module, name in parameters:
+        prune.remove(module, name)
+    return pruned.eval()
+
+def select_pruning(model: CNNModel, test_images: torch.Tensor, test_labels: torch.Tensor,
+                   baseline_accuracy: float, max_drop: float = 0.03,
+                   amounts=PRUNE_AMOUNTS) -> Tuple[CNNModel, float, float]:
+    """
+    Try the pruning amounts in increasing order and keep the largest amount
+    whose accuracy is within max_drop of the baseline, stopping at the first
+    amount that drops further. Returns the model, its amount (0 when no
+    amount qualifies) and its accuracy.
+    """
+    best_model, best_amount, best_accuracy = model, 0.0, baseline_accuracy
+    for amount in sorted(amounts):
+        candidate = prune_unstructured(model, amount)
+        _, accuracy = evaluate(candidate, test_images, test_labels)
+        logger.info(f"Pruning {amount:.0%}: accuracy {accuracy:.4f}, drop {baseline_accuracy - accuracy:.4f}")
+        if baseline_accuracy - accuracy > max_drop:
+            break
+        best_model, best_amount, best_accuracy = candidate, amount, accuracy
+    return best_model, best_amount, best_accuracy
+
+def run_pipeline(data_dir: str, output_prefix: str, cache_dir: Optional[str] = None, epochs: int = 20,
+                 batch_size: int = 512, lr: float = 1e-3, val_size: int = 10000, seed: int = 42,
+                 mean: float = MNIST_MEAN, std: float = MNIST_STD, max_prune_drop: float = 0.03,
+                 formats=("pth", "safetensors", "onnx"), device: Optional[str] = None,
+                 widths: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    Train, prune, quantize and export a model from the MNIST files in data_dir.
+    Returns a report of the data, the training history, accuracies and the written files.
+    """
+    set_deterministic(seed)
+    device = torch.device(device or ("cuda" if torch.cuda.is_available() else "cpu"))
+
+    start = time.perf_counter()
+    train_images, train_labels = as_tensors(*cached_dataset(*find_mnist_files(data_dir, "train"), cache_dir, mean, std), device)
+    test_images, test_labels = as_tensors(*cached_dataset(*find_mnist_files(data_dir, "test"), cache_dir, mean, std), device)
+    train_indices, val_indices = split_train_val(len(train_images), val_size, seed)
+    train_indices, val_indices = train_indices.to(device), val_indices.to(device)
+    val_images, val_labels = train_images[val_indices], train_labels[val_indices]
+    train_images, train_labels = train_images[train_indices], train_labels[train_indices]
+    data_seconds = time.perf_counter() - start
+    logger.info(
+        f"Loaded {len(train_images)} training, {len(val_images)} validation and {len(test_images)} test images "
+        f"on {device} in {data_seconds:.1f}s"
+    )
+
+    model = CNNModel(**(widths or DEFAULT_WIDTHS)).to(device)
+    history = train(model, train_images, train_labels, val_images, val_labels,
+                    epochs=epochs, batch_size=batch_size, lr=lr, seed=seed)
+    _, original_accuracy = evaluate(model, test_images, test_labels)
+
+    # Pruning, quantization and export run on the CPU, where the served model runs
+    model = model.cpu()
+    test_images, test_labels = test_images.cpu(), test_labels.cpu()
+    pruned, prune_amount, pruned_accuracy = select_pruning(
+        model, test_images, test_labels, original_accuracy, max_prune_drop
+    )
+    optimized = quantize_dynamic_int8(pruned)
+    _, optimized_accuracy = evaluate(optimized, test_images, test_labels)
+
+    output_dir = os.path.dirname(output_prefix)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    exported = export_model(model, f"{output_prefix}_original", formats)
+    exported.update(export_model(pruned, f"{output_prefix}_pruned_only", formats))
+    optimized_path = f"{output_prefix}_optimized.pth"
+    torch.save(optimized.state_dict(), optimized_path)
+    exported[optimized_path] = os.path.getsize(optimized_path)
+
+    return {
+        "seed": seed,
+        "device": str(device),
+        "normalization": {"mean": mean, "std": std},
+        "images": {"train": len(train_images), "validation": len(val_images), "test": len(test_images)},
+        "data_load_seconds": round(data_seconds, 2),
+        "history": history,
+        "test_accuracy": {
+            "original": round(original_accuracy, 5),
+            "pruned_only": round(pruned_accuracy, 5),
+            "optimized": round(optimized_accuracy, 5)
+        },
+        "prune_amount": prune_amount,
+        "exported": exported
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train CNNModel on MNIST and export every model format")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data-dir", help="Directory with the MNIST IDX files (plain or .gz)")
+    source.add_argument("--download", metavar="ROOT", help="Download MNIST with torchvision into ROOT first")
+    parser.add_argument("--cache-dir", default=None, help="Where the normalized .npy cache goes; defaults to the data directory")
+    parser.add_argument("--output", default="saved_models/mnist_cnn",
+                        help="Artifact prefix: writes <output>_original, <output>_pruned_only and <output>_optimized")
+    parser.add_argument("--formats", default="pth,safetensors,onnx")
+    parser.add_argument("--epochs", type=int, default=20, help="Maximum epochs; training stops early on a validation plateau")
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--val-size", type=int, default=10000, help="Training images held out for validation")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mean", type=float, default=MNIST_MEAN, help="Normalization mean (0 with --std 1 matches the API's input)")
+    parser.add_argument("--std", type=float, default=MNIST_STD)
+    parser.add_argument("--widths", default=None, help="conv1,conv2,fc1 widths, e.g. 16,32,64; defaults to 32,64,128")
+    parser.add_argument("--max-prune-drop", type=float, default=0.03, help="Largest test accuracy drop accepted from pruning")
+    parser.add_argument("--device", default=None, help="Torch device; defaults to cuda when available, else cpu")
+    parser.add_argument("--report", default=None, help="Write the run report as JSON to this file")
+    args = parser.parse_args()
+
+    data_dir = download_mnist(args.download) if args.download else args.data_dir
+    widths = dict(zip(DEFAULT_WIDTHS, (int(width) for width in args.widths.split(",")))) if args.widths else None
+    report = run_pipeline(
+        data_dir, args.output,
+        cache_dir=args.cache_dir,
+        epochs=args.epochs,
+        batch_size=args.batch_size,
+        lr=args.lr,
+        val_size=args.val_size,
+        seed=args.seed,
+        mean=args.mean,
+        std=args.std,
+        max_prune_drop=args.max_prune_drop,
+        formats=args.formats.split(","),
+        device=args.device,
+        widths=widths
+    )
+
+    accuracy = report["test_accuracy"]
+    print(
+        f"Test accuracy: original {accuracy['original']:.4f}, pruned {report['prune_amount']:.0%} "
+        f"{accuracy['pruned_only']:.4f}, optimized {accuracy['optimized']:.4f}"
+    )
+    for path, size in report["exported"].items():
+        print(f"Wrote {path} ({size / 1e6:.2f} MB)")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,100 @@
+# saved_models/warmup.py
+import asyncio
+import time
+from typing import Tuple, Sequence
+import numpy as np
+from saved_models.predict import predict_single_image, predict_batch_images
+from schema.response_schema import (
+    PredictionResponse, BatchPredictionResponse, CompactPredictionResponse, CompactBatchPredictionResponse
+)
+from schema.response_encoders import FastJSONResponse, prediction_payload, batch_payload
+from logger.logging import logger
+import global_variables.global_variable as gv
+
+def parse_batch_sizes(spec: str) -> Tuple[int, ...]:
+    """Parse a comma-separated list of positive batch sizes such as "1,8,32"."""
+    try:
+        batch_sizes = tuple(int(part) for part in spec.split(",") if part.strip())
+    except ValueError:
+        raise ValueError(f"Invalid batch size list '{spec}', expected comma-separated integers")
+    if not batch_sizes or min(batch_sizes) < 1:
+        raise ValueError(f"Invalid batch size list '{spec}', sizes must be positive")
+    return batch_sizes
+
+def _warm_up_responses(single_result, batch_result):
+    """
+    Serialize every response shape once, so the encoders real requests use are ready:
+    the fast payload encoders, or pydantic's model serializers without fast serialization.
+    """
+    if gv.fast_serialization:
+        for compact in (False, True):
+            FastJSONResponse(prediction_payload(single_result, "warmup", compact))
+            FastJSONResponse(batch_payload(batch_result, "warmup", compact))
+        return
+    
+    PredictionResponse(**single_result, request_id="warmup").model_dump_json()
+    CompactPredictionResponse(
+        **{**single_result, "probabilities": list(single_result["probabilities"].values())},
+        request_id="warmup"
+    ).model_dump_json()
+
+    predictions = batch_result["predictions"]
+    BatchPredictionResponse(
+        predictions=[PredictionResponse(**prediction, request_id="warmup") for prediction in predictions],
+        batch_size=len(predictions),
+        total_inference_time_ms=batch_result["total_inference_time_ms"],
+        average_inference_time_ms=batch_result["average_inference_time_ms"],
+        request_id="warmup"
+    ).model_dump_json()
+    CompactBatchPredictionResponse(
+        predictions=[
+            CompactPredictionResponse(
+                **{**prediction, "probabilities": list(prediction["probabilities"].values())},
+                request_id="warmup"
+            )
+            for prediction in predictions
+        ],
+        batch_size=len(predictions),
+        total_inference_time_ms=batch_result["total_inference_time_ms"],
+        average_inference_time_ms=batch_result["average_inference_time_ms"],
+        request_id="warmup"
+    ).model_dump_json()
+
+async def warm_up_serving_path(entry, batch_sizes: Sequence[int], iterations: int = 1) -> float:
+    """
+    Send synthetic predictions through the path real requests take.
+
+    The registry already runs a few raw forward passes right after loading a
+    model, on a loader thread. This stage goes through the inference
+    executor instead, so every worker thread that will serve requests has
+    run preprocessing, the forward pass at each expected batch size and
+    postprocessing, and every response model has been serialized once.
+    Without it the first real requests pay for allocator growth, oneDNN
+    kernel selection and pydantic serializer setup.
+
+    Predictions made here are recorded by the metrics engine like any other;
+    the caller resets the metrics afterwards. Returns the elapsed time in ms.
+    """
+    start = time.perf_counter()
+    images = np.random.default_rng(0).random((max(batch_sizes), 784), dtype=np.float32)
+    workers = gv.inference_executor.max_workers
+
+    for _ in range(iterations):
+        for batch_size in batch_sizes:
+            # One call per worker, submitted together so each thread picks one up
+            batch_results = await asyncio.gather(*(
+                gv.inference_executor.run(predict_batch_images, images[:batch_size], "warmup", entry.engine)
+                for _ in range(workers)
+            ))
+        single_results = await asyncio.gather(*(
+            gv.inference_executor.run(predict_single_image, images[0], "warmup", entry.engine)
+            for _ in range(workers)
+        ))
+        _warm_up_responses(single_results[0], batch_results[0])
+
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+    logger.info(
+        f"Serving path of model '{entry.name}' warmed up in {elapsed_ms}ms "
+        f"(batch sizes {list(batch_sizes)}, {iterations} iteration(s), {workers} worker(s))"
+    )
+    return elapsed_ms
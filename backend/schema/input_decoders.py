@@ -0,0 +1,375 @@
+# schema/input_decoders.py
+import asyncio
+import base64
+import binascii
+import io
+import json
+from typing import List, Union, AsyncIterator, Optional, Tuple
+import numpy as np
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from schema.input_schema import ImageData, BatchImageData, PackedImageData
+from saved_models.idx_dataset import parse_idx_header, idx_header_size
+
+PIXELS_PER_IMAGE = 784
+
+# Longest NDJSON line accepted: 784 pixel values take under 19 KiB even with every float
+# written at full precision in exponent notation, so anything longer is not an image
+MAX_NDJSON_LINE_BYTES = 24 * 1024
+
+# Request body documentation for endpoints that accept several encodings
+_BINARY_SCHEMA = {"type": "string", "format": "binary"}
+
+PREDICT_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": {"anyOf": [ImageData.model_json_schema(), PackedImageData.model_json_schema()]}},
+            "application/octet-stream": {"schema": {**_BINARY_SCHEMA, "description": "784 raw uint8 pixels, row-major"}},
+            "image/png": {"schema": {**_BINARY_SCHEMA, "description": "28x28 grayscale PNG image"}}
+        }
+    }
+}
+
+BATCH_PREDICT_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": {"anyOf": [BatchImageData.model_json_schema(), PackedImageData.model_json_schema()]}},
+            "application/octet-stream": {"schema": {**_BINARY_SCHEMA, "description": "N x 784 raw uint8 pixels, row-major"}}
+        }
+    }
+}
+
+BULK_PREDICT_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/x-ndjson": {"schema": {"type": "string", "description": "One JSON array of 784 pixel values (or {\"pixel_values\": [...]}) per line"}},
+            "application/octet-stream": {"schema": {**_BINARY_SCHEMA, "description": "N x 784 raw uint8 pixels, row-major"}},
+            "application/x-idx": {"schema": {**_BINARY_SCHEMA, "description": "IDX3 unsigned byte image file, as in the MNIST originals"}}
+        }
+    }
+}
+
+JOB_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/octet-stream": {"schema": {**_BINARY_SCHEMA, "description": "N x 784 raw uint8 pixels, row-major"}},
+            "application/x-idx": {"schema": {**_BINARY_SCHEMA, "description": "IDX3 unsigned byte image file, as in the MNIST originals"}}
+        }
+    }
+}
+
+# Binary canvas delta: one record per changed pixel, a little-endian pixel index and its uint8 value
+CANVAS_DELTA_DTYPE = np.dtype([("index", "<u2"), ("value", "u1")])
+
+def decode_uint8_pixels(buffer: bytes) -> np.ndarray:
+    """
+    Decode a raw uint8 pixel buffer into normalized float32 values in [0, 1].
+    The buffer is viewed with numpy.frombuffer; only the scaled result is allocated.
+    """
+    if len(buffer) == 0 or len(buffer) % PIXELS_PER_IMAGE != 0:
+        raise ValueError(f"Expected a multiple of {PIXELS_PER_IMAGE} uint8 pixels, got {len(buffer)} bytes")
+    pixels = np.frombuffer(buffer, dtype=np.uint8)
+    return np.multiply(pixels, np.float32(1 / 255), dtype=np.float32)
+
+def decode_float32_pixels(buffer: bytes) -> np.ndarray:
+    """Decode a little-endian float32 pixel buffer without copying it."""
+    if len(buffer) == 0 or len(buffer) % (PIXELS_PER_IMAGE * 4) != 0:
+        raise ValueError(f"Expected a multiple of {PIXELS_PER_IMAGE} float32 pixels, got {len(buffer)} bytes")
+    return np.frombuffer(buffer, dtype="<f4")
+
+def decode_packed_pixels(packed: PackedImageData) -> np.ndarray:
+    """Decode a base64-packed pixel field in the given encoding."""
+    try:
+        buffer = base64.b64decode(packed.pixel_data, validate=True)
+    except binascii.Error:
+        raise ValueError("pixel_data is not valid base64")
+
+    if packed.encoding == "float32":
+        return decode_float32_pixels(buffer)
+    return decode_uint8_pixels(buffer)
+
+def decode_png_pixels(buffer: bytes) -> np.ndarray:
+    """
+    Decode a PNG image into normalized float32 pixels.
+    The image is converted to grayscale and resized to 28x28 if needed.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        raise HTTPException(status_code=415, detail="PNG input is not supported on this server")
+
+    try:
+        image = Image.open(io.BytesIO(buffer))
+        image = image.convert("L")
+        if image.size != (28, 28):
+            image = image.resize((28, 28), Image.LANCZOS)
+    except Exception as e:
+        raise ValueError(f"Invalid PNG image: {str(e)}")
+
+    return decode_uint8_pixels(image.tobytes())
+
+def _content_type(request: Request) -> str:
+    return request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+
+async def _read_json(request: Request) -> dict:
+    try:
+        payload = json.loads(await request.body())
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {str(e)}")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="JSON body must be an object")
+    return payload
+
+def _validate(model, payload: dict):
+    """Validate a payload against a schema, reporting errors like a regular body parameter."""
+    try:
+        return model.model_validate(payload)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+
+async def read_image_request(request: Request) -> Union[List[float], np.ndarray]:
+    """
+    Read a single image from the request body in any supported encoding.
+
+    Returns the JSON float list unchanged, or a float32 array of 784 values
+    for the packed, binary and PNG encodings.
+    """
+    content_type = _content_type(request)
+
+    try:
+        if content_type == "application/json":
+            payload = await _read_json(request)
+            if "pixel_data" not in payload:
+                return _validate(ImageData, payload).pixel_values
+            pixels = decode_packed_pixels(_validate(PackedImageData, payload))
+        elif content_type == "application/octet-stream":
+            pixels = decode_uint8_pixels(await request.body())
+        elif content_type == "image/png":
+            pixels = decode_png_pixels(await request.body())
+        else:
+            raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if pixels.size != PIXELS_PER_IMAGE:
+        raise HTTPException(status_code=400, detail=f"Expected 784 pixel values, got {pixels.size}")
+    return pixels
+
+async def read_batch_request(request: Request) -> Union[List[List[float]], np.ndarray]:
+    """
+    Read a batch of images from the request body in any supported encoding.
+
+    Returns the JSON list of float lists unchanged, or a float32 array of
+    shape (batch_size, 784) for the packed and binary encodings.
+    """
+    content_type = _content_type(request)
+
+    try:
+        if content_type == "application/json":
+            payload = await _read_json(request)
+            if "pixel_data" not in payload:
+                return _validate(BatchImageData, payload).images
+            pixels = decode_packed_pixels(_validate(PackedImageData, payload))
+        elif content_type == "application/octet-stream":
+            pixels = decode_uint8_pixels(await request.body())
+        else:
+            raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return pixels.reshape(-1, PIXELS_PER_IMAGE)
+
+async def _iter_ndjson_chunks(byte_stream, chunk_size: int) -> AsyncIterator[np.ndarray]:
+    """
+    Parse NDJSON images from a byte stream into chunks of up to chunk_size images.
+    Lines are parsed in a worker thread, off the event loop, block by block as they arrive.
+    """
+    pending = bytearray()
+    images = []
+    line_number = 0
+
+    def parse_lines(lines):
+        nonlocal line_number
+        for line in lines:
+            line_number += 1
+            if len(line) > MAX_NDJSON_LINE_BYTES:
+                raise ValueError(f"Line {line_number} exceeds {MAX_NDJSON_LINE_BYTES} bytes")
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {line_number}: {str(e)}")
+            pixels = record.get("pixel_values") if isinstance(record, dict) else record
+            if not isinstance(pixels, list) or len(pixels) != PIXELS_PER_IMAGE:
+                raise ValueError(f"Line {line_number} must contain exactly {PIXELS_PER_IMAGE} pixel values")
+            images.append(pixels)
+
+    def take_chunk(count):
+        chunk = np.asarray(images[:count], dtype=np.float32)
+        del images[:count]
+        return chunk
+
+    async for data in byte_stream:
+        pending += data
+        *lines, rest = pending.split(b"\n")
+        # A body without newlines would otherwise be buffered whole
+        if len(rest) > MAX_NDJSON_LINE_BYTES:
+            raise ValueError(f"Line {line_number + len(lines) + 1} exceeds {MAX_NDJSON_LINE_BYTES} bytes")
+        pending = bytearray(rest)
+        if lines:
+            await asyncio.to_thread(parse_lines, lines)
+        while len(images) >= chunk_size:
+            yield await asyncio.to_thread(take_chunk, chunk_size)
+
+    await asyncio.to_thread(parse_lines, [pending])
+    while images:
+        yield await asyncio.to_thread(take_chunk, chunk_size)
+
+def _parse_idx3_image_count(buffer) -> int:
+    """Validate the IDX3 header at the start of buffer and return its image count."""
+    dtype, shape, _ = parse_idx_header(bytes(buffer[:idx_header_size(3)]))
+    if dtype != np.uint8 or len(shape) != 3 or shape[1:] != (28, 28):
+        raise ValueError(f"Expected an IDX3 file of 28x28 unsigned byte images, got {dtype} {shape}")
+    return shape[0]
+
+async def _iter_packed_chunks(byte_stream, chunk_size: int, idx: bool = False) -> AsyncIterator[np.ndarray]:
+    """
+    Split a raw uint8 pixel stream into chunks of up to chunk_size images.
+    With idx=True the stream starts with an IDX3 header, which is validated first.
+    """
+    chunk_bytes = chunk_size * PIXELS_PER_IMAGE
+    buffer = bytearray()
+    expected_images = None
+    received_images = 0
+
+    async for data in byte_stream:
+        buffer += data
+
+        if idx and expected_images is None:
+            if len(buffer) < idx_header_size(3):
+                continue
+            expected_images = _parse_idx3_image_count(buffer)
+            del buffer[:idx_header_size(3)]
+
+        while len(buffer) >= chunk_bytes:
+            yield decode_uint8_pixels(buffer[:chunk_bytes]).reshape(-1, PIXELS_PER_IMAGE)
+            del buffer[:chunk_bytes]
+            received_images += chunk_size
+
+    if idx and expected_images is None:
+        raise ValueError("IDX header is truncated")
+    if buffer:
+        tail = decode_uint8_pixels(buffer).reshape(-1, PIXELS_PER_IMAGE)
+        received_images += len(tail)
+        yield tail
+    if idx and received_images != expected_images:
+        raise ValueError(f"IDX header declares {expected_images} images but {received_images} were received")
+
+def iter_bulk_request(request: Request, chunk_size: int) -> AsyncIterator[np.ndarray]:
+    """
+    Stream images from a bulk request body in fixed-size chunks.
+
+    The body is consumed incrementally, so memory stays bounded by one chunk
+    regardless of how many images are uploaded. Each chunk is a float32 array
+    of shape (n, 784) with n <= chunk_size.
+    """
+    content_type = _content_type(request)
+
+    if content_type in ("application/x-ndjson", "application/jsonl"):
+        return _iter_ndjson_chunks(request.stream(), chunk_size)
+    if content_type == "application/octet-stream":
+        return _iter_packed_chunks(request.stream(), chunk_size)
+    if content_type == "application/x-idx":
+        return _iter_packed_chunks(request.stream(), chunk_size, idx=True)
+    raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type}")
+
+async def save_packed_request(request: Request, path: str, max_images: int) -> int:
+    """
+    Write the uint8 images of a packed or IDX3 request body to a raw N x 784 file.
+
+    The body is streamed to disk as it arrives, with the IDX header stripped,
+    so uploads of any size cost constant memory. Returns the image count.
+    Raises ValueError for malformed data and 413 beyond max_images images.
+    """
+    content_type = _content_type(request)
+    if content_type not in ("application/octet-stream", "application/x-idx"):
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type}")
+    idx = content_type == "application/x-idx"
+
+    header = bytearray()
+    expected_images = None
+    written = 0
+    # File I/O runs in worker threads: uploads can be hundreds of megabytes
+    f = await asyncio.to_thread(open, path, "wb")
+    try:
+        async for data in request.stream():
+            if idx and expected_images is None:
+                header += data
+                if len(header) < idx_header_size(3):
+                    continue
+                expected_images = _parse_idx3_image_count(header)
+                if expected_images > max_images:
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds the limit of {max_images} images")
+                data = bytes(header[idx_header_size(3):])
+
+            written += len(data)
+            if written > max_images * PIXELS_PER_IMAGE:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds the limit of {max_images} images")
+            await asyncio.to_thread(f.write, data)
+    finally:
+        await asyncio.to_thread(f.close)
+
+    if idx and expected_images is None:
+        raise ValueError("IDX header is truncated")
+    if written == 0 or written % PIXELS_PER_IMAGE != 0:
+        raise ValueError(f"Expected a multiple of {PIXELS_PER_IMAGE} uint8 pixels, got {written} bytes")
+    if idx and written // PIXELS_PER_IMAGE != expected_images:
+        raise ValueError(f"IDX header declares {expected_images} images but {written // PIXELS_PER_IMAGE} were received")
+    return written // PIXELS_PER_IMAGE
+
+def decode_canvas_delta(text: Optional[str] = None, data: Optional[bytes] = None) -> Tuple[bool, np.ndarray, np.ndarray]:
+    """
+    Decode a live canvas update from a WebSocket text or binary message.
+
+    Text messages are JSON objects {"pixels": [[index, value], ...], "clear": false}
+    with row-major pixel indices and values in [0, 1]. Binary messages are
+    packed CANVAS_DELTA_DTYPE records (3 bytes per pixel); an empty binary
+    message clears the canvas. Returns whether to clear the canvas first,
+    then the pixel indices and float32 values to set. Raises ValueError
+    for malformed messages.
+    """
+    if data is not None:
+        if len(data) % CANVAS_DELTA_DTYPE.itemsize != 0:
+            raise ValueError(f"Binary canvas updates must be {CANVAS_DELTA_DTYPE.itemsize}-byte records, got {len(data)} bytes")
+        records = np.frombuffer(data, dtype=CANVAS_DELTA_DTYPE)
+        clear = len(records) == 0
+        indices = records["index"].astype(np.intp)
+        values = np.multiply(records["value"], np.float32(1 / 255), dtype=np.float32)
+    else:
+        try:
+            payload = json.loads(text)
+        except (json.JSONDecodeError, TypeError) as e:
+            raise ValueError(f"Invalid JSON message: {str(e)}")
+        if not isinstance(payload, dict):
+            raise ValueError("JSON message must be an object")
+        clear = bool(payload.get("clear", False))
+        try:
+            pixels = np.asarray(payload.get("pixels", []), dtype=np.float64).reshape(-1, 2)
+        except (TypeError, ValueError):
+            raise ValueError("pixels must be a list of [index, value] pairs")
+        indices = pixels[:, 0].astype(np.intp)
+        values = pixels[:, 1].astype(np.float32)
+        if np.any(indices != pixels[:, 0]) or not np.all((values >= 0) & (values <= 1)):
+            raise ValueError("pixels must be [index, value] pairs with integer indices and values between 0 and 1")
+
+    if len(indices) > PIXELS_PER_IMAGE:
+        raise ValueError(f"A canvas update can change at most {PIXELS_PER_IMAGE} pixels, got {len(indices)}")
+    if len(indices) and (indices.min() < 0 or indices.max() >= PIXELS_PER_IMAGE):
+        raise ValueError(f"Pixel indices must be between 0 and {PIXELS_PER_IMAGE - 1}")
+    return clear, indices, values
@@ -1,6 +1,6 @@
 # schema/input_schema.py
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Literal, Optional
 
 class ImageData(BaseModel):
     """
@@ -24,4 +24,69 @@ class BatchImageData(BaseModel):
         description="List of images, where each image is a list of 784 normalized pixel values",
         max_items=10,  # Limit batch size to prevent overwhelming the server
         example=[[0.1, 0.2, 0.3], [0.4, 0.5, 0.6]]  # Example showing format
-    )
\ No newline at end of file
+    )
+
+class PackedImageData(BaseModel):
+    """
+    Model for base64-packed pixel data.
+    A compact alternative to the JSON float list: one or more 28x28 images packed
+    row-major into a single base64 string.
+    """
+    pixel_data: str = Field(
+        ...,
+        description="Base64-encoded pixel buffer (784 values per image)",
+        example="AAAA..."
+    )
+    encoding: Literal["uint8", "float32"] = Field(
+        "uint8",
+        description="Pixel encoding: uint8 (0-255, scaled to [0, 1]) or little-endian float32 (already normalized)"
+    )
+
+class CascadeConfig(BaseModel):
+    """
+    Model for a confidence cascade in front of a registry model.
+    Images the fast model classifies with at least `threshold` confidence are
+    answered by it; the rest escalate to the loaded model (and ensemble).
+    """
+    fast_model_path: str = Field(
+        ...,
+        description="Cheap first-stage model, relative to the server's model directory",
+        example="mnist_cnn_pruned_only.pth"
+    )
+    fast_backend: Optional[Literal["eager", "torchscript", "compile", "onnxruntime", "numpy"]] = Field(
+        None,
+        description="Backend of the fast model; defaults by file extension"
+    )
+    fast_variant: Optional[Literal["float", "fused", "channels_last", "dynamic_int8", "static_int8"]] = Field(
+        None,
+        description="Variant of the fast model, e.g. static_int8"
+    )
+    ensemble_model_paths: List[str] = Field(
+        default_factory=list,
+        description="Further models averaged with the loaded model for escalated images"
+    )
+    threshold: float = Field(0.9, gt=0, le=1, description="Softmax confidence the fast model must reach")
+
+class ModelLoadRequest(BaseModel):
+    """
+    Model for loading a model into the registry.
+    The model is loaded and warmed up in the background, then swapped in.
+    """
+    model_path: str = Field(
+        ...,
+        description="Model file, relative to the server's model directory (.pth, .safetensors or .onnx)",
+        example="mnist_cnn_pruned_only.pth"
+    )
+    backend: Optional[Literal["eager", "torchscript", "compile", "onnxruntime", "numpy"]] = Field(
+        None,
+        description="Inference backend; defaults to onnxruntime for .onnx files and eager otherwise"
+    )
+    variant: Optional[Literal["float", "fused", "channels_last", "dynamic_int8", "static_int8"]] = Field(
+        None,
+        description="Model variant built from the weights; defaults to float"
+    )
+    make_default: bool = Field(False, description="Serve requests that don't name a model once loaded")
+    cascade: Optional[CascadeConfig] = Field(
+        None,
+        description="Answer confident images with a cheap model first and escalate the rest to this model"
+    )
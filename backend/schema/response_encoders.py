@@ -0,0 +1,58 @@
+#schema/response_encoders.py
+from operator import itemgetter
+from typing import Dict, Any
+from fastapi.responses import Response
+from pydantic_core import to_json
+try:
+    import orjson
+except ImportError:
+    # pydantic-core's Rust encoder is nearly as fast and always installed with pydantic
+    orjson = None
+
+# Probabilities keyed "0".."9" as a tuple ordered by digit, for the compact format
+_probabilities_by_digit = itemgetter(*(str(digit) for digit in range(10)))
+
+def dumps(payload: Any) -> bytes:
+    """Encode plain dicts, lists, strings and numbers to JSON bytes with a compiled encoder."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return to_json(payload)
+
+class FastJSONResponse(Response):
+    """
+    JSON response encoded with orjson (or pydantic-core) from plain Python data.
+
+    Returning a Response from a route makes FastAPI skip response_model
+    validation and its jsonable_encoder pass, while the declared
+    response_model still documents the body in the OpenAPI schema. The
+    payload builders below produce exactly the fields of those models.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def prediction_payload(result: Dict[str, Any], request_id: str, compact: bool = False) -> Dict[str, Any]:
+    """PredictionResponse (or CompactPredictionResponse) body for one prediction result."""
+    probabilities = result["probabilities"]
+    return {
+        "prediction": result["prediction"],
+        "confidence": result["confidence"],
+        "probabilities": _probabilities_by_digit(probabilities) if compact else probabilities,
+        "inference_time_ms": result["inference_time_ms"],
+        "request_id": request_id
+    }
+
+def batch_payload(results: Dict[str, Any], request_id: str, compact: bool = False) -> Dict[str, Any]:
+    """BatchPredictionResponse (or CompactBatchPredictionResponse) body for predict_batch_images results."""
+    predictions = [
+        prediction_payload(result, f"{request_id}-{i}", compact)
+        for i, result in enumerate(results["predictions"])
+    ]
+    return {
+        "predictions": predictions,
+        "batch_size": len(predictions),
+        "total_inference_time_ms": results["total_inference_time_ms"],
+        "average_inference_time_ms": results["average_inference_time_ms"],
+        "request_id": request_id
+    }
@@ -1,6 +1,6 @@
 #schema/response_schema.py
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 class PredictionResponse(BaseModel):
     """
@@ -23,12 +23,40 @@ class BatchPredictionResponse(BaseModel):
     average_inference_time_ms: float = Field(..., description="Average time per image")
     request_id: str = Field(..., description="Unique batch request identifier")
 
+class CompactPredictionResponse(BaseModel):
+    """
+    Compact response model for predictions.
+    Probabilities are returned as an array indexed by digit instead of a string-keyed dict.
+    """
+    prediction: int = Field(..., description="Predicted digit (0-9)")
+    confidence: float = Field(..., description="Confidence score (0-1)")
+    probabilities: List[float] = Field(..., description="Probability for each digit, indexed by digit")
+    inference_time_ms: float = Field(..., description="Inference time in milliseconds")
+    request_id: str = Field(..., description="Unique request identifier")
+
+class CompactBatchPredictionResponse(BaseModel):
+    """
+    Compact response model for batch predictions.
+    """
+    predictions: List[CompactPredictionResponse] = Field(..., description="List of individual predictions")
+    batch_size: int = Field(..., description="Number of images processed")
+    total_inference_time_ms: float = Field(..., description="Total time for batch processing")
+    average_inference_time_ms: float = Field(..., description="Average time per image")
+    request_id: str = Field(..., description="Unique batch request identifier")
+
 class HealthResponse(BaseModel):
     """Response model for health check endpoint."""
     status: str
     timestamp: str
     model_loaded: bool
     model_info: Dict[str, Any]
+    startup: Optional[Dict[str, Any]] = Field(None, description="Startup timing breakdown in milliseconds")
+
+class ProbeResponse(BaseModel):
+    """Response model for the liveness and readiness probes."""
+    status: str = Field(..., description="'ok' when the probe passes, otherwise the reason it fails")
+    startup_state: str = Field(..., description="starting, ready, stopping or failed: <reason>")
+    timestamp: str
 
 class MetricsResponse(BaseModel):
     """Response model for metrics endpoint."""
@@ -37,4 +65,81 @@ class MetricsResponse(BaseModel):
     failed_predictions: int
     success_rate: float
     average_inference_time: float
-    predictions_by_class: Dict[str, int]
\ No newline at end of file
+    predictions_by_class: Dict[str, int]
+    latency: Dict[str, Dict[str, Any]] = Field(
+        default_factory=dict, description="Count, mean, max and p50/p95/p99 (ms) per pipeline stage"
+    )
+    request_latency: Dict[str, Dict[str, Any]] = Field(
+        default_factory=dict, description="End-to-end request latency percentiles (ms) per route"
+    )
+    worker_processes: int = Field(1, description="Number of worker processes the counters are aggregated over")
+    executor: Optional[Dict[str, Any]] = Field(None, description="Inference worker pool and admission statistics")
+    batching: Optional[Dict[str, Any]] = Field(None, description="Micro-batch scheduler queue and batch size statistics")
+    cache: Optional[Dict[str, Any]] = Field(None, description="Prediction cache size and hit/miss/eviction counters")
+    jobs: Optional[Dict[str, Any]] = Field(
+        None, description="Prediction job workers, jobs per status and images scored by jobs"
+    )
+    live: Optional[Dict[str, Any]] = Field(
+        None, description="Live WebSocket sessions, canvas updates received and predictions run and pushed"
+    )
+    admission: Optional[Dict[str, Any]] = Field(
+        None, description="Rate limits, shedding thresholds and admitted/rate-limited/shed requests per priority class"
+    )
+    cascade: Optional[Dict[str, Any]] = Field(
+        None, description="Confidence cascade escalation rate and estimated latency saved"
+    )
+    buffer_pool: Optional[Dict[str, Any]] = Field(
+        None, description="Reuses and allocations of pooled input/output buffers; allocations stay flat once warm"
+    )
+    logging: Optional[Dict[str, Any]] = Field(
+        None, description="Log pipeline queue depth and written/dropped/sampled-out record counters"
+    )
+
+class ModelStatusResponse(BaseModel):
+    """Response model for a model registry entry."""
+    name: str
+    status: str = Field(..., description="'ready', 'loading' or 'failed: <reason>'")
+    is_default: bool
+    version: Optional[str] = Field(None, description="Fingerprint of the served weights")
+    model_path: Optional[str] = None
+    loaded_at: Optional[str] = None
+    load_time_ms: Optional[float] = Field(None, description="Time to read the weights and build the engine")
+    warmup_time_ms: Optional[float] = Field(None, description="Time spent on warm-up forward passes")
+    model_info: Optional[Dict[str, Any]] = None
+    metrics: Optional[Dict[str, Any]] = Field(None, description="Per-model prediction counts, latency percentiles and confidence histogram")
+
+class ModelListResponse(BaseModel):
+    """Response model for the model registry listing."""
+    default_model: Optional[str]
+    models: List[ModelStatusResponse]
+
+class JobStatusResponse(BaseModel):
+    """Response model for the status and progress of a prediction job."""
+    job_id: str
+    status: str = Field(..., description="'queued', 'running', 'completed' or 'failed'")
+    model_name: str = Field(..., description="Registry model scoring the job")
+    total_images: int
+    processed_images: int = Field(..., description="Images scored and stored so far; results are readable up to here")
+    progress: float = Field(..., description="Fraction of the images processed (0-1)")
+    chunk_size: int = Field(..., description="Images per inference chunk and checkpoint")
+    created_at: str
+    updated_at: str
+    finished_at: Optional[str] = None
+    error: Optional[str] = Field(None, description="Why the job failed")
+
+class JobResultItem(BaseModel):
+    """One image's prediction in a job result page."""
+    index: int = Field(..., description="Position of the image in the uploaded dataset")
+    prediction: int = Field(..., description="Predicted digit (0-9)")
+    confidence: float = Field(..., description="Confidence score (0-1)")
+    probabilities: List[float] = Field(..., description="Probability for each digit, indexed by digit")
+
+class JobResultsResponse(BaseModel):
+    """Response model for a page of prediction job results."""
+    job_id: str
+    status: str
+    offset: int
+    results: List[JobResultItem]
+    next_offset: Optional[int] = Field(
+        None, description="Offset of the next page, None once every image's result has been returned"
+    )
@@ -0,0 +1,30 @@
+# tests/test_admission.py
+from types import SimpleNamespace
+from middleware.admission import client_key, TokenBucketLimiter
+
+def _request(headers=None, host="10.0.0.1"):
+    return SimpleNamespace(headers=headers or {}, client=SimpleNamespace(host=host))
+
+def test_unknown_api_keys_fall_back_to_the_client_ip():
+    api_keys = {"team-a"}
+    assert client_key(_request({"x-api-key": "random-1"}), api_keys) == "ip:10.0.0.1"
+    assert client_key(_request({"authorization": "Bearer random-2"}), api_keys) == "ip:10.0.0.1"
+    assert client_key(_request({"x-api-key": "random-3"})) == "ip:10.0.0.1"
+
+def test_configured_api_keys_identify_the_client():
+    api_keys = {"team-a", "team-b"}
+    assert client_key(_request({"x-api-key": "team-a"}), api_keys) == "key:team-a"
+    assert client_key(_request({"authorization": "Bearer team-b"}), api_keys) == "key:team-b"
+
+def test_rotating_api_keys_cannot_bypass_the_rate_limit():
+    limiter = TokenBucketLimiter(rate_per_s=0.001, burst=3, max_clients=2)
+    waits = [
+        limiter.acquire(client_key(_request({"x-api-key": f"random-{i}"}), {"team-a"}))
+        for i in range(10)
+    ]
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert all(wait > 0 for wait in waits[3:])
+
+    # The flood did not push a known client's bucket out of the limiter
+    assert limiter.acquire(client_key(_request({"x-api-key": "team-a"}, host="10.0.0.2"), {"team-a"})) == 0.0
+    assert limiter.acquire("ip:10.0.0.1") > 0
@@ -0,0 +1,39 @@
+# tests/test_safetensors_loader.py
+import json
+import struct
+import numpy as np
+import pytest
+from saved_models.safetensors_loader import load_safetensors_numpy, save_safetensors
+
+def _write(path, header, data=b""):
+    header_bytes = json.dumps(header).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(data)
+    return str(path)
+
+def test_round_trip(tmp_path):
+    arrays = {"weight": np.arange(6, dtype=np.float32).reshape(2, 3), "bias": np.ones(3, dtype=np.float32)}
+    path = str(tmp_path / "model.safetensors")
+    save_safetensors(arrays, path)
+    loaded = load_safetensors_numpy(path)
+    for name, array in arrays.items():
+        np.testing.assert_array_equal(loaded[name], array)
+
+@pytest.mark.parametrize("header, data", [
+    ([1, 2, 3], b""),
+    ({"weight": "F32"}, b""),
+    ({"weight": {"dtype": "F32", "data_offsets": [0, 4]}}, bytes(4)),
+    ({"weight": {"dtype": "F32", "shape": [1], "data_offsets": [-4, 0]}}, bytes(4)),
+    ({"weight": {"dtype": "F32", "shape": [1], "data_offsets": [0]}}, bytes(4)),
+    ({"weight": {"dtype": "F32", "shape": [True], "data_offsets": [0, 4]}}, bytes(4)),
+    ({"a": {"dtype": "F32", "shape": [2], "data_offsets": [0, 8]},
+      "b": {"dtype": "F32", "shape": [1], "data_offsets": [4, 8]}}, bytes(8)),
+    ({"a": {"dtype": "F32", "shape": [1], "data_offsets": [4, 8]}}, bytes(8)),
+    ({"a": {"dtype": "F32", "shape": [2], "data_offsets": [0, 8]}}, bytes(4)),
+])
+def test_malformed_headers_raise_value_error(tmp_path, header, data):
+    path = _write(tmp_path / "bad.safetensors", header, data)
+    with pytest.raises(ValueError):
+        load_safetensors_numpy(path)